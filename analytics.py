@@ -0,0 +1,234 @@
+"""Period-over-period spending analytics over the daily expense rollup.
+
+Each series is computed in SQL by one grouped query with window functions.
+Python only turns the result rows into labels and percentages, so the cost
+depends on the number of periods, not the number of expenses:
+
+- per-period totals, with the change on the previous period and on the
+  same period a year earlier (a recursive CTE lists every period of the
+  range, so periods without spending are zeros and each change compares
+  adjacent periods);
+- the rolling average spend per day over the trailing ROLLING_DAYS;
+- a least-squares trend per category, extended FORECAST_PERIODS ahead.
+
+A comparison may reach before the requested range, so it reads the rollup
+from a year before the range start. Periods are kept within the dates
+Python can represent, so the lookback stops at date.min and the forecast
+at date.max.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import (
+    Integer, and_, case, cast, func, literal, literal_column, select, true, type_coerce
+)
+
+from money import CENT, Money
+
+# Granularity: SQL period number of a day, periods per year, label format.
+# Weeks start on Monday, counted from Monday 1900-01-01.
+GRANULARITIES = {
+    'week': ("CAST((julianday({}) - julianday('1900-01-01')) / 7 AS INTEGER)", 52, "%b %d, %Y"),
+    # Days are stored as YYYY-MM-DD; slicing them is cheaper than strftime()
+    'month': ("CAST(substr({0}, 1, 4) AS INTEGER) * 12 + CAST(substr({0}, 6, 2) AS INTEGER) - 1",
+              12, "%b %Y"),
+}
+
+# Days averaged by the rolling average
+ROLLING_DAYS = 30
+
+# Periods forecast past the end of the range
+FORECAST_PERIODS = 3
+
+EPOCH_MONDAY = date(1900, 1, 1)
+
+def period_number(day, granularity):
+    """The number of the week or month containing day, as computed in SQL"""
+    if granularity == 'week':
+        return (day - EPOCH_MONDAY).days // 7
+    return day.year * 12 + day.month - 1
+
+def period_start(number, granularity):
+    """The first day of a week or month number"""
+    if granularity == 'week':
+        return EPOCH_MONDAY + timedelta(weeks=number)
+    return date(number // 12, number % 12 + 1, 1)
+
+def period_bounds(granularity):
+    """The first and last week or month number whose start is a representable date"""
+    first = period_number(date.min, granularity)
+    if granularity == 'week' and (date.min - EPOCH_MONDAY).days % 7:
+        first += 1
+    return first, period_number(date.max, granularity)
+
+def period_end(number, granularity):
+    """The last day of a week or month number, date.max for the last representable one"""
+    if number >= period_bounds(granularity)[1]:
+        return date.max
+    return period_start(number + 1, granularity) - timedelta(days=1)
+
+def period_label(number, granularity):
+    return period_start(number, granularity).strftime(GRANULARITIES[granularity][2])
+
+def percent_change(value, base):
+    """Change from base to value in percent, None without a base to compare to"""
+    if base is None or base == 0:
+        return None
+    return round(float((value - base) / base * 100), 1)
+
+def day_range(column, start_day=None, end_day=None):
+    conditions = []
+    if start_day:
+        conditions.append(column >= start_day)
+    if end_day:
+        conditions.append(column <= end_day)
+    return and_(true(), *conditions)
+
+def get_period_series(conn, rollup, ledger_id, granularity, start_day=None, end_day=None):
+    """Total per period of the range, with the previous period's and the year-ago total
+
+    Returns rows of (period, total, previous, year_ago) for every period of
+    the range, spending or not. The comparison totals are zero for periods
+    without spending and None before the ledger's first expense. Missing
+    range ends are where the spending starts or stops.
+    """
+    expression, per_year, _ = GRANULARITIES[granularity]
+    period = literal_column(expression.format(rollup.c.day.name))
+    lookback = None
+    if start_day:
+        # No earlier than the first period Python can represent
+        lookback = period_start(max(period_number(start_day, granularity) - per_year,
+                                    period_bounds(granularity)[0]), granularity)
+    grouped = select(
+        period.label('period'), func.sum(rollup.c.total).label('total')
+    ).where(
+        rollup.c.ledger_id == ledger_id, day_range(rollup.c.day, lookback, end_day)
+    ).group_by(period).cte('grouped')
+
+    # Every period number from the lookback, or the first spending, to the end
+    first = select(func.min(grouped.c.period)).scalar_subquery()
+    low = literal(period_number(lookback, granularity)) if lookback else first
+    high = (literal(period_number(end_day, granularity)) if end_day
+            else select(func.max(grouped.c.period)).scalar_subquery())
+    calendar = select(low.label('period')).cte('calendar', recursive=True)
+    calendar = calendar.union_all(
+        select(calendar.c.period + 1).where(calendar.c.period < high)
+    )
+    series = select(
+        calendar.c.period, func.coalesce(grouped.c.total, 0).label('total')
+    ).select_from(
+        calendar.outerjoin(grouped, grouped.c.period == calendar.c.period)
+    ).where(calendar.c.period.is_not(None)).subquery()
+
+    def lagged(periods):
+        """Total `periods` periods earlier: 0 if there was none, None before the first period"""
+        total = func.lag(series.c.total, periods).over(order_by=series.c.period)
+        return case((series.c.period - periods >= first, total), else_=None)
+
+    windowed = select(
+        series.c.period,
+        type_coerce(series.c.total, Money).label('total'),
+        type_coerce(lagged(1), Money).label('previous'),
+        type_coerce(lagged(per_year), Money).label('year_ago'),
+    ).subquery()
+    query = select(windowed).order_by(windowed.c.period)
+    if start_day:
+        query = query.where(windowed.c.period >= period_number(start_day, granularity))
+    return conn.execute(query).all()
+
+def get_rolling_average(conn, rollup, ledger_id, start_day=None, end_day=None, days=ROLLING_DAYS):
+    """Average spend per day over the trailing `days` days, on every day of the range with spending
+
+    Returns rows of (day, average). Days without spending count as zero.
+    """
+    day_number = cast(func.julianday(rollup.c.day), Integer)
+    daily = select(
+        rollup.c.day, day_number.label('day_number'), func.sum(rollup.c.total).label('total')
+    ).where(
+        rollup.c.ledger_id == ledger_id,
+        day_range(rollup.c.day, start_day and start_day - min(timedelta(days=days - 1),
+                                                              start_day - date.min), end_day)
+    ).group_by(rollup.c.day).subquery()
+
+    trailing = func.sum(daily.c.total).over(order_by=daily.c.day_number, range_=(-(days - 1), 0))
+    windowed = select(daily.c.day, type_coerce(trailing, Money).label('trailing')).subquery()
+    query = select(windowed).order_by(windowed.c.day)
+    if start_day:
+        query = query.where(windowed.c.day >= start_day)
+    return [(day, (trailing / days).quantize(CENT)) for day, trailing in conn.execute(query)]
+
+def get_category_trends(conn, rollup, ledger_id, granularity, first_period, last_period):
+    """Least-squares trend of each category's total per period from first_period to last_period
+
+    The sums of the regression are taken in SQL over the per-period totals;
+    periods without spending are zeros, which only the period count and the
+    sums of x need, and these have closed forms. Returns {category_id:
+    (slope, intercept)} with x counted in periods from first_period.
+    """
+    expression = GRANULARITIES[granularity][0]
+    period = literal_column(expression.format(rollup.c.day.name))
+    grouped = select(
+        rollup.c.category_id, period.label('period'), func.sum(rollup.c.total).label('total')
+    ).where(
+        rollup.c.ledger_id == ledger_id,
+        day_range(rollup.c.day, period_start(first_period, granularity),
+                  period_end(last_period, granularity))
+    ).group_by(rollup.c.category_id, period).subquery()
+    rows = conn.execute(select(
+        grouped.c.category_id,
+        type_coerce(func.sum(grouped.c.total), Money),
+        type_coerce(func.sum((grouped.c.period - first_period) * grouped.c.total), Money),
+    ).group_by(grouped.c.category_id)).all()
+
+    n = last_period - first_period + 1
+    sum_x = Decimal(n * (n - 1) // 2)
+    sum_xx = Decimal((n - 1) * n * (2 * n - 1) // 6)
+    denominator = n * sum_xx - sum_x * sum_x
+    trends = {}
+    for category_id, sum_y, sum_xy in rows:
+        slope = (n * sum_xy - sum_x * sum_y) / denominator if denominator else Decimal(0)
+        trends[category_id] = (slope, (sum_y - slope * sum_x) / n)
+    return trends
+
+def get_spending_analytics(conn, rollup, ledger_id, granularity, start_day=None, end_day=None):
+    """Every analytics series of a ledger's spending for a date range and granularity"""
+    periods = get_period_series(conn, rollup, ledger_id, granularity, start_day, end_day)
+    rolling = get_rolling_average(conn, rollup, ledger_id, start_day, end_day)
+
+    forecast_labels = []
+    forecasts = {}
+    if periods:
+        # Missing range ends are where the spending starts or stops
+        first = period_number(start_day, granularity) if start_day else periods[0].period
+        last = period_number(end_day, granularity) if end_day else periods[-1].period
+        trends = get_category_trends(conn, rollup, ledger_id, granularity, first, last)
+        # Only periods that start on a representable date can be forecast
+        ahead = range(last - first + 1,
+                      min(last + FORECAST_PERIODS, period_bounds(granularity)[1]) - first + 1)
+        forecast_labels = [period_label(first + x, granularity) for x in ahead]
+        forecasts = {
+            category_id: {
+                'slope': slope.quantize(CENT),
+                'values': [max(intercept + slope * x, Decimal(0)).quantize(CENT) for x in ahead],
+            }
+            for category_id, (slope, intercept) in trends.items()
+        }
+
+    return {
+        'granularity': granularity,
+        'periods': {
+            'labels': [period_label(row.period, granularity) for row in periods],
+            'totals': [row.total for row in periods],
+            'previous_change': [percent_change(row.total, row.previous) for row in periods],
+            'year_change': [percent_change(row.total, row.year_ago) for row in periods],
+        },
+        'rolling_average': {
+            'days': ROLLING_DAYS,
+            'labels': [day.strftime("%b %d, %Y") for day, _ in rolling],
+            'values': [average for _, average in rolling],
+        },
+        'forecast': {
+            'labels': forecast_labels,
+            'categories': forecasts,
+        },
+    }
@@ -1,80 +1,231 @@
-from flask import Flask, render_template, request, url_for, make_response, flash, redirect
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, date
-from sqlalchemy import func
-import subprocess
+from flask import (
+    Flask, Blueprint, render_template, request, url_for, make_response, flash, redirect,
+    jsonify, Response, stream_with_context, current_app, g, session
+)
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from sqlalchemy import (
+    func, case, and_, or_, true, inspect, event, insert, select, literal_column, table, column
+)
+import hashlib
+import click
 import os
 import time
-from contextlib import contextmanager
+from functools import lru_cache, wraps, partial
 from sqlalchemy.exc import OperationalError
 
-import oracledb
+from cache import LRUCache
+from importer import import_rows, iter_csv_rows, iter_ofx_rows, IMPORT_BATCH_SIZE
+from exporter import (
+    iter_csv, iter_arrow, arrow_available, EXPORT_CHUNK_SIZE, EXPORT_COLUMNS, EXPORT_FORMATS
+)
+from sync_jobs import SyncJobRunner
+from write_queue import WriteQueue
+from money import ZERO, parse_amount
+from profiling import RequestProfiler
+from recurring import (
+    RecurringScheduler, materialize_due_expenses, FREQUENCIES, RECURRING_INTERVAL_SECONDS
+)
+from analytics import GRANULARITIES, get_spending_analytics
+from budget_alerts import (
+    AlertDispatcher, LocalAlertSink, WebhookAlertSink, deliver_pending_alerts,
+    mark_alerts_delivered, sync_thresholds,
+    DEFAULT_ALERT_THRESHOLDS
+)
+from migrations import (
+    migrate, set_schema_version, rebuild_expense_rollup, budget_alert_triggers,
+    rebuild_budget_spend, LATEST_VERSION, DEFAULT_LEDGER_ID
+)
+from models import (
+    db, Ledger, Expense, RecurringExpense, CategoryBudget, Saving, ExpenseRollup, BudgetSpend,
+    BudgetAlert, ChangeLog
+)
 
-app = Flask(__name__)
+DEFAULT_CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': os.environ.get('EXPENSES_DATABASE_URI', 'sqlite:///expenses.db'),
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'SQLALCHEMY_ENGINE_OPTIONS': {
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False}  # This is key for SQLite
+    },
+    'SECRET_KEY': 'my-secret-key',
 
-# Updated database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///expenses.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 3600,
-    'connect_args': {'check_same_thread': False}  # This is key for SQLite
+    # Applied to every pooled SQLite connection when it is opened
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'WAL',      # readers no longer block the writer
+        'synchronous': 'NORMAL',    # safe with WAL, skips an fsync per commit
+        'busy_timeout': 5000,       # ms to wait for the write lock before failing
+        'cache_size': -20000,       # page cache in KiB (negative) per connection
+        'mmap_size': 268435456,     # read pages through a 256 MB memory map
+        'foreign_keys': 'ON',       # enforce expense.category_id
+    },
+
+    # Send route writes through the single-writer queue (see write_queue.py)
+    'SERIALIZE_WRITES': True,
+
+    # Opt-in request profiling served at /metrics (see profiling.py); allocation
+    # tracking uses tracemalloc and slows every request down
+    'PROFILE_REQUESTS': os.environ.get('EXPENSES_PROFILE') == '1',
+    'PROFILE_ALLOCATIONS': os.environ.get('EXPENSES_PROFILE_ALLOCATIONS') == '1',
+    'PROFILE_SERVER_TIMING': True,
+
+    # Percentages of a category budget that raise an alert when spending reaches
+    # them, and where alerts go (see budget_alerts.py); without a webhook URL
+    # they are kept in memory
+    'BUDGET_ALERT_THRESHOLDS': DEFAULT_ALERT_THRESHOLDS,
+    'BUDGET_ALERT_WEBHOOK': os.environ.get('EXPENSES_ALERT_WEBHOOK'),
+
+    # Add the due occurrences of recurring expenses on a background thread
+    # (see recurring.py); with catch-up, periods missed while the app was
+    # down are backfilled, otherwise only the latest one is added
+    'RECURRING_SCHEDULER': True,
+    'RECURRING_INTERVAL_SECONDS': RECURRING_INTERVAL_SECONDS,
+    'RECURRING_CATCH_UP': True,
+}
+
+# Routes and CLI commands, registered on the application by create_app()
+bp = Blueprint('main', __name__, cli_group=None)
+
+# Entries kept per dashboard aggregate cache (one per filter combination)
+AGGREGATE_CACHE_SIZE = 256
+
+# Rows per page for the expense and savings tables
+PAGE_SIZE = 50
+
+# Alerts listed by /api/budget-alerts
+RECENT_ALERTS = 20
+
+# Full-text indexes over the descriptions (see search_index_sql() in migrations.py);
+# rank is FTS5's bm25 score, lower is better
+expense_fts = table('expense_fts', column('rowid'), column('rank'))
+saving_fts = table('saving_fts', column('rowid'), column('rank'))
+
+# Matches ranked per search: scoring is per match, so a word found in most
+# rows ranks only its newest SEARCH_CANDIDATES matches
+SEARCH_CANDIDATES = 2000
+
+# Buckets of the savings balance chart: SQLite date expression and label format
+SAVINGS_BUCKETS = {
+    'day': ("date({})", "%b %d"),
+    'week': ("date({}, 'weekday 0', '-6 days')", "%b %d"),  # Monday of the week
+    'month': ("strftime('%Y-%m-01', {})", "%b %Y"),
 }
-app.config['SECRET_KEY'] = 'my-secret-key'
-
-db = SQLAlchemy(app)
-
-class Expense(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    description = db.Column(db.String(200), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    category = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.DateTime, nullable=False)
-
-class CategoryBudget(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, unique=True)
-    budget_amount = db.Column(db.Float, nullable=False)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class Saving(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    description = db.Column(db.String(200), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.DateTime, nullable=False)
-    type = db.Column(db.String(50), nullable=False)  # 'deposit' or 'withdrawal'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-# Default categories
+
+# Default categories, created in every new ledger
 DEFAULT_CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Other"]
+DEFAULT_CATEGORY_BUDGET = Decimal('1000.00')
+
+def create_app(config=None):
+    """Create the application, bring its database up to date and start its workers
+
+    Importing this module has no side effects; the database is first
+    touched here. config overrides DEFAULT_CONFIG.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    db.init_app(app)
+    app.register_blueprint(bp)
 
-def init_db():
-    """Initialize database with default categories"""
     with app.app_context():
-        db.create_all()
-        for category_name in DEFAULT_CATEGORIES:
-            if not CategoryBudget.query.filter_by(name=category_name).first():
-                category = CategoryBudget(name=category_name, budget_amount=1000.00)
-                db.session.add(category)
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', partial(apply_sqlite_pragmas, app))
+        profiler = RequestProfiler()
+        profiler.install(app, db.engine)
+        init_db(app)
+
+    if app.config['BUDGET_ALERT_WEBHOOK']:
+        alert_sink = WebhookAlertSink(app.config['BUDGET_ALERT_WEBHOOK'])
+    else:
+        alert_sink = LocalAlertSink()
+    app.extensions['profiler'] = profiler
+    app.extensions['write_queue'] = WriteQueue(partial(run_write_group, app))
+    app.extensions['alert_sink'] = alert_sink
+    app.extensions['alert_dispatcher'] = AlertDispatcher(
+        partial(deliver_budget_alerts, app, alert_sink)
+    )
+    app.extensions['recurring_scheduler'] = RecurringScheduler(
+        partial(run_recurring_expenses, app), app.config['RECURRING_INTERVAL_SECONDS']
+    )
+    app.extensions['sync_runner'] = SyncJobRunner(run_oracle_sync)
+    if app.config['RECURRING_SCHEDULER']:
+        app.extensions['recurring_scheduler'].start()
+
+    # The caches are per process; drop anything cached for another database
+    for cache in AGGREGATE_CACHES:
+        cache.invalidate()
+    return app
+
+def apply_sqlite_pragmas(app, dbapi_connection, connection_record):
+    """Tune each new SQLite connection; pragmas are per connection, not per file"""
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def init_db(app):
+    """Bring the schema up to date and add the default categories, if needed
+
+    A database already at the latest version with the configured alert
+    thresholds is recognized with a single query and left alone.
+    """
+    thresholds = ",".join(str(p) for p in sorted(set(app.config['BUDGET_ALERT_THRESHOLDS'])))
+    with db.engine.begin() as conn:
         try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error initializing database: {e}")
+            version, stored_thresholds = conn.exec_driver_sql(
+                "SELECT user_version, (SELECT group_concat(percent) FROM "
+                "(SELECT percent FROM budget_threshold ORDER BY percent)) FROM pragma_user_version"
+            ).one()
+        except OperationalError:
+            # No budget_threshold table: a new or older database
+            version, stored_thresholds = None, None
+        if version == LATEST_VERSION and stored_thresholds == thresholds:
+            return
 
-# Initialize database
-init_db()
+    is_new_database = not inspect(db.engine).has_table(Expense.__tablename__)
+    db.create_all()
+    if not is_new_database:
+        run_migrations()
+    with db.engine.begin() as conn:
+        if is_new_database:
+            # create_all() already built the latest schema, except for the
+            # alert triggers that span budget_spend and category_budget
+            for statement in budget_alert_triggers():
+                conn.exec_driver_sql(statement)
+            set_schema_version(conn, LATEST_VERSION)
+        sync_thresholds(conn, app.config['BUDGET_ALERT_THRESHOLDS'])
+        conn.execute(
+            insert(Ledger.__table__).prefix_with("OR IGNORE"),
+            {'id': DEFAULT_LEDGER_ID, 'name': 'Default', 'created_at': datetime.utcnow()}
+        )
+        conn.execute(
+            insert(CategoryBudget.__table__).prefix_with("OR IGNORE"),
+            [{'ledger_id': DEFAULT_LEDGER_ID, 'name': name, 'budget_amount': DEFAULT_CATEGORY_BUDGET,
+              'is_active': True, 'created_at': datetime.utcnow()} for name in DEFAULT_CATEGORIES]
+        )
 
-# Enable WAL mode for better concurrency
-with app.app_context():
-    try:
-        with db.engine.connect() as conn:
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            print("WAL mode enabled for better concurrency")
-    except Exception as e:
-        print(f"Note: Could not enable WAL mode: {e}")
+def run_migrations():
+    """Apply the pending migrations with foreign key enforcement off
+
+    Some migrations rebuild a table that others reference, which SQLite
+    only allows without enforcement, and the pragma cannot change inside a
+    transaction. Foreign keys are checked before committing, and the
+    connection is then discarded so that the pool reopens it with the
+    configured pragmas.
+    """
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+        try:
+            for version, description in migrate(conn):
+                print(f"Applied migration {version}: {description}")
+            violations = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if violations:
+                raise RuntimeError(f"Migration left {len(violations)} rows with a broken foreign key")
+            conn.commit()
+        finally:
+            conn.invalidate()
 
 def db_operation_with_retry(operation, max_retries=3):
     """Execute a database operation with retry logic"""
@@ -88,6 +239,88 @@ def db_operation_with_retry(operation, max_retries=3):
             else:
                 raise
 
+def run_write_group(app, operations):
+    """Run a group of queued writes in one transaction on the writer thread
+
+    If the shared commit fails, the group is rolled back and each write is
+    retried in its own transaction so that one bad write fails alone.
+    """
+    with app.app_context():
+        try:
+            results = [(operation(), None) for operation in operations]
+            db.session.commit()
+            return results
+        except Exception:
+            db.session.rollback()
+
+        results = []
+        for operation in operations:
+            try:
+                result = operation()
+                db.session.commit()
+                results.append((result, None))
+            except Exception as e:
+                db.session.rollback()
+                results.append((None, e))
+        return results
+
+def deliver_budget_alerts(app, alert_sink):
+    """Send one batch of pending budget alerts to the sink, on the dispatcher thread
+
+    Only marking the batch delivered writes, and it goes through run_write
+    like every other write.
+    """
+    with app.app_context():
+        def mark_delivered(last_id):
+            run_write(lambda: mark_alerts_delivered(db.session.connection(), last_id))
+        with db.engine.connect() as conn:
+            return deliver_pending_alerts(conn, alert_sink, mark_delivered)
+
+def run_recurring_expenses(app, today=None, catch_up=None):
+    """Add the due recurring expenses in one transaction, returning how many were added
+
+    Runs on the scheduler thread or from the CLI. Like a bulk import, the
+    rows bypass the session events, so the caches are invalidated here.
+    """
+    if catch_up is None:
+        catch_up = app.config['RECURRING_CATCH_UP']
+    with app.app_context():
+        def materialize_operation():
+            return materialize_due_expenses(
+                db.session.connection(), Expense.__table__, RecurringExpense.__table__,
+                today, catch_up
+            )
+        rows, added = run_write(materialize_operation)
+
+        # Rules may have advanced or ended even when nothing was added
+        summary_cache.invalidate(lambda key: key[1] == 'recurring')
+        rows_by_ledger = {}
+        for row in rows:
+            rows_by_ledger.setdefault(row['ledger_id'], []).append(row)
+        for ledger_id, ledger_rows in rows_by_ledger.items():
+            dates = [row['date'] for row in ledger_rows]
+            invalidate_imported_expenses(
+                ledger_id, {row['category_id'] for row in ledger_rows}, min(dates), max(dates)
+            )
+        if added:
+            app.extensions['alert_dispatcher'].notify()
+    return added
+
+def run_write(operation):
+    """Run a write that does not commit itself and commit it
+
+    Goes through the single-writer queue, so the operation runs on another
+    thread with its own session: it must not use objects loaded by the caller.
+    """
+    if current_app.config['SERIALIZE_WRITES']:
+        return current_app.extensions['write_queue'].submit(operation)
+
+    def operation_with_commit():
+        result = operation()
+        db.session.commit()
+        return result
+    return db_operation_with_retry(operation_with_commit)
+
 def parse_date_or_none(s: str):
     if not s:
         return None
@@ -96,27 +329,289 @@ def parse_date_or_none(s: str):
     except ValueError:
         return None
 
-def get_category_stats(start_date=None, end_date=None):
-    """Get spending statistics for all categories"""
-    categories = CategoryBudget.query.filter_by(is_active=True).all()
+def encode_cursor(row):
+    """Encode the (date, id) position of a row as a URL-safe cursor"""
+    return f"{row.date.isoformat()}_{row.id}"
+
+def decode_cursor(cursor: str):
+    """Decode a cursor into a (date, id) tuple, or None if it is invalid"""
+    if not cursor:
+        return None
+    try:
+        date_part, id_part = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except ValueError:
+        return None
+
+def paginate_keyset(query, model, after=None, before=None, per_page=PAGE_SIZE):
+    """Fetch one page of rows ordered by (date desc, id desc) using keyset pagination
+
+    `after` continues past the given cursor (next page) and `before` goes back
+    to the rows preceding it (previous page). Only per_page + 1 rows are read,
+    so the cost of a page does not grow with its position or the table size.
+    Returns (rows, next_cursor, prev_cursor).
+    """
+    after = decode_cursor(after)
+    before = decode_cursor(before) if not after else None
+
+    if before:
+        before_date, before_id = before
+        query = query.filter(or_(
+            model.date > before_date,
+            and_(model.date == before_date, model.id > before_id)
+        ))
+        rows = query.order_by(model.date.asc(), model.id.asc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after:
+            after_date, after_id = after
+            query = query.filter(or_(
+                model.date < after_date,
+                and_(model.date == after_date, model.id < after_id)
+            ))
+        rows = query.order_by(model.date.desc(), model.id.desc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0]) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def fts_query(search):
+    """Turn free text into an FTS5 query matching rows with every word
+
+    Each word is quoted, so FTS5 operators and punctuation typed by the user
+    are searched for rather than interpreted. The last word also matches as
+    a prefix, for results while typing. Returns "" if nothing is left.
+    """
+    words = ['"{}"'.format(word.replace('"', '""'))
+             for word in search.split() if any(ch.isalnum() for ch in word)]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+def parse_page(page_str):
+    """Parse a 1-based page number, defaulting to the first page"""
+    try:
+        return max(int(page_str), 1)
+    except (TypeError, ValueError):
+        return 1
+
+def paginate_search(query, model, fts, search, page=1, per_page=PAGE_SIZE):
+    """Fetch one page of the rows of query whose description matches search, best match first
+
+    The full-text index lists the matches newest first and query filters
+    them; the first SEARCH_CANDIDATES left are then ordered by rank, ties
+    going to the newest row. Ranks are offsets rather than keys, so pages
+    are numbered. Returns (rows, next_page, prev_page), page numbers being
+    None at either end.
+    """
+    candidates = query.join(fts, fts.c.rowid == model.id).filter(
+        literal_column(fts.name).op('MATCH')(fts_query(search))
+    ).with_entities(
+        model.id.label('id'), fts.c.rank.label('rank')
+    ).order_by(fts.c.rowid.desc()).limit(SEARCH_CANDIDATES).subquery()
+    rows = model.query.join(candidates, candidates.c.id == model.id).order_by(
+        candidates.c.rank, model.id.desc()
+    ).offset((page - 1) * per_page).limit(per_page + 1).all()
+    next_page = page + 1 if len(rows) > per_page else None
+    prev_page = page - 1 if page > 1 else None
+    return rows[:per_page], next_page, prev_page
+
+@bp.app_template_global()
+def page_url(**changes):
+    """Build a URL to the current page with some query parameters replaced"""
+    args = request.args.to_dict()
+    for key, value in changes.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    return url_for(request.endpoint, **args)
+
+@lru_cache(maxsize=4096)
+def parse_form_date(date_str):
+    """Parse a YYYY-MM-DD date, memoized since bulk imports repeat dates"""
+    return datetime.strptime(date_str, "%Y-%m-%d")
+
+def get_category_ids(ledger_id):
+    """Map the ledger's category names to ids, from the cached category list"""
+    categories = summary_cache.get_or_load(
+        (ledger_id, 'categories'), lambda: get_category_rows(ledger_id)
+    )
+    return {category.name: category.id for category in categories}
+
+def validate_expense_input(description, amount_str, category, date_str, strict_date=False,
+                           category_ids=None):
+    """Validate raw expense fields, shared by the add form and bulk imports
+
+    Returns (values, warning) where values holds the Expense columns. Raises
+    ValueError with a user-facing message. An invalid date falls back to
+    today with a warning, unless strict_date is set. category_ids maps
+    category names to ids and is looked up in the current ledger when not
+    given. The caller adds the ledger_id.
+    """
+    description = (description or "").strip()
+    amount_str = (amount_str or "").strip()
+    category = (category or "").strip()
+    date_str = (date_str or "").strip()
+
+    # Validate required fields
+    if not description or not amount_str or not category:
+        raise ValueError("Description, amount, and category are required!")
+
+    # Validate and convert amount
+    try:
+        amount = parse_amount(amount_str)
+    except ValueError:
+        raise ValueError("Invalid amount. Please enter a positive number.")
+    if amount <= 0:
+        raise ValueError("Amount must be positive.")
+
+    if category_ids is None:
+        category_ids = get_category_ids(g.ledger_id)
+    if category not in category_ids:
+        raise ValueError(f"Unknown category '{category}'.")
+
+    # Handle date
+    warning = None
+    try:
+        if date_str:
+            expense_date = parse_form_date(date_str)
+        else:
+            expense_date = datetime.today()
+    except ValueError:
+        if strict_date:
+            raise ValueError(f"Invalid date '{date_str}', expected YYYY-MM-DD.")
+        warning = "Invalid date format. Using today's date."
+        expense_date = datetime.today()
+
+    values = {
+        'description': description,
+        'amount': amount,
+        'category_id': category_ids[category],
+        'date': expense_date
+    }
+    return values, warning
+
+def date_range_condition(column, start_date=None, end_date=None):
+    """Build the SQL condition for an optional date range, inclusive of the whole end day"""
+    conditions = []
+    if start_date:
+        conditions.append(column >= start_date)
+    if end_date:
+        # The day after 9999-12-31 cannot be represented
+        if end_date.date() < date.max:
+            conditions.append(column < end_date + timedelta(days=1))
+        else:
+            conditions.append(column <= datetime.max)
+    return and_(true(), *conditions)
+
+def day_range_condition(column, start_date=None, end_date=None):
+    """Build the SQL condition for an optional inclusive range on a Date column"""
+    conditions = []
+    if start_date:
+        conditions.append(column >= start_date.date())
+    if end_date:
+        conditions.append(column <= end_date.date())
+    return and_(true(), *conditions)
+
+def get_category_totals(ledger_id, start_date=None, end_date=None):
+    """Get per-category totals in a single grouped query over the daily rollup
+
+    Returns {category_id: (total, count)} for every category of the ledger
+    with expenses in the date range. The rollup's primary key leads with
+    (ledger_id, day), so only the ledger's rows in the range are read.
+    """
+    rows = db.session.query(
+        ExpenseRollup.category_id,
+        func.sum(ExpenseRollup.total),
+        func.sum(ExpenseRollup.count)
+    ).filter(
+        ExpenseRollup.ledger_id == ledger_id,
+        day_range_condition(ExpenseRollup.day, start_date, end_date)
+    ).group_by(ExpenseRollup.category_id).all()
+
+    return {category_id: (total or ZERO, count) for category_id, total, count in rows}
+
+def get_budget_spend(ledger_id):
+    """Get the running {category_id: (spent, count)} of the ledger's categories with expenses
+
+    Read from the trigger-maintained counters, one row per category, so it
+    costs the same however many expenses exist. These are the all-time
+    totals that budgets are compared against.
+    """
+    rows = db.session.query(
+        BudgetSpend.category_id, BudgetSpend.spent, BudgetSpend.count
+    ).filter(BudgetSpend.ledger_id == ledger_id, BudgetSpend.count > 0).all()
+    return {category_id: (spent, count) for category_id, spent, count in rows}
+
+def get_category_rows(ledger_id):
+    """Get every category of the ledger with its usage flags in a single query
+
+    has_expenses or has_recurring means the category is referenced by an
+    expense or a recurring rule, so it can only be deactivated.
+    """
+    has_expenses = db.session.query(ExpenseRollup.day).filter(
+        ExpenseRollup.category_id == CategoryBudget.id
+    ).exists()
+    has_recurring = db.session.query(RecurringExpense.id).filter(
+        RecurringExpense.category_id == CategoryBudget.id
+    ).exists()
+    return db.session.query(
+        CategoryBudget.id,
+        CategoryBudget.name,
+        CategoryBudget.budget_amount,
+        CategoryBudget.is_active,
+        has_expenses.label('has_expenses'),
+        has_recurring.label('has_recurring')
+    ).filter(CategoryBudget.ledger_id == ledger_id).order_by(CategoryBudget.id).all()
+
+def get_recurring_rows(ledger_id):
+    """Get the active recurring expense rules of the ledger with their category names"""
+    return db.session.query(
+        RecurringExpense.id,
+        RecurringExpense.description,
+        RecurringExpense.amount,
+        RecurringExpense.frequency,
+        RecurringExpense.interval,
+        RecurringExpense.next_due,
+        RecurringExpense.end_date,
+        CategoryBudget.name.label('category')
+    ).join(CategoryBudget, CategoryBudget.id == RecurringExpense.category_id).filter(
+        RecurringExpense.ledger_id == ledger_id, RecurringExpense.is_active
+    ).order_by(RecurringExpense.next_due, RecurringExpense.id).all()
+
+def get_ledger_rows():
+    """Get the (id, name) of every ledger"""
+    return db.session.query(Ledger.id, Ledger.name).order_by(Ledger.id).all()
+
+def get_category_stats(ledger_id, start_date=None, end_date=None, categories=None,
+                       category_totals=None):
+    """Get spending statistics for all categories of a ledger"""
+    if categories is None:
+        categories = CategoryBudget.query.filter_by(ledger_id=ledger_id, is_active=True).all()
+    if category_totals is None:
+        category_totals = get_category_totals(ledger_id, start_date, end_date)
     category_stats = {}
     
     for category in categories:
-        # Calculate total expenses for this category
-        expense_q = Expense.query.filter(Expense.category == category.name)
-        if start_date:
-            expense_q = expense_q.filter(Expense.date >= start_date)
-        if end_date:
-            expense_q = expense_q.filter(Expense.date <= end_date)
-        
-        total_expenses = expense_q.with_entities(func.sum(Expense.amount)).scalar() or 0
+        if not category.is_active:
+            continue
+
+        # Exact Decimal amounts; only the percentage is a float
+        total_expenses = category_totals.get(category.id, (ZERO, 0))[0]
         remaining = category.budget_amount - total_expenses
-        percentage_used = (total_expenses / category.budget_amount * 100) if category.budget_amount > 0 else 0
+        percentage_used = (float(total_expenses / category.budget_amount * 100)
+                           if category.budget_amount > 0 else 0)
         
         category_stats[category.name] = {
             'budget': category,
-            'total_expenses': round(total_expenses, 2),
-            'remaining': round(remaining, 2),
+            'total_expenses': total_expenses,
+            'remaining': remaining,
             'percentage_used': round(percentage_used, 2),
             'over_budget': remaining < 0,
             'is_active': remaining > 0 and category.is_active  # Hide from dropdown if budget exhausted
@@ -124,8 +619,290 @@ def get_category_stats(start_date=None, end_date=None):
     
     return category_stats
 
-@app.route("/")
-def index():
+def signed_saving_amount():
+    """Deposits count positive and withdrawals negative"""
+    return case((Saving.type == 'deposit', Saving.amount), else_=-Saving.amount)
+
+def get_savings_total(ledger_id):
+    """Get the ledger's savings balance (deposits minus withdrawals) in SQL"""
+    return db.session.query(func.sum(signed_saving_amount())).filter(
+        Saving.ledger_id == ledger_id
+    ).scalar() or ZERO
+
+def get_savings_balance_series(ledger_id, bucket='day'):
+    """Get the (labels, values) of the savings balance at the end of each bucket
+
+    Savings are summed per bucket and a window function accumulates the
+    sums into a running balance, all in one query returning a row per bucket.
+    """
+    expression, label_format = SAVINGS_BUCKETS[bucket]
+    period = literal_column(expression.format(Saving.date.name)).label('period')
+    balance = func.sum(func.sum(signed_saving_amount())).over(order_by=period)
+
+    rows = db.session.query(period, balance).filter(
+        Saving.ledger_id == ledger_id
+    ).group_by(period).order_by(period).all()
+    labels = [date.fromisoformat(p).strftime(label_format) for p, _ in rows]
+    values = [b or ZERO for _, b in rows]
+    return labels, values
+
+def get_day_series(ledger_id, start_date=None, end_date=None, category_id=None):
+    """Get the (labels, values) of the spending-per-day chart from the daily rollup"""
+    day_q = db.session.query(ExpenseRollup.day, func.sum(ExpenseRollup.total)).filter(
+        ExpenseRollup.ledger_id == ledger_id,
+        day_range_condition(ExpenseRollup.day, start_date, end_date)
+    )
+    if category_id is not None:
+        day_q = day_q.filter(ExpenseRollup.category_id == category_id)
+
+    day_rows = day_q.group_by(ExpenseRollup.day).order_by(ExpenseRollup.day).all()
+    day_labels = [d.strftime("%b %d") for d, _ in day_rows]
+    day_values = [s or ZERO for _, s in day_rows]
+    return day_labels, day_values
+
+# Cached aggregates, keyed by ledger first: the category list, budget spend
+# and savings balance are per ledger, the category totals also depend on the
+# date range and the day chart also on the selected category id (None for
+# all). The savings balance series is keyed by bucket and the analytics by
+# date range and granularity. Writes drop only the entries of their ledger
+# that they affect.
+summary_cache = LRUCache('summary', maxsize=AGGREGATE_CACHE_SIZE)
+totals_cache = LRUCache('category_totals', maxsize=AGGREGATE_CACHE_SIZE)
+series_cache = LRUCache('day_series', maxsize=AGGREGATE_CACHE_SIZE)
+savings_series_cache = LRUCache('savings_series', maxsize=AGGREGATE_CACHE_SIZE)
+analytics_cache = LRUCache('analytics', maxsize=AGGREGATE_CACHE_SIZE)
+ledger_cache = LRUCache('ledgers', maxsize=1)
+AGGREGATE_CACHES = (summary_cache, totals_cache, series_cache, savings_series_cache,
+                    analytics_cache, ledger_cache)
+
+def get_dashboard_aggregates(ledger_id, start_date=None, end_date=None, selected_category="",
+                             include_day_series=True):
+    """Compute every dashboard aggregate, served from cache when possible
+
+    On a cold cache this is a fixed number of grouped queries that does not
+    depend on how many categories, expenses or savings exist: one for the
+    category list, one grouped by category, one grouped by day and one for
+    the savings balance. A warm cache answers without touching the database.
+    Every query reads only the ledger's rows, through indexes that lead with
+    the ledger, so other ledgers do not slow it down.
+
+    Without a date range the per-category totals are the budget spend
+    counters, which also give budget_stats, the budget state used to hide
+    exhausted categories whatever the range.
+    """
+    all_categories = summary_cache.get_or_load(
+        (ledger_id, 'categories'), lambda: get_category_rows(ledger_id)
+    )
+    category_names = {category.id: category.name for category in all_categories}
+    selected_id = None
+    if selected_category:
+        # An unknown category matches no expenses
+        selected_id = next((category_id for category_id, name in category_names.items()
+                            if name == selected_category), -1)
+
+    budget_spend = summary_cache.get_or_load(
+        (ledger_id, 'budget_spend'), lambda: get_budget_spend(ledger_id)
+    )
+    if start_date or end_date:
+        category_totals = totals_cache.get_or_load(
+            (ledger_id, start_date, end_date),
+            lambda: get_category_totals(ledger_id, start_date, end_date)
+        )
+    else:
+        category_totals = budget_spend
+    day_labels = day_values = []
+    if include_day_series:
+        day_labels, day_values = series_cache.get_or_load(
+            (ledger_id, start_date, end_date, selected_id),
+            lambda: get_day_series(ledger_id, start_date, end_date, selected_id)
+        )
+    savings_total = summary_cache.get_or_load(
+        (ledger_id, 'savings_total'), lambda: get_savings_total(ledger_id)
+    )
+
+    # Category chart and overall total come from the same grouped rows
+    cat_labels = []
+    cat_values = []
+    total = ZERO
+    for category_id, (amount, _) in category_totals.items():
+        if selected_id is not None and category_id != selected_id:
+            continue
+        cat_labels.append(category_names.get(category_id, ""))
+        cat_values.append(amount)
+        total += amount
+
+    # Check if categories have expenses for the delete confirmation message
+    categories_with_expenses = {
+        category.id: bool(category.has_expenses) for category in all_categories
+    }
+
+    category_stats = get_category_stats(ledger_id, start_date, end_date, all_categories,
+                                        category_totals)
+    budget_stats = category_stats
+    if category_totals is not budget_spend:
+        budget_stats = get_category_stats(ledger_id, categories=all_categories,
+                                          category_totals=budget_spend)
+
+    return {
+        'all_categories': all_categories,
+        'category_stats': category_stats,
+        'budget_stats': budget_stats,
+        'categories_with_expenses': categories_with_expenses,
+        'total': total,
+        'cat_labels': cat_labels,
+        'cat_values': cat_values,
+        'day_labels': day_labels,
+        'day_values': day_values,
+        'savings_total': savings_total,
+    }
+
+def invalidate_expense_aggregates(ledger_id, category_id, expense_date):
+    """Drop the cached aggregates that include an expense of this ledger, category and date"""
+    expense_day = expense_date.date()
+
+    def in_range(key_ledger_id, start_date, end_date):
+        return (key_ledger_id == ledger_id and
+                (start_date is None or start_date.date() <= expense_day) and
+                (end_date is None or expense_day <= end_date.date()))
+
+    totals_cache.invalidate(lambda key: in_range(*key))
+    series_cache.invalidate(
+        lambda key: in_range(key[0], key[1], key[2]) and key[3] in (None, category_id)
+    )
+    # Comparisons and trends reach outside their range, so any expense counts
+    analytics_cache.invalidate(lambda key: key[0] == ledger_id)
+    summary_cache.invalidate(lambda key: key == (ledger_id, 'budget_spend'))
+
+def invalidate_imported_expenses(ledger_id, category_ids=None, first_date=None, last_date=None):
+    """Drop the cached aggregates of the ledger that bulk-inserted expenses may affect
+
+    Without a date span every range-dependent entry of the ledger is dropped.
+    """
+    def overlaps(key_ledger_id, start_date, end_date):
+        if key_ledger_id != ledger_id:
+            return False
+        if first_date is None:
+            return True
+        return ((start_date is None or start_date.date() <= last_date.date()) and
+                (end_date is None or first_date.date() <= end_date.date()))
+
+    totals_cache.invalidate(lambda key: overlaps(*key))
+    series_cache.invalidate(
+        lambda key: overlaps(key[0], key[1], key[2]) and
+        (category_ids is None or key[3] in category_ids | {None})
+    )
+    analytics_cache.invalidate(lambda key: key[0] == ledger_id)
+    summary_cache.invalidate(lambda key: key in ((ledger_id, 'categories'), (ledger_id, 'budget_spend')))
+
+@event.listens_for(db.session, 'after_flush')
+def collect_dashboard_changes(session, flush_context):
+    """Remember which aggregates the flushed writes affect until they commit"""
+    changes = session.info.setdefault('dashboard_changes', set())
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            changes.add(('expense', obj.ledger_id, obj.category_id, obj.date))
+            changes.add(('category_added_to', obj.ledger_id, obj.category_id))
+        elif isinstance(obj, RecurringExpense):
+            # Rules are stopped, never deleted, so only a new one sets has_recurring
+            changes.add(('categories', obj.ledger_id))
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            changes.add(('expense', obj.ledger_id, obj.category_id, obj.date))
+            changes.add(('categories', obj.ledger_id))
+    for obj in session.dirty:
+        if isinstance(obj, Expense):
+            state = inspect(obj)
+            old_category_id = (state.attrs.category_id.history.deleted or [obj.category_id])[0]
+            old_date = (state.attrs.date.history.deleted or [obj.date])[0]
+            changes.add(('expense', obj.ledger_id, old_category_id, old_date))
+            changes.add(('expense', obj.ledger_id, obj.category_id, obj.date))
+            if old_category_id != obj.category_id:
+                changes.add(('categories', obj.ledger_id))
+
+    for obj in session.new | session.deleted | session.dirty:
+        if isinstance(obj, Saving):
+            changes.add(('savings', obj.ledger_id))
+        elif isinstance(obj, CategoryBudget):
+            changes.add(('categories', obj.ledger_id))
+        elif isinstance(obj, RecurringExpense):
+            changes.add(('recurring', obj.ledger_id))
+        elif isinstance(obj, Ledger):
+            changes.add(('ledgers',))
+
+@event.listens_for(db.session, 'after_commit')
+def apply_dashboard_changes(session):
+    """Invalidate the cached aggregates touched by the committed writes"""
+    changes = session.info.pop('dashboard_changes', set())
+    if any(change[0] in ('expense', 'categories') for change in changes):
+        # The write may have pushed a category over an alert threshold
+        current_app.extensions['alert_dispatcher'].notify()
+    for change in changes:
+        if change[0] == 'expense':
+            invalidate_expense_aggregates(change[1], change[2], change[3])
+        elif change[0] == 'category_added_to':
+            # Only the has_expenses flag of a category's first expense changes the list
+            key = (change[1], 'categories')
+            categories = summary_cache.peek(key) or []
+            if any(c.id == change[2] and not c.has_expenses for c in categories):
+                summary_cache.invalidate(lambda k: k == key)
+        elif change[0] == 'categories':
+            summary_cache.invalidate(lambda key: key == (change[1], 'categories'))
+        elif change[0] == 'savings':
+            summary_cache.invalidate(lambda key: key == (change[1], 'savings_total'))
+            savings_series_cache.invalidate(lambda key: key[0] == change[1])
+        elif change[0] == 'recurring':
+            summary_cache.invalidate(lambda key: key == (change[1], 'recurring'))
+        elif change[0] == 'ledgers':
+            ledger_cache.invalidate()
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_dashboard_changes(session):
+    session.info.pop('dashboard_changes', None)
+
+@bp.cli.command("rebuild-rollup")
+def rebuild_rollup_command():
+    """Recompute the daily expense rollup and budget spend from the expense table"""
+    with db.engine.begin() as conn:
+        rebuild_expense_rollup(conn)
+        rebuild_budget_spend(conn)
+    for cache in AGGREGATE_CACHES:
+        cache.invalidate()
+    print("Expense rollup and budget spend rebuilt")
+
+@bp.route("/cache-stats")
+def cache_stats():
+    """Hit/miss counters of the dashboard aggregate caches"""
+    stats = {cache.name: cache.stats() for cache in AGGREGATE_CACHES}
+    stats['write_queue'] = current_app.extensions['write_queue'].stats()
+    stats['budget_alerts'] = current_app.extensions['alert_dispatcher'].stats()
+    stats['recurring'] = current_app.extensions['recurring_scheduler'].stats()
+    return jsonify(stats)
+
+@bp.route("/metrics")
+def metrics():
+    """Per-route request metrics in Prometheus text format"""
+    return Response(current_app.extensions['profiler'].render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@bp.before_request
+def load_current_ledger():
+    """Scope the request to the ledger chosen in the session, the default one if none"""
+    ledger_id = session.get('ledger_id', DEFAULT_LEDGER_ID)
+    ledgers = ledger_cache.get_or_load('ledgers', get_ledger_rows)
+    if not any(ledger.id == ledger_id for ledger in ledgers):
+        ledger_id = DEFAULT_LEDGER_ID
+    g.ledger_id = ledger_id
+
+def get_or_404_in_ledger(model, row_id):
+    """Load a row of the current ledger; rows of other ledgers are not found"""
+    return model.query.filter_by(id=row_id, ledger_id=g.ledger_id).first_or_404()
+
+def get_expense_filters():
+    """Read the start/end/category filters shared by the dashboard and exports
+
+    Returns (start_str, end_str, selected_category, start_date, end_date, error).
+    An end date earlier than the start date resets both dates and sets error.
+    """
     # Safely get query parameters
     start_str = (request.args.get("start") or "").strip()
     end_str = (request.args.get("end") or "").strip()
@@ -135,100 +912,352 @@ def index():
     start_date = parse_date_or_none(start_str)
     end_date = parse_date_or_none(end_str)
 
-    # Start building query
-    q = Expense.query
-
     # Validate date range
+    error = None
     if start_date and end_date and end_date < start_date:
-        flash("End date cannot be earlier than start date.", "error")
+        error = "End date cannot be earlier than start date."
         # Reset invalid dates
         start_date = end_date = None
         start_str = end_str = ""
 
-    # Apply filters
-    if start_date:
-        q = q.filter(Expense.date >= start_date)
-    if end_date:
-        q = q.filter(Expense.date <= end_date)
-    if selected_category:
-        q = q.filter(Expense.category == selected_category)
-
-    # Fetch data
-    expenses = q.order_by(Expense.date.desc(), Expense.id.desc()).all()
-    total = round(sum(e.amount for e in expenses), 2)
-
-    # Get category statistics
-    category_stats = get_category_stats(start_date, end_date)
-    
-    # Get active categories for dropdown (where budget is not exhausted)
-    active_categories = [cat for cat, stats in category_stats.items() if stats['is_active']]
-
-    # Get savings data
-    savings = Saving.query.order_by(Saving.date.desc(), Saving.id.desc()).all()
-    
-    # Calculate savings total
-    savings_total = 0
-    for saving in savings:
-        if saving.type == 'deposit':
-            savings_total += saving.amount
-        else:  # withdrawal
-            savings_total -= saving.amount
-
-    # Charts data
-    cat_q = db.session.query(Expense.category, func.sum(Expense.amount))
-    if start_date:
-        cat_q = cat_q.filter(Expense.date >= start_date)
-    if end_date:
-        cat_q = cat_q.filter(Expense.date <= end_date)
-    if selected_category:
-        cat_q = cat_q.filter(Expense.category == selected_category)
+    return start_str, end_str, selected_category, start_date, end_date, error
 
-    # Day chart
-    day_q = db.session.query(Expense.date, func.sum(Expense.amount))
-    if start_date:
-        day_q = day_q.filter(Expense.date >= start_date)
-    if end_date:
-        day_q = day_q.filter(Expense.date <= end_date)
+def expense_filter_condition(ledger_id, start_date=None, end_date=None, selected_category=""):
+    """Build the SQL condition for the dashboard expense filters within a ledger"""
+    condition = and_(
+        Expense.ledger_id == ledger_id, date_range_condition(Expense.date, start_date, end_date)
+    )
     if selected_category:
-        day_q = day_q.filter(Expense.category == selected_category)
+        category_id = select(CategoryBudget.id).where(
+            CategoryBudget.ledger_id == ledger_id, CategoryBudget.name == selected_category
+        ).scalar_subquery()
+        condition = and_(condition, Expense.category_id == category_id)
+    return condition
 
-    day_rows = day_q.group_by(Expense.date).order_by(Expense.date).all() 
-    day_labels = [d.strftime("%b %d") for d, _ in day_rows]  
-    day_values = [round(float(s or 0), 2) for _, s in day_rows]
+@bp.route("/")
+def index():
+    """The dashboard shell: filters, forms and the cached category lists
 
-    cat_rows = cat_q.group_by(Expense.category).all() 
-    cat_labels = [c for c, _ in cat_rows]
-    cat_values = [round(float(s or 0), 2) for _, s in cat_rows]
+    Every panel that depends on the filters or grows with the data (totals,
+    charts, category stats, the expense and savings lists) loads from its
+    JSON endpoint after the page renders, all in parallel, so the shell
+    costs the same however many rows there are.
+    """
+    start_str, end_str, selected_category, _, _, error = get_expense_filters()
+    if error:
+        flash(error, "error")
+    search = (request.args.get("q") or "").strip()
 
-    # Check if categories have expenses for the delete confirmation message
-    categories_with_expenses = {}
-    all_categories = CategoryBudget.query.all()
-    for category in all_categories:
-        has_expenses = Expense.query.filter_by(category=category.name).first() is not None
-        categories_with_expenses[category.id] = has_expenses
+    ledger_id = g.ledger_id
+    all_categories = summary_cache.get_or_load(
+        (ledger_id, 'categories'), lambda: get_category_rows(ledger_id)
+    )
+    budget_spend = summary_cache.get_or_load(
+        (ledger_id, 'budget_spend'), lambda: get_budget_spend(ledger_id)
+    )
+    # Get active categories for dropdown (where budget is not exhausted)
+    budget_stats = get_category_stats(ledger_id, categories=all_categories,
+                                      category_totals=budget_spend)
+    active_categories = [cat for cat, stats in budget_stats.items() if stats['is_active']]
 
     # Render page
     return render_template(
         "index.html",
+        ledgers=ledger_cache.get_or_load('ledgers', get_ledger_rows),
+        current_ledger_id=ledger_id,
         categories=active_categories,
-        all_categories=all_categories,
-        category_stats=category_stats,
-        categories_with_expenses=categories_with_expenses,
+        alert_thresholds=sorted(set(current_app.config['BUDGET_ALERT_THRESHOLDS'])),
         today_str=date.today().isoformat(),
-        expenses=expenses,
-        savings=savings,
-        savings_total=savings_total,
-        total=total,
+        recurring=summary_cache.get_or_load(
+            (ledger_id, 'recurring'), lambda: get_recurring_rows(ledger_id)
+        ),
+        frequencies=FREQUENCIES,
         start_str=start_str,
         end_str=end_str,
-        cat_labels=cat_labels,
-        cat_values=cat_values,
         selected_category=selected_category,
-        day_labels=day_labels,
-        day_values=day_values
+        search=search,
+        search_ranked=bool(fts_query(search))
     )
 
-@app.route("/add-saving", methods=["POST"])
+def panel_etag(tables):
+    """ETag of a JSON panel: the latest change to the tables it reads plus its query
+
+    change_log is written by triggers on every write path, so one indexed
+    MAX(id) lookup per table and ledger tells whether the panel can have
+    changed; writes to other ledgers leave it alone.
+    """
+    versions = db.session.query(*(
+        select(func.max(ChangeLog.id)).where(
+            ChangeLog.table_name == table, ChangeLog.ledger_id == g.ledger_id
+        ).scalar_subquery()
+        for table in tables
+    )).one()
+    key = (f"{request.path}?{sorted(request.args.items(multi=True))}|{g.ledger_id}|"
+           f"{tuple(versions)}")
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+def json_panel(*tables):
+    """Serve a JSON panel with an ETag, answering 304 before computing it if unchanged"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = panel_etag(tables)
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                # Views return a dict, or (dict, status) for errors
+                result = view(*args, **kwargs)
+                body, status = result if isinstance(result, tuple) else (result, 200)
+                response = make_response(jsonify(body), status)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
+
+def serialize_expense(expense):
+    return {
+        'id': expense.id,
+        'date': expense.date.strftime("%Y-%m-%d"),
+        'description': expense.description,
+        'category': expense.category.name,
+        'amount': expense.amount
+    }
+
+def serialize_saving(saving):
+    return {
+        'id': saving.id,
+        'date': saving.date.strftime("%Y-%m-%d"),
+        'description': saving.description,
+        'type': saving.type,
+        'amount': saving.amount
+    }
+
+@bp.route("/api/charts")
+@json_panel('expense')
+def api_charts():
+    """Category and per-day chart series for the current filters"""
+    _, _, selected_category, start_date, end_date, _ = get_expense_filters()
+    aggregates = get_dashboard_aggregates(g.ledger_id, start_date, end_date, selected_category)
+    return {key: aggregates[key] for key in
+            ('total', 'cat_labels', 'cat_values', 'day_labels', 'day_values')}
+
+@bp.route("/api/analytics")
+@json_panel('expense', 'category_budget')
+def api_analytics():
+    """Period-over-period totals, rolling average and category forecasts for the date range
+
+    granularity is week or month. Each period is compared with the one
+    before and with the same period a year earlier.
+    """
+    granularity = request.args.get("granularity") or "month"
+    if granularity not in GRANULARITIES:
+        return {"error": f"Unknown granularity '{granularity}', expected week or month"}, 400
+    _, _, _, start_date, end_date, _ = get_expense_filters()
+    ledger_id = g.ledger_id
+    analytics = analytics_cache.get_or_load(
+        (ledger_id, start_date, end_date, granularity),
+        lambda: get_spending_analytics(
+            db.session, ExpenseRollup.__table__, ledger_id, granularity,
+            start_date.date() if start_date else None, end_date.date() if end_date else None
+        )
+    )
+    categories = summary_cache.get_or_load(
+        (ledger_id, 'categories'), lambda: get_category_rows(ledger_id)
+    )
+    forecasts = analytics['forecast']['categories']
+    return {
+        **analytics,
+        'forecast': {
+            'labels': analytics['forecast']['labels'],
+            'categories': [
+                {'name': category.name, **forecasts[category.id]}
+                for category in categories if category.id in forecasts
+            ],
+        },
+    }
+
+@bp.route("/api/category-stats")
+@json_panel('expense', 'category_budget', 'recurring_expense')
+def api_category_stats():
+    """Budget usage of every category for the current date range"""
+    _, _, _, start_date, end_date, _ = get_expense_filters()
+    aggregates = get_dashboard_aggregates(g.ledger_id, start_date, end_date,
+                                          include_day_series=False)
+    category_stats = aggregates['category_stats']
+    budget_stats = aggregates['budget_stats']
+    categories = []
+    for category in aggregates['all_categories']:
+        stats = category_stats.get(category.name, {})
+        categories.append({
+            'id': category.id,
+            'name': category.name,
+            'budget': category.budget_amount,
+            'is_active': bool(category.is_active),
+            'has_expenses': bool(category.has_expenses),
+            'has_recurring': bool(category.has_recurring),
+            'total_expenses': stats.get('total_expenses', ZERO),
+            'remaining': stats.get('remaining', category.budget_amount),
+            'percentage_used': stats.get('percentage_used', 0),
+            'over_budget': stats.get('over_budget', False),
+            'available': budget_stats.get(category.name, {}).get('is_active', False)
+        })
+    return {'categories': categories}
+
+@bp.route("/api/budget-alerts")
+@json_panel('expense', 'category_budget')
+def api_budget_alerts():
+    """The most recent budget threshold alerts of the ledger, newest first
+
+    Budgets have no period: a category's budget covers all of its expenses,
+    as on the dashboard, and budget_spend keeps one all-time total per
+    category. So each threshold alerts once, not once a month. It fires
+    again only if spending falls back below it (an expense is deleted or
+    moved) or the budget is raised, and then crosses it again.
+    """
+    rows = db.session.query(BudgetAlert, CategoryBudget.name).join(
+        CategoryBudget, CategoryBudget.id == BudgetAlert.category_id
+    ).filter(
+        CategoryBudget.ledger_id == g.ledger_id
+    ).order_by(BudgetAlert.id.desc()).limit(RECENT_ALERTS).all()
+    return {'alerts': [{
+        'id': alert.id,
+        'category': name,
+        'threshold': alert.threshold,
+        'spent': alert.spent,
+        'budget': alert.budget_amount,
+        'created_at': alert.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+    } for alert, name in rows]}
+
+@bp.route("/api/savings")
+@json_panel('saving')
+def api_savings():
+    """Savings balance and one page of savings records"""
+    ledger_id = g.ledger_id
+    savings, savings_next, savings_prev = paginate_keyset(
+        Saving.query.filter_by(ledger_id=ledger_id), Saving,
+        after=request.args.get("after"),
+        before=request.args.get("before")
+    )
+    return {
+        'total': summary_cache.get_or_load(
+            (ledger_id, 'savings_total'), lambda: get_savings_total(ledger_id)
+        ),
+        'items': [serialize_saving(saving) for saving in savings],
+        'next': savings_next,
+        'prev': savings_prev
+    }
+
+@bp.route("/api/savings-balance")
+@json_panel('saving')
+def api_savings_balance():
+    """Running savings balance per day, week or month"""
+    bucket = request.args.get("bucket") or "day"
+    if bucket not in SAVINGS_BUCKETS:
+        return {"error": f"Unknown bucket '{bucket}'"}, 400
+    ledger_id = g.ledger_id
+    labels, values = savings_series_cache.get_or_load(
+        (ledger_id, bucket), lambda: get_savings_balance_series(ledger_id, bucket)
+    )
+    return {'bucket': bucket, 'labels': labels, 'values': values}
+
+@bp.route("/api/expenses")
+@json_panel('expense')
+def api_expenses():
+    """One page of the filtered expenses"""
+    _, _, selected_category, start_date, end_date, _ = get_expense_filters()
+    expenses, expenses_next, expenses_prev = paginate_keyset(
+        Expense.query.filter(
+            expense_filter_condition(g.ledger_id, start_date, end_date, selected_category)
+        ),
+        Expense,
+        after=request.args.get("after"),
+        before=request.args.get("before")
+    )
+    return {
+        'items': [serialize_expense(expense) for expense in expenses],
+        'next': expenses_next,
+        'prev': expenses_prev
+    }
+
+@bp.route("/api/search")
+@json_panel('expense', 'saving')
+def api_search():
+    """One page of the expenses or savings whose description matches q, best match first
+
+    Expenses also take the dashboard's date range and category filters,
+    savings the date range.
+    """
+    search = (request.args.get("q") or "").strip()
+    if not fts_query(search):
+        return {"error": "Nothing to search for, pass some words in q"}, 400
+    kind = request.args.get("kind") or "expenses"
+    _, _, selected_category, start_date, end_date, _ = get_expense_filters()
+    page = parse_page(request.args.get("page"))
+
+    if kind == "expenses":
+        query = Expense.query.filter(
+            expense_filter_condition(g.ledger_id, start_date, end_date, selected_category)
+        )
+        rows, next_page, prev_page = paginate_search(query, Expense, expense_fts, search, page)
+        items = [serialize_expense(expense) for expense in rows]
+    elif kind == "savings":
+        query = Saving.query.filter(
+            Saving.ledger_id == g.ledger_id, date_range_condition(Saving.date, start_date, end_date)
+        )
+        rows, next_page, prev_page = paginate_search(query, Saving, saving_fts, search, page)
+        items = [serialize_saving(saving) for saving in rows]
+    else:
+        return {"error": f"Unknown kind '{kind}', expected expenses or savings"}, 400
+    return {
+        'kind': kind,
+        'q': search,
+        'page': page,
+        'items': items,
+        'next': next_page,
+        'prev': prev_page
+    }
+
+@bp.route("/export")
+def export_expenses():
+    """Stream the filtered expenses as CSV, Parquet or Arrow IPC"""
+    _, _, selected_category, start_date, end_date, error = get_expense_filters()
+    if error:
+        return jsonify({"error": error}), 400
+
+    file_format = (request.args.get("format") or "csv").lower()
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown export format '{file_format}'"}), 400
+    if file_format != "csv" and not arrow_available():
+        return jsonify({"error": f"{file_format} export requires pyarrow"}), 501
+
+    columns = {**Expense.__table__.c, 'category': CategoryBudget.name.label('category')}
+    statement = select(*(columns[name] for name in EXPORT_COLUMNS)).join_from(
+        Expense, CategoryBudget, Expense.category_id == CategoryBudget.id
+    ).where(
+        expense_filter_condition(g.ledger_id, start_date, end_date, selected_category)
+    ).order_by(Expense.date, Expense.id)
+
+    def row_chunks():
+        # A dedicated connection with a server-side cursor, read chunk by chunk
+        with db.engine.connect() as conn:
+            result = conn.execution_options(yield_per=EXPORT_CHUNK_SIZE).execute(statement)
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+
+    if file_format == "csv":
+        body = iter_csv(row_chunks())
+    else:
+        body = iter_arrow(row_chunks(), file_format)
+
+    mimetype, extension = EXPORT_FORMATS[file_format]
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=expenses.{extension}"}
+    )
+
+@bp.route("/add-saving", methods=["POST"])
 def add_saving():
     description = (request.form.get("description") or "").strip()
     amount_str = request.form.get("amount") or "0"
@@ -238,17 +1267,17 @@ def add_saving():
     # Validate required fields
     if not description or not amount_str:
         flash("Description and amount are required!", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
     # Validate and convert amount
     try:
-        amount = float(amount_str)
+        amount = parse_amount(amount_str)
         if amount <= 0:
             flash("Amount must be positive.", "error")
-            return redirect(url_for("index"))
+            return redirect(url_for(".index"))
     except ValueError:
         flash("Invalid amount. Please enter a positive number.", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
     # Handle date
     try:
@@ -260,248 +1289,485 @@ def add_saving():
         flash("Invalid date format. Using today's date.", "warning")
         saving_date = datetime.today()
     
-    # Create and save saving with retry logic
+    # Create and save saving through the writer queue
+    ledger_id = g.ledger_id
     def save_operation():
         saving = Saving(
+            ledger_id=ledger_id,
             description=description, 
             amount=amount, 
             date=saving_date,
             type=saving_type
         )
         db.session.add(saving)
-        db.session.commit()
         return True
     
     try:
-        db_operation_with_retry(save_operation)
+        run_write(save_operation)
         flash(f"Savings {saving_type} added successfully", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error saving savings record: {str(e)}", "error")
     
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/delete-saving/<int:saving_id>", methods=["POST"])
+@bp.route("/delete-saving/<int:saving_id>", methods=["POST"])
 def delete_saving(saving_id):
-    saving = Saving.query.get_or_404(saving_id)
+    get_or_404_in_ledger(Saving, saving_id)
     
     def delete_operation():
-        db.session.delete(saving)
-        db.session.commit()
+        saving = db.session.get(Saving, saving_id)
+        if saving is not None:
+            db.session.delete(saving)
         return True
     
     try:
-        db_operation_with_retry(delete_operation)
+        run_write(delete_operation)
         flash("Savings record deleted successfully", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error deleting savings record: {str(e)}", "error")
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/add-category", methods=["POST"])
+@bp.route("/add-category", methods=["POST"])
 def add_category():
     name = (request.form.get("name") or "").strip()
     budget_amount_str = request.form.get("budget_amount") or "0"
     
     if not name:
         flash("Category name is required!", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
     try:
-        budget_amount = float(budget_amount_str)
+        budget_amount = parse_amount(budget_amount_str)
         if budget_amount <= 0:
             flash("Budget amount must be positive.", "error")
-            return redirect(url_for("index"))
+            return redirect(url_for(".index"))
     except ValueError:
         flash("Invalid budget amount.", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
     # Check if category already exists
-    existing_category = CategoryBudget.query.filter_by(name=name).first()
+    existing_category = CategoryBudget.query.filter_by(ledger_id=g.ledger_id, name=name).first()
     if existing_category:
         # Reactivate if exists but inactive
         if not existing_category.is_active:
+            category_id = existing_category.id
             def reactivate_operation():
-                existing_category.is_active = True
-                existing_category.budget_amount = budget_amount
-                db.session.commit()
+                category = db.session.get(CategoryBudget, category_id)
+                category.is_active = True
+                category.budget_amount = budget_amount
                 return True
             
             try:
-                db_operation_with_retry(reactivate_operation)
+                run_write(reactivate_operation)
                 flash(f"Category '{name}' reactivated with budget ${budget_amount:.2f}", "success")
             except Exception as e:
                 db.session.rollback()
                 flash(f"Error reactivating category: {str(e)}", "error")
         else:
             flash(f"Category '{name}' already exists!", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
+    ledger_id = g.ledger_id
     def add_operation():
-        category = CategoryBudget(name=name, budget_amount=budget_amount)
+        category = CategoryBudget(ledger_id=ledger_id, name=name, budget_amount=budget_amount)
         db.session.add(category)
-        db.session.commit()
         return True
     
     try:
-        db_operation_with_retry(add_operation)
+        run_write(add_operation)
         flash(f"Category '{name}' added successfully with budget ${budget_amount:.2f}", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error adding category: {str(e)}", "error")
     
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/edit-category/<int:category_id>", methods=["POST"])
+@bp.route("/edit-category/<int:category_id>", methods=["POST"])
 def edit_category(category_id):
-    category = CategoryBudget.query.get_or_404(category_id)
+    category = get_or_404_in_ledger(CategoryBudget, category_id)
     budget_amount_str = request.form.get("budget_amount") or "0"
+    name = (request.form.get("name") or category.name).strip()
+    
+    # Expenses reference the category by id, so a rename only touches this row;
+    # the sync still resends the category's expenses (see category_rename_triggers)
+    if name != category.name and CategoryBudget.query.filter_by(
+            ledger_id=category.ledger_id, name=name).first():
+        flash(f"Category '{name}' already exists!", "error")
+        return redirect(url_for(".index"))
     
     try:
-        budget_amount = float(budget_amount_str)
+        budget_amount = parse_amount(budget_amount_str)
         if budget_amount <= 0:
             flash("Budget amount must be positive.", "error")
-            return redirect(url_for("index"))
+            return redirect(url_for(".index"))
     except ValueError:
         flash("Invalid budget amount.", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for(".index"))
     
     def update_operation():
+        category = db.session.get(CategoryBudget, category_id)
+        category.name = name
         category.budget_amount = budget_amount
-        db.session.commit()
         return True
     
     try:
-        db_operation_with_retry(update_operation)
-        flash(f"Category '{category.name}' budget updated to ${budget_amount:.2f}", "success")
+        run_write(update_operation)
+        flash(f"Category '{name}' updated with budget ${budget_amount:.2f}", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error updating category: {str(e)}", "error")
     
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/delete-category/<int:category_id>", methods=["POST"])
+@bp.route("/delete-category/<int:category_id>", methods=["POST"])
 def delete_category(category_id):
-    category = CategoryBudget.query.get_or_404(category_id)
-    category_name = category.name
-    
-    # Check if category has expenses
-    has_expenses = Expense.query.filter_by(category=category_name).first() is not None
+    category_name = get_or_404_in_ledger(CategoryBudget, category_id).name
     
+    # Checked on the writer so no reference can be added in between; returns
+    # why the category is kept, or None once it is deleted
     def delete_operation():
-        if has_expenses:
-            # Instead of deleting, deactivate the category
-            category.is_active = False
+        category = db.session.get(CategoryBudget, category_id)
+        if Expense.query.filter_by(category_id=category_id).first() is not None:
+            in_use = "has existing expenses"
+        elif RecurringExpense.query.filter_by(category_id=category_id).first() is not None:
+            # Stopped rules count too: they still reference the category
+            in_use = "has recurring expenses"
         else:
             db.session.delete(category)
-        db.session.commit()
-        return True
+            return None
+        # Instead of deleting, deactivate the category
+        category.is_active = False
+        return in_use
     
     try:
-        db_operation_with_retry(delete_operation)
-        if has_expenses:
-            flash(f"Category '{category_name}' deactivated (has existing expenses)", "warning")
+        in_use = run_write(delete_operation)
+        if in_use:
+            flash(f"Category '{category_name}' deactivated ({in_use})", "warning")
         else:
             flash(f"Category '{category_name}' deleted successfully", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error deleting category: {str(e)}", "error")
     
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/add", methods=["POST"])
+@bp.route("/add", methods=["POST"])
 def add():
-    description = (request.form.get("description") or "").strip()
-    amount_str = request.form.get("amount") or "0"
-    category = (request.form.get("category") or "").strip()
-    date_str = (request.form.get("date") or "").strip()
-
-    # Validate required fields
-    if not description or not amount_str or not category:
-        flash("Description, amount, and category are required!", "error")
-        return redirect(url_for("index"))
-    
-    # Validate and convert amount
-    try:
-        amount = float(amount_str)
-        if amount <= 0:
-            flash("Amount must be positive.", "error")
-            return redirect(url_for("index"))
-    except ValueError:
-        flash("Invalid amount. Please enter a positive number.", "error")
-        return redirect(url_for("index"))
-    
-    # Handle date
     try:
-        if date_str:
-            expense_date = datetime.strptime(date_str, "%Y-%m-%d")
-        else:
-            expense_date = datetime.today()
-    except ValueError:
-        flash("Invalid date format. Using today's date.", "warning")
-        expense_date = datetime.today()
+        values, warning = validate_expense_input(
+            request.form.get("description"),
+            request.form.get("amount") or "0",
+            request.form.get("category"),
+            request.form.get("date")
+        )
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for(".index"))
+
+    if warning:
+        flash(warning, "warning")
     
-    # Create and save expense with retry logic
+    # Create and save expense through the writer queue
+    ledger_id = g.ledger_id
     def add_operation():
-        e = Expense(
-            description=description, 
-            amount=amount, 
-            category=category, 
-            date=expense_date
-        )
+        e = Expense(ledger_id=ledger_id, **values)
         db.session.add(e)
-        db.session.commit()
         return True
     
     try:
-        db_operation_with_retry(add_operation)
+        run_write(add_operation)
         flash("Expense added successfully", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error saving expense: {str(e)}", "error")
     
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
+
+@bp.route("/add-recurring", methods=["POST"])
+def add_recurring():
+    """Add a recurring expense rule starting on the given date
+
+    Occurrences already due are added by the scheduler, which is woken up.
+    """
+    try:
+        values, _ = validate_expense_input(
+            request.form.get("description"),
+            request.form.get("amount") or "0",
+            request.form.get("category"),
+            request.form.get("date"),
+            strict_date=True
+        )
+        end_str = (request.form.get("end_date") or "").strip()
+        end_date = parse_form_date(end_str).date() if end_str else None
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for(".index"))
+
+    frequency = request.form.get("frequency") or "monthly"
+    interval_str = (request.form.get("interval") or "1").strip()
+    if frequency not in FREQUENCIES:
+        flash(f"Unknown frequency '{frequency}'.", "error")
+        return redirect(url_for(".index"))
+    if not interval_str.isdigit() or int(interval_str) < 1:
+        flash("Repeat interval must be a positive whole number.", "error")
+        return redirect(url_for(".index"))
+
+    start_date = values['date'].date()
+    ledger_id = g.ledger_id
+    def add_operation():
+        rule = RecurringExpense(
+            ledger_id=ledger_id,
+            description=values['description'],
+            amount=values['amount'],
+            category_id=values['category_id'],
+            frequency=frequency,
+            interval=int(interval_str),
+            start_date=start_date,
+            end_date=end_date,
+            next_due=start_date
+        )
+        db.session.add(rule)
+        return True
+
+    try:
+        run_write(add_operation)
+        current_app.extensions['recurring_scheduler'].wake()
+        flash(f"Recurring expense '{values['description']}' added", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error adding recurring expense: {str(e)}", "error")
+    return redirect(url_for(".index"))
+
+@bp.route("/stop-recurring/<int:rule_id>", methods=["POST"])
+def stop_recurring(rule_id):
+    """Stop a recurring expense; the expenses it already added are kept"""
+    rule = get_or_404_in_ledger(RecurringExpense, rule_id)
+
+    def stop_operation():
+        db.session.get(RecurringExpense, rule_id).is_active = False
+        return True
+
+    try:
+        run_write(stop_operation)
+        flash(f"Recurring expense '{rule.description}' stopped", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error stopping recurring expense: {str(e)}", "error")
+    return redirect(url_for(".index"))
+
+@bp.cli.command("materialize-recurring")
+@click.option("--today", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Add the occurrences due up to this date (default: today)")
+@click.option("--catch-up/--no-catch-up", default=None,
+              help="Backfill every missed period (default: RECURRING_CATCH_UP)")
+def materialize_recurring_command(today, catch_up):
+    """Add the due occurrences of the recurring expenses in one transaction"""
+    started = time.perf_counter()
+    added = run_recurring_expenses(
+        current_app._get_current_object(), today.date() if today else None, catch_up
+    )
+    print(f"Added {added} recurring expenses in {time.perf_counter() - started:.2f}s")
+
+def insert_expense_batch(rows):
+    """Insert a batch of validated expenses in one transaction with executemany"""
+    def insert_operation():
+        db.session.execute(insert(Expense.__table__), rows)
+    run_write(insert_operation)
 
-@app.route("/delete/<int:expense_id>", methods=["POST"])
+def import_expenses_file(stream, file_format="csv", default_category="Other",
+                         batch_size=IMPORT_BATCH_SIZE, ledger_id=DEFAULT_LEDGER_ID):
+    """Stream-parse a CSV or OFX file and bulk insert its valid expenses into a ledger
+
+    Category names are looked up among the ledger's categories.
+    """
+    if file_format == "ofx":
+        rows = iter_ofx_rows(stream, default_category)
+    else:
+        rows = iter_csv_rows(stream, default_category)
+
+    category_ids = get_category_ids(ledger_id)
+
+    def validate(fields):
+        values, _ = validate_expense_input(
+            fields["description"], fields["amount"], fields["category"], fields["date"],
+            strict_date=True, category_ids=category_ids
+        )
+        values['ledger_id'] = ledger_id
+        return values
+
+    # Bulk inserts bypass the session events that keep the caches fresh
+    try:
+        result = import_rows(rows, validate, insert_expense_batch, batch_size)
+    except Exception:
+        invalidate_imported_expenses(ledger_id)
+        raise
+    if result.imported:
+        invalidate_imported_expenses(ledger_id, result.category_ids, result.first_date,
+                                     result.last_date)
+        current_app.extensions['alert_dispatcher'].notify()
+    return result
+
+def detect_import_format(filename, requested=""):
+    """Pick the import format from the request or the file extension"""
+    if requested in ("csv", "ofx"):
+        return requested
+    extension = os.path.splitext(filename or "")[1].lower()
+    return "ofx" if extension in (".ofx", ".qfx") else "csv"
+
+@bp.route("/import", methods=["POST"])
+def import_expenses():
+    """Bulk import expenses from an uploaded CSV or OFX file"""
+    upload = request.files.get("file")
+    wants_json = request.accept_mimetypes.best == "application/json"
+    if upload is None or not upload.filename:
+        if wants_json:
+            return jsonify({"error": "No file uploaded"}), 400
+        flash("Please choose a CSV or OFX file to import.", "error")
+        return redirect(url_for(".index"))
+
+    file_format = detect_import_format(upload.filename, request.form.get("format", ""))
+    default_category = (request.form.get("category") or "Other").strip()
+
+    try:
+        result = import_expenses_file(upload.stream, file_format, default_category,
+                                      ledger_id=g.ledger_id)
+    except Exception as e:
+        if wants_json:
+            return jsonify({"error": f"Import failed: {e}"}), 500
+        flash(f"Import failed: {str(e)}", "error")
+        return redirect(url_for(".index"))
+
+    if wants_json:
+        return jsonify(result.to_dict())
+
+    flash(f"Imported {result.imported} expenses", "success" if result.imported else "warning")
+    if result.error_count:
+        details = "; ".join(f"line {line}: {message}" for line, message in result.errors[:5])
+        flash(f"{result.error_count} lines skipped ({details})", "error")
+    return redirect(url_for(".index"))
+
+@bp.cli.command("import-expenses")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "ofx"]), default=None,
+              help="File format (default: from the file extension)")
+@click.option("--category", default="Other", help="Category for rows without one (OFX)")
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option("--ledger", "ledger_id", type=int, default=DEFAULT_LEDGER_ID, show_default=True,
+              help="ID of the ledger to import into")
+def import_expenses_command(path, file_format, category, batch_size, ledger_id):
+    """Bulk import expenses from a CSV or OFX file"""
+    if db.session.get(Ledger, ledger_id) is None:
+        raise click.BadParameter(f"No ledger with ID {ledger_id}", param_hint="--ledger")
+    started = time.perf_counter()
+    with open(path, "rb") as stream:
+        result = import_expenses_file(
+            stream, detect_import_format(path, file_format or ""), category, batch_size,
+            ledger_id
+        )
+    elapsed = time.perf_counter() - started
+
+    print(f"Imported {result.imported} expenses in {elapsed:.1f}s "
+          f"({result.imported / max(elapsed, 1e-9):.0f} rows/s)")
+    for line, message in result.errors:
+        print(f"  line {line}: {message}")
+    if result.error_count > len(result.errors):
+        print(f"  ... and {result.error_count - len(result.errors)} more errors")
+
+@bp.route("/delete/<int:expense_id>", methods=["POST"])
 def delete(expense_id):
-    expense = Expense.query.get_or_404(expense_id)
+    get_or_404_in_ledger(Expense, expense_id)
     
     def delete_operation():
-        db.session.delete(expense)
-        db.session.commit()
+        expense = db.session.get(Expense, expense_id)
+        if expense is not None:
+            db.session.delete(expense)
         return True
     
     try:
-        db_operation_with_retry(delete_operation)
+        run_write(delete_operation)
         flash("Expense deleted successfully", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error deleting expense: {str(e)}", "error")
-    return redirect(url_for("index"))
+    return redirect(url_for(".index"))
 
-@app.route("/sync-to-oracle", methods=["POST"])
+def run_oracle_sync(**kwargs):
+    """Run the Oracle sync; the driver is only imported when a sync starts"""
+    from sync_to_oracle import sync_data
+    return sync_data(**kwargs)
+
+@bp.route("/sync-to-oracle", methods=["POST"])
 def sync_to_oracle():
-    """Call sync function directly"""
-    print("🔄 SYNC BUTTON CLICKED - Starting direct sync...")
-    
+    """Start the sync in the background and return its job ID straight away
+
+    Each table is synced per ledger, so the ledgers are independent shards
+    that run in parallel and commit on their own.
+    """
+    ledgers = [ledger.id for ledger in ledger_cache.get_or_load('ledgers', get_ledger_rows)]
+    sync_runner = current_app.extensions['sync_runner']
+    job, started = sync_runner.start(sqlite_path=db.engine.url.database, ledgers=ledgers)
+    status_url = url_for(".sync_status", job_id=job.id)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({
+            "job_id": job.id,
+            "started": started,
+            "status_url": status_url
+        }), 202 if started else 409
+
+    if started:
+        print(f"🔄 SYNC BUTTON CLICKED - Started sync job {job.id}")
+        flash(f"🔄 Sync started (job {job.id})", "success")
+    else:
+        flash(f"A sync is already running (job {job.id})", "warning")
+    return redirect(url_for(".index"))
+
+@bp.route("/ledger/<int:ledger_id>", methods=["POST"])
+def switch_ledger(ledger_id):
+    """Make another ledger the current one for this browser session"""
+    ledger = db.get_or_404(Ledger, ledger_id)
+    session['ledger_id'] = ledger.id
+    flash(f"Switched to ledger '{ledger.name}'", "success")
+    return redirect(url_for(".index"))
+
+@bp.route("/add-ledger", methods=["POST"])
+def add_ledger():
+    """Create a ledger with the default categories and switch to it"""
+    name = (request.form.get("name") or "").strip()
+    if not name:
+        flash("Ledger name is required!", "error")
+        return redirect(url_for(".index"))
+    if Ledger.query.filter_by(name=name).first():
+        flash(f"Ledger '{name}' already exists!", "error")
+        return redirect(url_for(".index"))
+
+    def add_operation():
+        ledger = Ledger(name=name)
+        db.session.add(ledger)
+        db.session.flush()
+        db.session.add_all([
+            CategoryBudget(ledger_id=ledger.id, name=category, budget_amount=DEFAULT_CATEGORY_BUDGET)
+            for category in DEFAULT_CATEGORIES
+        ])
+        return ledger.id
+
     try:
-        # Import and call the sync function
-        from sync_to_oracle import sync_data
-        
-        result = sync_data()
-        print(f"✅ Sync result: {result}")
-        
-        if "❌" in result or "error" in result.lower() or "failed" in result.lower():
-            flash(f"❌ {result}", "error")
-        else:
-            flash(f"✅ {result}", "success")
-            
+        session['ledger_id'] = run_write(add_operation)
+        flash(f"Ledger '{name}' created", "success")
     except Exception as e:
-        error_msg = f"❌ Sync error: {str(e)}"
-        print(f"❌ {error_msg}")
-        flash(f"❌ {error_msg}", "error")
-    
-    return redirect(url_for("index"))
+        db.session.rollback()
+        flash(f"Error creating ledger: {str(e)}", "error")
+    return redirect(url_for(".index"))
+
+@bp.route("/sync-status/<job_id>")
+def sync_status(job_id):
+    """Report the progress of a sync job as JSON"""
+    job = current_app.extensions['sync_runner'].get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown sync job"}), 404
+    return jsonify(job.to_dict())
 
 if __name__ == "__main__":
-    app.run(debug=True, port=4848, threaded=True)
\ No newline at end of file
+    create_app().run(debug=True, port=4848, threaded=True)
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Query plans and timings for the dashboard queries before/after migration 1.
+
+Seeds a throwaway SQLite database with the pre-index schema, runs the hot
+dashboard queries, applies the index migration and runs them again.
+
+    python -m benchmarks.index_plans --expenses 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from migrations import migrate
+
+SCHEMA = [
+    """CREATE TABLE expense (
+        id INTEGER NOT NULL, description VARCHAR(200) NOT NULL, amount FLOAT NOT NULL,
+        category VARCHAR(100) NOT NULL, date DATETIME NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE saving (
+        id INTEGER NOT NULL, description VARCHAR(200) NOT NULL, amount FLOAT NOT NULL,
+        date DATETIME NOT NULL, type VARCHAR(50) NOT NULL, created_at DATETIME, PRIMARY KEY (id))""",
+]
+
+QUERIES = {
+    "category + date range sum": (
+        "SELECT SUM(amount) FROM expense WHERE category = ? AND date >= ? AND date <= ?",
+        ("Cat7", "2024-03-01 00:00:00.000000", "2024-03-31 00:00:00.000000"),
+    ),
+    "first expense page": (
+        "SELECT * FROM expense ORDER BY date DESC, id DESC LIMIT 51",
+        (),
+    ),
+    "date range page": (
+        "SELECT * FROM expense WHERE date >= ? AND date <= ? ORDER BY date DESC, id DESC LIMIT 51",
+        ("2023-01-01 00:00:00.000000", "2023-06-30 00:00:00.000000"),
+    ),
+    "category page": (
+        "SELECT * FROM expense WHERE category = ? ORDER BY date DESC, id DESC LIMIT 51",
+        ("Cat3",),
+    ),
+    "first savings page": (
+        "SELECT * FROM saving ORDER BY date DESC, id DESC LIMIT 51",
+        (),
+    ),
+}
+
+def seed(path, expenses, savings, categories, days):
+    """Create the pre-migration schema and fill it with random rows"""
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    def dates(n):
+        for _ in range(n):
+            yield (start + timedelta(days=rng.randrange(days))).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    conn.executemany(
+        "INSERT INTO expense (description, amount, category, date) VALUES (?, ?, ?, ?)",
+        ((f"expense {i}", round(rng.uniform(1, 500), 2), f"Cat{rng.randrange(categories)}", d)
+         for i, d in enumerate(dates(expenses)))
+    )
+    conn.executemany(
+        "INSERT INTO saving (description, amount, date, type) VALUES (?, ?, ?, ?)",
+        ((f"saving {i}", round(rng.uniform(1, 500), 2), d, rng.choice(["deposit", "withdrawal"]))
+         for i, d in enumerate(dates(savings)))
+    )
+    conn.commit()
+    conn.close()
+
+def run_queries(path, repeat):
+    """Print the plan and best-of-N timing for every query"""
+    conn = sqlite3.connect(path)
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = best
+        print(f"  {name}: {best * 1000:.2f} ms")
+        for line in plan:
+            print(f"      {line}")
+    conn.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=1_000_000)
+    parser.add_argument("--savings", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--days", type=int, default=5 * 365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Seeding {args.expenses} expenses and {args.savings} savings...")
+        seed(path, args.expenses, args.savings, args.categories, args.days)
+
+        print("\nBefore migration:")
+        before = run_queries(path, args.repeat)
+
+        engine = create_engine(f"sqlite:///{path}")
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            applied = migrate(conn, target=1)
+        engine.dispose()
+        print(f"\nApplied {applied} in {time.perf_counter() - t0:.1f} s")
+
+        print("\nAfter migration:")
+        after = run_queries(path, args.repeat)
+
+        print("\nSpeedup:")
+        for name in QUERIES:
+            print(f"  {name}: {before[name] / max(after[name], 1e-9):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Per-row cost of the sync row transform: per-value type lookup vs compiled plan.
+
+`legacy` reproduces the original inner loop of sync_table_data(): a linear
+scan of the Oracle column list for every value and convert_date_for_oracle()
+for every DATE. `compiled` uses compile_row_transform().
+
+    python -m benchmarks.row_transform --rows 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sync_to_oracle import compile_row_transform, convert_date_for_oracle
+
+COLUMN_MAPPING = [
+    ("id", "id"), ("description", "description"), ("amount", "amount"),
+    ("category", "category"), ("date", "expense_date"),
+]
+ORACLE_COLUMNS_INFO = [
+    ("ID", "NUMBER"), ("DESCRIPTION", "VARCHAR2"), ("AMOUNT", "NUMBER"),
+    ("CATEGORY", "VARCHAR2"), ("EXPENSE_DATE", "DATE"),
+]
+
+def legacy_transform(row):
+    processed_row = []
+    for value, (sqlite_col, oracle_col) in zip(row, COLUMN_MAPPING):
+        oracle_col_type = None
+        for col_name, col_type in ORACLE_COLUMNS_INFO:
+            if col_name.lower() == oracle_col:
+                oracle_col_type = col_type
+                break
+        if oracle_col_type == 'DATE' and value is not None:
+            processed_row.append(convert_date_for_oracle(value))
+        else:
+            processed_row.append(value)
+    return processed_row
+
+def synthetic_rows(count, days):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        yield [i, f"expense {i}", round(rng.uniform(1, 500), 2), f"Cat{rng.randrange(20)}",
+               day.strftime("%Y-%m-%d %H:%M:%S.%f")]
+
+def timed(label, transform, rows):
+    t0 = time.perf_counter()
+    for row in rows:
+        transform(list(row))
+    elapsed = time.perf_counter() - t0
+    print(f"  {label:>9}: {elapsed:6.2f} s  {elapsed / len(rows) * 1e6:6.2f} us/row")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=5 * 365,
+                        help="distinct dates in the synthetic rows")
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.rows, args.days))
+    target_types = {name.lower(): col_type for name, col_type in ORACLE_COLUMNS_INFO}
+    compiled = compile_row_transform([dest for _, dest in COLUMN_MAPPING], target_types)
+
+    assert legacy_transform(list(rows[0])) == compiled(list(rows[0]))
+
+    print(f"{args.rows} rows, {args.days} distinct dates:")
+    legacy = timed("legacy", legacy_transform, rows)
+    new = timed("compiled", compiled, rows)
+    print(f"  speedup: {legacy / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
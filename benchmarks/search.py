@@ -0,0 +1,97 @@
+"""Full-text search latency: /api/search against a plain LIKE scan.
+
+Seeds a throwaway database (benchmarks.seed), then times /api/search for
+rare, common and prefix words, with and without the dashboard filters and
+deep into the results. For comparison each search is also run as SQL
+alone: LIKE '%word%', newest first and unranked. That scan stops at the
+first page, so it is cheap for common words and grows with the table for
+rare ones; the ranked search grows with the number of matches, up to
+SEARCH_CANDIDATES, unless the filters reject most of them.
+
+    python -m benchmarks.search --expenses 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.seed import DESCRIPTION_WORDS, seed_database
+
+# (name, /api/search parameters)
+SEARCHES = [
+    ("common word", {"q": DESCRIPTION_WORDS[0]}),
+    ("rare word", {"q": DESCRIPTION_WORDS[-1]}),
+    ("two words", {"q": f"{DESCRIPTION_WORDS[1]} {DESCRIPTION_WORDS[2]}"}),
+    ("prefix", {"q": DESCRIPTION_WORDS[3][:3]}),
+    ("word + long prefix", {"q": f"{DESCRIPTION_WORDS[0]} {DESCRIPTION_WORDS[4][:4]}"}),
+    ("common word + filters", {"q": DESCRIPTION_WORDS[0], "start": "2020-03-01",
+                               "end": "2020-06-30", "category": "Category 3"}),
+    ("common word, page 20", {"q": DESCRIPTION_WORDS[0], "page": 20}),
+]
+
+def best_of(repeat, run):
+    """Best wall time of `repeat` calls to run(), in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def like_scan(conn, params):
+    """Run the LIKE query matching what params searches for, with the same filters and page"""
+    words = params["q"].split()
+    conditions = ["e.ledger_id = 1"] + ["e.description LIKE ?" for _ in words]
+    args = [f"%{word}%" for word in words]
+    if "start" in params:
+        conditions += ["e.date >= ?", "e.date <= ?", "c.name = ?"]
+        args += [params["start"], params["end"] + " 23:59:59.999999", params["category"]]
+    offset = (params.get("page", 1) - 1) * 50
+    return conn.execute(
+        "SELECT e.* FROM expense e JOIN category_budget c ON c.id = e.category_id "
+        f"WHERE {' AND '.join(conditions)} ORDER BY e.date DESC, e.id DESC "
+        f"LIMIT 51 OFFSET {offset}", args
+    ).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app import create_app, fts_query
+    from models import db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        t0 = time.perf_counter()
+        seed_database(path, args.expenses, args.categories, args.days, savings=1000)
+        print(f"Seeded {args.expenses} expenses in {time.perf_counter() - t0:.1f}s")
+        with app.app_context():
+            db.engine.dispose()
+
+        client = app.test_client()
+        conn = sqlite3.connect(path)
+        print(f"{'search':<26} {'matches':>9} {'api ms':>9} {'like ms':>9}")
+        for name, params in SEARCHES:
+            response = client.get("/api/search", query_string=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            matches = conn.execute(
+                "SELECT COUNT(*) FROM expense_fts WHERE expense_fts MATCH ?",
+                (fts_query(params["q"]),)
+            ).fetchone()[0]
+            fts_ms = best_of(args.repeat, lambda: client.get("/api/search", query_string=params))
+            like_ms = best_of(args.repeat, lambda: like_scan(conn, params))
+            print(f"{name:<26} {matches:>9} {fts_ms:>9.2f} {like_ms:>9.2f}")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
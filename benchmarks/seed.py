@@ -0,0 +1,170 @@
+"""Synthetic data for benchmarks: N expenses over M categories and D days, plus savings, per ledger.
+
+Works on a database that already has the application schema. Rows are
+bulk inserted with the expense triggers dropped; the rollup, budget spend
+counters, change_log and search index are then filled in one pass each, which
+is what the triggers would have produced row by row.
+
+    python -m benchmarks.seed --path instance/expenses.db --expenses 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from migrations import (
+    budget_spend_triggers, change_log_triggers, create_expense_rollup, rebuild_budget_spend,
+    rebuild_search_index, search_index_sql
+)
+
+START_DATE = datetime(2020, 1, 1)
+
+# Rows per executemany call
+SEED_BATCH_SIZE = 50_000
+
+# Descriptions are a few of these words, the first ones far more often, so
+# that searches for common and rare words can both be benchmarked
+DESCRIPTION_WORDS = (
+    "groceries coffee lunch dinner fuel rent taxi train bus parking pharmacy books "
+    "cinema gym internet phone electricity water insurance gift clothes shoes repair "
+    "hardware garden pet vet dentist doctor hotel flight museum concert bakery butcher "
+    "market subscription streaming software laundry haircut stationery toys furniture"
+).split()
+WORD_WEIGHTS = [1 / rank for rank in range(1, len(DESCRIPTION_WORDS) + 1)]
+
+def _batches(rows, size=SEED_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def seed_database(path, expenses, categories=20, days=365, savings=1000, seed=42, ledgers=1):
+    """Add categories, expenses and savings to each of `ledgers` ledgers of the database at path
+
+    Every ledger gets the same amount of data, so the ledger count can be
+    varied without changing what one ledger's dashboard reads. Ledger 1 is
+    the default ledger; further ones are created as needed. Returns the ids
+    of the categories used per ledger. Amounts are integer cents and dates
+    spread uniformly over `days` days from START_DATE.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO ledger (id, name, created_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+        [(ledger_id, f"Ledger {ledger_id}") for ledger_id in range(1, ledgers + 1)]
+    )
+    category_ids = {}
+    for ledger_id in range(1, ledgers + 1):
+        conn.executemany(
+            "INSERT OR IGNORE INTO category_budget "
+            "(ledger_id, name, budget_amount, is_active, created_at) "
+            "VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)",
+            [(ledger_id, f"Category {i}", rng.randrange(50_000, 500_000))
+             for i in range(1, categories + 1)]
+        )
+        category_ids[ledger_id] = [row[0] for row in conn.execute(
+            "SELECT id FROM category_budget WHERE ledger_id = ? AND name LIKE 'Category %' "
+            "ORDER BY id LIMIT ?", (ledger_id, categories)
+        )]
+
+    def random_description():
+        count = rng.randint(1, 3)
+        words = rng.choices(DESCRIPTION_WORDS, weights=WORD_WEIGHTS, k=count)
+        return " ".join(words) + f" #{rng.randrange(100_000)}"
+
+    def random_date():
+        moment = START_DATE + timedelta(days=rng.randrange(days), seconds=rng.randrange(86_400))
+        return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    # Without the per-row triggers; their effect is recomputed in bulk below
+    for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'expense'"
+    ).fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM expense").fetchone()[0]
+
+    for ledger_id, ledger_categories in category_ids.items():
+        for batch in _batches(
+            (ledger_id, random_description(), rng.randrange(100, 50_000), rng.choice(ledger_categories),
+             random_date())
+            for i in range(expenses)
+        ):
+            conn.executemany(
+                "INSERT INTO expense (ledger_id, description, amount, category_id, date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+    conn.execute(
+        "INSERT INTO change_log (table_name, row_id, operation, changed_at, ledger_id) "
+        "SELECT 'expense', id, 'upsert', CURRENT_TIMESTAMP, ledger_id FROM expense WHERE id >= ?",
+        (first_id,)
+    )
+
+    for ledger_id in category_ids:
+        for batch in _batches(
+            (ledger_id, f"saving {i}", rng.randrange(100, 100_000), random_date(),
+             "deposit" if rng.random() < 0.8 else "withdrawal")
+            for i in range(savings)
+        ):
+            conn.executemany(
+                "INSERT INTO saving (ledger_id, description, amount, date, type, created_at) "
+                "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                batch
+            )
+    conn.commit()
+
+    # Restore the triggers and rebuild the rollup and counters through a
+    # SQLAlchemy connection, since the migration helpers use exec_driver_sql
+    from sqlalchemy import create_engine
+    engine = create_engine(f"sqlite:///{os.path.abspath(path)}")
+    with engine.begin() as sa_conn:
+        for statement in change_log_triggers("expense") + budget_spend_triggers():
+            sa_conn.exec_driver_sql(statement)
+        # The CREATE VIRTUAL TABLE IF NOT EXISTS is a no-op, the triggers come back
+        for statement in search_index_sql("expense"):
+            sa_conn.exec_driver_sql(statement)
+        create_expense_rollup(sa_conn)
+        rebuild_budget_spend(sa_conn)
+        rebuild_search_index(sa_conn, "expense")
+    engine.dispose()
+
+    conn.close()
+    return category_ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default=os.path.join("instance", "expenses.db"))
+    parser.add_argument("--expenses", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--savings", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ledgers", type=int, default=1,
+                        help="ledgers to fill, each with the counts above")
+    args = parser.parse_args()
+
+    # Creating the app creates or migrates the schema of the target database
+    from app import create_app
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(args.path)}"})
+
+    t0 = time.perf_counter()
+    seed_database(args.path, args.expenses, args.categories, args.days, args.savings, args.seed,
+                  args.ledgers)
+    print(f"Seeded {args.ledgers} ledgers with {args.expenses} expenses over {args.categories} "
+          f"categories and {args.days} days, and {args.savings} savings each "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
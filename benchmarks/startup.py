@@ -0,0 +1,117 @@
+"""Startup time: importing app, create_app() and the first served request.
+
+Each run is a fresh interpreter against a database that already has the
+latest schema, which is how the app starts in production. Flask and
+SQLAlchemy are imported first and timed apart; the budget covers the rest. One more run
+under -X importtime lists the slowest imports (its timings are inflated by
+the tracing). Every run checks that no heavy optional driver is imported
+and that importing the app opens no network connection.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Startup target for the app's own share: its import past Flask and
+# SQLAlchemy, create_app() and the first response
+BUDGET_MS = 200
+
+# Imported before the app and timed apart, as no change to the app can speed
+# them up (about 400 ms together on the reference machine)
+FRAMEWORK_MODULES = ("flask", "flask_sqlalchemy", "sqlalchemy.orm", "sqlalchemy.dialects.sqlite")
+
+# Drivers that should only be imported when they are used
+LAZY_MODULES = ("oracledb", "pyarrow")
+
+WORKER = """
+import json, socket, sys, time
+connects = []
+original_connect = socket.socket.connect
+def record_connect(sock, address):
+    connects.append(str(address))
+    return original_connect(sock, address)
+socket.socket.connect = record_connect
+
+tf = time.perf_counter()
+import importlib
+for name in %r:
+    importlib.import_module(name)
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+imported_connects = len(connects)
+application = app.create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1]})
+t2 = time.perf_counter()
+status = application.test_client().get("/").status_code
+t3 = time.perf_counter()
+print(json.dumps({
+    "framework_import_ms": (t0 - tf) * 1000,
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "status": status,
+    "network_connects_at_import": imported_connects,
+    "lazy_modules_loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+def parse_importtime(stderr, top=10):
+    """The slowest imports made by the worker and by app.py, as (module, cumulative ms)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # Nesting is shown as two spaces of indentation per level
+        depth = (len(name) - len(name.lstrip())) // 2
+        if cumulative.strip().isdigit() and depth <= 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: -item[1])[:top]
+
+def run_once(uri, importtime=False):
+    process = subprocess.run(
+        [sys.executable, *(["-X", "importtime"] if importtime else []),
+         "-c", WORKER % (FRAMEWORK_MODULES, LAZY_MODULES), uri],
+        capture_output=True, text=True, check=True
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["slowest_imports_ms"] = parse_importtime(process.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        first = run_once(uri)  # creates the schema
+        runs = [run_once(uri) for _ in range(args.runs)]
+
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("import_ms", "create_app_ms", "first_request_ms")
+    }
+    summary["total_ms"] = round(sum(summary.values()), 1)
+    summary["framework_import_ms"] = round(
+        statistics.median(run["framework_import_ms"] for run in runs), 1
+    )
+    summary["budget_ms"] = BUDGET_MS
+    summary["within_budget"] = summary["total_ms"] <= BUDGET_MS
+    summary["new_database_create_app_ms"] = round(first["create_app_ms"], 1)
+    summary["network_connects_at_import"] = max(run["network_connects_at_import"] for run in runs)
+    summary["lazy_modules_loaded"] = sorted({m for run in runs for m in run["lazy_modules_loaded"]})
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        run_once(uri)
+        summary["slowest_imports_ms"] = run_once(uri, importtime=True)["slowest_imports_ms"]
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""End-to-end benchmark suite: route latency, queries per request, memory and sync.
+
+For each scale point a fresh database is seeded (benchmarks.seed) in its
+own process, the Flask test client is driven through the dashboard,
+write and category routes, and sync_table_data() is timed against a fake
+Oracle connection. Results are printed as JSON so that runs on different
+commits can be diffed.
+
+Scales are per ledger. With several ledger counts each scale is run once per
+count; the routes and the sync shard read the first ledger only, so their
+numbers should not move with the count.
+
+    python -m benchmarks.suite --scales 10000,100000,1000000 --output results.json
+    python -m benchmarks.suite --scales 100000 --ledgers 1,10
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.seed import seed_database
+from benchmarks.sync_throughput import FakeOracleConnection
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class RouteBenchmark:
+    """Times requests through the test client and counts their SQL statements"""
+
+    def __init__(self, app):
+        from sqlalchemy import event
+        from models import db
+
+        self.client = app.test_client()
+        self.statements = 0
+        self.results = {}
+        with app.app_context():
+            # Engine-wide, so writes run by the single-writer thread count too
+            event.listen(db.engine, "before_cursor_execute", self._count_statement)
+
+    def _count_statement(self, *args):
+        self.statements += 1
+
+    def run(self, name, send, requests, before_each=None):
+        """Send `requests` requests via send(i); the last one also measures allocations"""
+        latencies = []
+        statements = 0
+        for i in range(requests):
+            if before_each:
+                before_each()
+            self.statements = 0
+            t0 = time.perf_counter()
+            response = send(i)
+            latencies.append(time.perf_counter() - t0)
+            statements += self.statements
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+
+        if before_each:
+            before_each()
+        tracemalloc.start()
+        send(requests)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies.sort()
+        self.results[name] = {
+            "requests": requests,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "queries_per_request": round(statements / requests, 2),
+            "peak_alloc_kb": round(peak / 1024, 1),
+        }
+
+def drive_routes(app, requests):
+    """Exercise the dashboard, write and category routes"""
+    from app import AGGREGATE_CACHES
+    from models import db, CategoryBudget, Expense, Saving
+
+    bench = RouteBenchmark(app)
+    client = bench.client
+
+    def clear_caches():
+        for cache in AGGREGATE_CACHES:
+            cache.invalidate()
+
+    def latest_id(model, **filters):
+        with app.app_context():
+            return db.session.query(db.func.max(model.id)).filter_by(**filters).scalar()
+
+    bench.run("index_cold", lambda i: client.get("/"), requests, before_each=clear_caches)
+    bench.run("index_warm", lambda i: client.get("/"), requests)
+    bench.run("index_filtered", lambda i: client.get(
+        "/?start=2020-03-01&end=2020-06-30&category=Category+3"), requests)
+    cursor = None
+    for _ in range(9):
+        cursor = client.get("/api/expenses", query_string={"after": cursor}).get_json()["next"]
+    bench.run("api_expenses_page_10", lambda i: client.get(
+        "/api/expenses", query_string={"after": cursor}), requests)
+    bench.run("api_charts_cold", lambda i: client.get("/api/charts"), requests,
+              before_each=clear_caches)
+    bench.run("api_analytics_cold", lambda i: client.get("/api/analytics"), requests,
+              before_each=clear_caches)
+    bench.run("api_analytics_weekly_cold", lambda i: client.get(
+        "/api/analytics?granularity=week"), requests, before_each=clear_caches)
+
+    first_added = latest_id(Expense) + 1
+    bench.run("add", lambda i: client.post("/add", data={
+        "description": f"bench {i}", "amount": "12.34", "category": "Category 1",
+        "date": "2020-02-01",
+    }), requests)
+    bench.run("delete", lambda i: client.post(f"/delete/{first_added + i}"), requests)
+
+    bench.run("add_saving", lambda i: client.post("/add-saving", data={
+        "description": f"bench {i}", "amount": "50", "type": "deposit", "date": "2020-02-01",
+    }), requests)
+    last_saving = latest_id(Saving)
+    bench.run("delete_saving", lambda i: client.post(f"/delete-saving/{last_saving - i}"),
+              requests)
+
+    bench.run("add_category", lambda i: client.post("/add-category", data={
+        "name": f"Bench category {i}", "budget_amount": "100",
+    }), requests)
+    first_category = latest_id(CategoryBudget) - requests
+    bench.run("edit_category", lambda i: client.post(f"/edit-category/{first_category + i}", data={
+        "budget_amount": "250",
+    }), requests)
+    bench.run("delete_category", lambda i: client.post(f"/delete-category/{first_category + i}"),
+              requests)
+    return bench.results
+
+def sync_benchmark(path, latency_ms, batch_size):
+    """Time a full sync of the first ledger's expense shard to a fake Oracle connection"""
+    from sync_to_oracle import OracleTarget, sync_table_data
+
+    sqlite_conn = sqlite3.connect(path)
+    connection = FakeOracleConnection(latency_ms / 1000)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        upserted, _, errors, _ = sync_table_data(sqlite_conn, OracleTarget(connection=connection),
+                                                 "expense", full=True, batch_size=batch_size,
+                                                 ledger_id=1)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    sqlite_conn.close()
+    return {
+        "rows": upserted,
+        "errors": len(errors),
+        "round_trips": connection.cursor_obj.calls,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(upserted / elapsed) if elapsed else None,
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+def run_scale(path, args):
+    """Seed, then benchmark one scale point in this process"""
+    from app import create_app
+    from models import db
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+
+    t0 = time.perf_counter()
+    seed_database(path, args.expenses, args.categories, args.days, args.savings,
+                  ledgers=args.ledger_count)
+    seed_seconds = time.perf_counter() - t0
+
+    with app.app_context():
+        # The seed wrote behind the ORM's back; start with fresh connections
+        db.engine.dispose()
+
+    routes = drive_routes(app, args.requests)
+    sync = sync_benchmark(path, args.latency_ms, args.batch_size)
+    return {
+        "scale": {
+            "expenses": args.expenses, "categories": args.categories,
+            "days": args.days, "savings": args.savings, "ledgers": args.ledger_count,
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        "routes": routes,
+        "sync": sync,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000,1000000",
+                        help="comma-separated expense counts per ledger, one run each")
+    parser.add_argument("--ledgers", default="1",
+                        help="comma-separated ledger counts, one run each per scale")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--savings", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=30, help="requests per route")
+    parser.add_argument("--latency-ms", type=float, default=0.5,
+                        help="simulated Oracle round-trip time")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--expenses", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--ledger-count", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scale(args.worker, args)))
+        return
+
+    results = {"revision": git_revision(), "runs": []}
+    runs = [(int(expenses), int(ledgers)) for expenses in args.scales.split(",")
+            for ledgers in args.ledgers.split(",")]
+    for expenses, ledgers in runs:
+        print(f"Benchmarking {expenses} expenses in each of {ledgers} ledgers...", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--worker", path,
+                 "--expenses", str(expenses), "--ledger-count", str(ledgers),
+                 "--categories", str(args.categories),
+                 "--days", str(args.days), "--savings", str(args.savings),
+                 "--requests", str(args.requests), "--latency-ms", str(args.latency_ms),
+                 "--batch-size", str(args.batch_size)],
+                stdout=subprocess.PIPE, text=True, check=True
+            ).stdout
+        results["runs"].append(json.loads(output.strip().splitlines()[-1]))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Oracle sync throughput (rows/s) versus batch size, against a fake cursor.
+
+The fake Oracle connection records every call and sleeps for a simulated
+network round-trip per execute/executemany, so the numbers show how much
+batching saves without needing an Oracle server.
+
+    python -m benchmarks.sync_throughput --rows 200000 --latency-ms 0.5
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from migrations import change_log_triggers
+from sync_to_oracle import OracleTarget, sync_table_data
+
+SCHEMA = [
+    """CREATE TABLE expense (
+        id INTEGER NOT NULL, description VARCHAR(200) NOT NULL, amount INTEGER NOT NULL,
+        category VARCHAR(100) NOT NULL, date DATETIME NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE change_log (
+        id INTEGER NOT NULL, table_name VARCHAR(50) NOT NULL, row_id INTEGER NOT NULL,
+        operation VARCHAR(10) NOT NULL, changed_at DATETIME, ledger_id INTEGER,
+        PRIMARY KEY (id))""",
+    "CREATE INDEX ix_change_log_table_id ON change_log (table_name, id)",
+    """CREATE TABLE sync_state (
+        target VARCHAR(50) NOT NULL, table_name VARCHAR(50) NOT NULL,
+        last_change_id INTEGER NOT NULL, synced_at DATETIME, PRIMARY KEY (target, table_name))""",
+]
+
+ORACLE_COLUMNS = [
+    ("ID", "NUMBER"), ("LEDGER_ID", "NUMBER"), ("DESCRIPTION", "VARCHAR2"), ("AMOUNT", "NUMBER"),
+    ("CATEGORY", "VARCHAR2"), ("EXPENSE_DATE", "DATE"),
+]
+
+class FakeOracleCursor:
+    """Records calls and simulates one network round-trip per call"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.rows = 0
+        self._result = []
+
+    def execute(self, sql, params=None):
+        time.sleep(self.latency)
+        self.calls += 1
+        self._result = ORACLE_COLUMNS if "user_tab_columns" in sql else []
+
+    def executemany(self, sql, rows, batcherrors=False):
+        time.sleep(self.latency)
+        self.calls += 1
+        self.rows += len(rows)
+
+    def getbatcherrors(self):
+        return []
+
+    def fetchall(self):
+        return self._result
+
+class FakeOracleConnection:
+    def __init__(self, latency):
+        self.cursor_obj = FakeOracleCursor(latency)
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def seed(path, rows):
+    """Create a source database with `rows` expenses logged in change_log"""
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA + change_log_triggers("expense", ledger=False):
+        conn.execute(statement)
+    conn.executemany(
+        "INSERT INTO expense (description, amount, category, date) VALUES (?, ?, ?, ?)",
+        ((f"expense {i}", rng.randrange(100, 50000), f"Cat{rng.randrange(20)}",
+          (start + timedelta(days=rng.randrange(1800))).strftime("%Y-%m-%d %H:%M:%S.%f"))
+         for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--latency-ms", type=float, default=0.5,
+                        help="simulated round-trip time per Oracle call")
+    parser.add_argument("--batch-sizes", default="1,10,100,1000,5000")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "source.db")
+        seed(path, args.rows)
+        sqlite_conn = sqlite3.connect(path)
+
+        print(f"{'batch':>8} {'calls':>8} {'seconds':>9} {'rows/s':>10}")
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            connection = FakeOracleConnection(args.latency_ms / 1000)
+            target = OracleTarget(connection=connection)
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                upserted, _, _, _ = sync_table_data(sqlite_conn, target, "expense",
+                                                    full=True, batch_size=batch_size)
+            elapsed = time.perf_counter() - t0
+            print(f"{batch_size:>8} {connection.cursor_obj.calls:>8} {elapsed:>9.2f} "
+                  f"{upserted / elapsed:>10.0f}")
+
+        sqlite_conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Latency and lock errors of concurrent POST /add, before and after write tuning.
+
+Each mode runs in its own process on a fresh temporary database. "before"
+uses the old setup (rollback journal, every request thread committing for
+itself with retries); "after" uses the tuned pragmas and the single-writer
+queue. N threads each post M expenses through the Flask test client.
+
+    python -m benchmarks.write_concurrency --threads 16 --requests 200
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = ("before", "after")
+
+# App config of each mode, on top of the defaults
+MODE_CONFIG = {
+    "before": {"SQLITE_PRAGMAS": {"journal_mode": "DELETE"}, "SERIALIZE_WRITES": False},
+    "after": {},
+}
+
+def post_expenses(client, count, thread_index, latencies, errors):
+    for i in range(count):
+        form = {
+            "description": f"bench {thread_index}-{i}",
+            "amount": "12.50",
+            "category": "Food",
+            "date": "2025-01-15",
+        }
+        t0 = time.perf_counter()
+        client.post("/add", data=form)
+        latencies.append(time.perf_counter() - t0)
+
+        with client.session_transaction() as session:
+            flashes = session.pop("_flashes", [])
+        for category, message in flashes:
+            if category == "error":
+                errors.append("locked" if "locked" in message else "other")
+
+def run_mode(mode, threads, requests):
+    """Run one mode in this process and return its results as a dict"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        app = app_module.create_app(MODE_CONFIG[mode])
+
+    latencies, errors = [], []
+    workers = [
+        threading.Thread(target=post_expenses, args=(
+            app.test_client(), requests, index, latencies, errors
+        ))
+        for index in range(threads)
+    ]
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "mode": mode,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(total - 1, int(total * 0.99))] * 1000, 2),
+        "lock_error_rate": round(errors.count("locked") / total, 4),
+        "other_error_rate": round(errors.count("other") / total, 4),
+        "write_groups": app.extensions["write_queue"].stats()["groups"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="posts per thread")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.worker, args.threads, args.requests)))
+        return
+
+    print(f"{'mode':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'locked':>8} "
+          f"{'other':>8} {'groups':>8}")
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, EXPENSES_DATABASE_URI=f"sqlite:///{tmp}/bench.db")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.write_concurrency", "--worker", mode,
+                 "--threads", str(args.threads), "--requests", str(args.requests)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>8} {result['requests_per_second']:>8} {result['p50_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['lock_error_rate']:>8.2%} "
+              f"{result['other_error_rate']:>8.2%} {result['write_groups']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Delivery of budget threshold alerts to a sink.
+
+Triggers write a budget_alert row in the same transaction as the expense
+or budget change that crosses a threshold (see migrations.py), so the table
+doubles as an outbox: alerts are never lost and never raised for writes
+that roll back. A background thread hands undelivered alerts to a sink,
+either a webhook or, by default, an in-memory local sink.
+"""
+import json
+import threading
+import urllib.request
+from collections import deque
+
+from money import from_cents
+
+# Percent of a category's budget at which an alert is raised
+DEFAULT_ALERT_THRESHOLDS = (80, 100)
+
+# Alerts handed to the sink per delivery
+ALERT_BATCH_SIZE = 100
+
+# Seconds before retrying after a failed delivery
+ALERT_RETRY_SECONDS = 30
+
+# Seconds to wait for the webhook to answer
+WEBHOOK_TIMEOUT = 5
+
+class LocalAlertSink:
+    """Keeps the most recent delivered alerts in memory; for development and tests"""
+
+    def __init__(self, maxlen=1000):
+        self.delivered = deque(maxlen=maxlen)
+
+    def send(self, alerts):
+        self.delivered.extend(alerts)
+
+class WebhookAlertSink:
+    """POSTs each batch of alerts as JSON to a URL"""
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"alerts": alerts}).encode(),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        # Raises on connection errors and non-2xx answers, so the batch is retried
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+def sync_thresholds(conn, thresholds):
+    """Make budget_threshold hold exactly the given percentages"""
+    thresholds = sorted({int(percent) for percent in thresholds})
+    placeholders = ", ".join("?" * len(thresholds)) or "NULL"
+    conn.exec_driver_sql(
+        f"DELETE FROM budget_threshold WHERE percent NOT IN ({placeholders})", tuple(thresholds)
+    )
+    for percent in thresholds:
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO budget_threshold (percent) VALUES (?)", (percent,)
+        )
+
+def serialize_alert(row):
+    alert_id, category, threshold, spent, budget_amount, created_at = row
+    return {
+        "id": alert_id,
+        "category": category,
+        "threshold": threshold,
+        "spent": str(from_cents(spent)),
+        "budget": str(from_cents(budget_amount)),
+        "created_at": created_at,
+    }
+
+def deliver_pending_alerts(conn, sink, mark_delivered, batch_size=ALERT_BATCH_SIZE):
+    """Send one batch of undelivered alerts to the sink and mark them delivered
+
+    The batch is read through conn; mark_delivered(last_id) is called once
+    the sink took it, to run mark_alerts_delivered() as a write. Returns the
+    number delivered. If the sink raises, nothing is marked and the same
+    alerts are sent again on the next attempt.
+    """
+    rows = conn.exec_driver_sql("""
+        SELECT a.id, c.name, a.threshold, a.spent, a.budget_amount, a.created_at
+        FROM budget_alert a LEFT JOIN category_budget c ON c.id = a.category_id
+        WHERE a.delivered_at IS NULL
+        ORDER BY a.id LIMIT ?
+    """, (batch_size,)).all()
+    if not rows:
+        return 0
+    sink.send([serialize_alert(row) for row in rows])
+    mark_delivered(rows[-1][0])
+    return len(rows)
+
+def mark_alerts_delivered(conn, last_id):
+    """Mark the undelivered alerts up to last_id as delivered"""
+    conn.exec_driver_sql(
+        "UPDATE budget_alert SET delivered_at = CURRENT_TIMESTAMP "
+        "WHERE delivered_at IS NULL AND id <= ?", (last_id,)
+    )
+
+class AlertDispatcher:
+    """Delivers alerts on a background thread whenever notify() is called
+
+    deliver() sends one batch and returns how many alerts it delivered;
+    it is called until nothing is left.
+    """
+
+    def __init__(self, deliver, retry_seconds=ALERT_RETRY_SECONDS):
+        self.deliver = deliver
+        self.retry_seconds = retry_seconds
+        self.delivered = 0
+        self.failures = 0
+        self.last_error = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self):
+        """Signal that writes may have raised alerts"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="budget-alerts", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                while True:
+                    delivered = self.deliver()
+                    self.delivered += delivered
+                    if not delivered:
+                        break
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # Undelivered alerts stay pending; try again later
+                retry = threading.Timer(self.retry_seconds, self._wake.set)
+                retry.daemon = True
+                retry.start()
+
+    def stats(self):
+        return {
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
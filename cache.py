@@ -0,0 +1,62 @@
+"""Small in-process LRU cache for computed dashboard aggregates."""
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe LRU mapping with a size bound and hit/miss counters"""
+
+    def __init__(self, name, maxsize=128):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, computing it with loader() on a miss"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while loading; the value may already be stale
+                return value
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def peek(self, key, default=None):
+        """Get a cached value without loading it or touching the counters"""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def invalidate(self, predicate=None):
+        """Drop the entries whose key matches predicate, or every entry"""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key in self._data if predicate is None or predicate(key)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
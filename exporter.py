@@ -0,0 +1,97 @@
+"""Streaming encoders for exporting expenses as CSV, Parquet or Arrow IPC.
+
+Each encoder takes an iterable of row chunks and yields bytes as soon as a
+chunk is encoded, so a response can start immediately and memory stays
+bounded by one chunk whatever the size of the export.
+"""
+import csv
+import io
+
+# Rows fetched from the database and encoded per chunk
+EXPORT_CHUNK_SIZE = 10000
+
+EXPORT_COLUMNS = ("id", "date", "description", "category", "amount")
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+def iter_csv(chunks, columns=EXPORT_COLUMNS):
+    """Encode row chunks as CSV, yielding the header straight away"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object collecting bytes until they are drained"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer.extend(data)
+        return len(data)
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("category", pa.string()),
+        ("amount", pa.decimal128(18, 2)),  # exact, as stored in cents
+    ])
+
+def iter_arrow(chunks, file_format="parquet"):
+    """Encode row chunks as Parquet (one row group per chunk) or an Arrow IPC stream
+
+    Requires pyarrow, which is imported here so that it stays optional.
+    """
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows)) if rows else [[] for _ in schema]
+            batch = pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            )
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def arrow_available():
+    """Check whether the optional pyarrow dependency is installed"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
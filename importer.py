@@ -0,0 +1,137 @@
+"""Streaming CSV/OFX parsers and batched import of expenses.
+
+Files are read line by line and rows are handed to the database in batches,
+so memory use is bounded by the batch size rather than the file size.
+"""
+import csv
+import io
+import re
+
+# Rows inserted per transaction
+IMPORT_BATCH_SIZE = 5000
+
+# Line errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+CSV_FIELDS = ("description", "amount", "category", "date")
+
+class ImportResult:
+    """Outcome of an import: rows inserted and per-line errors"""
+
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []  # (line_number, message), at most MAX_REPORTED_ERRORS
+        self.first_date = None
+        self.last_date = None
+        self.category_ids = set()
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def to_dict(self):
+        return {
+            "imported": self.imported,
+            "error_count": self.error_count,
+            "errors": [{"line": line, "error": message} for line, message in self.errors],
+        }
+
+def text_stream(stream):
+    """Wrap a binary stream for text parsing, dropping a UTF-8 BOM if present"""
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+def iter_csv_rows(stream, default_category=""):
+    """Yield (line_number, fields) for each row of a CSV file with a header row
+
+    Header names are matched case-insensitively against CSV_FIELDS.
+    """
+    reader = csv.reader(text_stream(stream))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    positions = [(field, columns.get(field)) for field in CSV_FIELDS]
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        fields = {field: (row[index] if index is not None and index < len(row) else "")
+                  for field, index in positions}
+        if not fields["category"]:
+            fields["category"] = default_category
+        yield reader.line_num, fields
+
+OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+
+def iter_ofx_rows(stream, default_category="Other"):
+    """Yield (line_number, fields) for each debit transaction of an OFX statement
+
+    Handles both SGML (unclosed tags) and XML style OFX. Credits are skipped
+    since they are not expenses.
+    """
+    transaction = None
+    start_line = 0
+    for line_number, line in enumerate(text_stream(stream), start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN" and not closing:
+                transaction = {}
+                start_line = line_number
+            elif tag == "STMTTRN" and closing and transaction is not None:
+                fields = ofx_transaction_fields(transaction, default_category)
+                if fields is not None:
+                    yield start_line, fields
+                transaction = None
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+def ofx_transaction_fields(transaction, default_category):
+    """Map an OFX transaction to expense fields, or None for credits"""
+    amount = transaction.get("TRNAMT", "")
+    if amount and not amount.startswith("-"):
+        return None
+    posted = transaction.get("DTPOSTED", "")
+    date_str = f"{posted[0:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) >= 8 else posted
+    return {
+        "description": transaction.get("NAME") or transaction.get("MEMO") or "",
+        "amount": amount.lstrip("-"),
+        "category": default_category,
+        "date": date_str,
+    }
+
+def import_rows(rows, validate, insert_batch, batch_size=IMPORT_BATCH_SIZE):
+    """Validate parsed rows and insert the valid ones in batches
+
+    validate(fields) returns the column values for one row or raises
+    ValueError with a message; insert_batch(values) writes one batch in a
+    single transaction.
+    """
+    result = ImportResult()
+    batch = []
+    for line_number, fields in rows:
+        try:
+            values = validate(fields)
+        except ValueError as e:
+            result.add_error(line_number, str(e))
+            continue
+
+        batch.append(values)
+        result.category_ids.add(values["category_id"])
+        if result.first_date is None or values["date"] < result.first_date:
+            result.first_date = values["date"]
+        if result.last_date is None or values["date"] > result.last_date:
+            result.last_date = values["date"]
+
+        if len(batch) >= batch_size:
+            insert_batch(batch)
+            result.imported += len(batch)
+            batch = []
+
+    if batch:
+        insert_batch(batch)
+        result.imported += len(batch)
+    return result
@@ -0,0 +1,542 @@
+"""Versioned schema migrations for the SQLite database.
+
+The schema version is stored in PRAGMA user_version. Every migration runs
+once, in order, inside the same transaction that bumps the version, so an
+existing expenses.db is upgraded in place without losing data. Trigger SQL
+helpers take a ledger flag so that migrations written before ledgers existed
+keep installing the triggers of their time.
+"""
+import re
+
+# Tables whose writes are recorded in change_log for the incremental sync
+CHANGE_TRACKED_TABLES = ["category_budget", "expense", "saving"]
+
+# Tables that are not synced but whose writes are recorded in change_log all
+# the same, as the version of the JSON panels that read them. Rules change
+# rarely, so their entries are left uncompacted.
+PANEL_TRACKED_TABLES = ["recurring_expense"]
+
+# Ledger that rows created before schema version 7 belong to
+DEFAULT_LEDGER_ID = 1
+
+def change_log_triggers(table_name, ledger=True):
+    """SQL for the triggers that record every write to table_name in change_log
+
+    With ledger set, each entry also records the row's ledger_id so that the
+    sync can be sharded per ledger.
+    """
+    columns = "table_name, row_id, operation, changed_at" + (", ledger_id" if ledger else "")
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_{event}_change_log
+            AFTER {event.upper()} ON {table_name}
+            BEGIN
+                INSERT INTO change_log ({columns})
+                VALUES ('{table_name}', {ref}.id, '{operation}', CURRENT_TIMESTAMP
+                        {f", {ref}.ledger_id" if ledger else ""});
+            END"""
+        for event, ref, operation in (
+            ("insert", "NEW", "upsert"),
+            ("update", "NEW", "upsert"),
+            ("delete", "OLD", "delete"),
+        )
+    ]
+
+def track_existing_rows(conn):
+    """Create the change_log triggers and log every existing row as changed
+
+    The first incremental sync after upgrading then behaves like a full sync.
+    """
+    for table_name in CHANGE_TRACKED_TABLES:
+        for statement in change_log_triggers(table_name, ledger=False):
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(
+            f"INSERT INTO change_log (table_name, row_id, operation, changed_at) "
+            f"SELECT '{table_name}', id, 'upsert', CURRENT_TIMESTAMP FROM {table_name}"
+        )
+
+def expense_rollup_triggers(category="category_id", ledger=True):
+    """SQL for the triggers that keep expense_rollup in step with expense
+
+    They run inside the writing transaction, so the rollup is always
+    consistent with the expense table. category names the category column,
+    which was the category name before schema version 5; the rollup is keyed
+    by ledger first from version 7.
+    """
+    key = f"ledger_id, day, {category}" if ledger else f"day, {category}"
+    ledger_value = "NEW.ledger_id, " if ledger else ""
+    ledger_match = "ledger_id = OLD.ledger_id AND " if ledger else ""
+    add = f"""
+        INSERT INTO expense_rollup ({key}, total, count)
+        VALUES ({ledger_value}date(NEW.date), NEW.{category}, NEW.amount, 1)
+        ON CONFLICT({key}) DO UPDATE
+        SET total = total + excluded.total, count = count + 1;"""
+    remove = f"""
+        UPDATE expense_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE {ledger_match}day = date(OLD.date) AND {category} = OLD.{category};
+        DELETE FROM expense_rollup
+        WHERE {ledger_match}day = date(OLD.date) AND {category} = OLD.{category} AND count <= 0;"""
+    updated = f"date, {category}, amount" + (", ledger_id" if ledger else "")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_insert_rollup AFTER INSERT ON expense BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_delete_rollup AFTER DELETE ON expense BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_update_rollup AFTER UPDATE OF {updated} "
+        f"ON expense BEGIN {remove} {add} END",
+    ]
+
+def rebuild_expense_rollup(conn, category="category_id", ledger=True):
+    """Recompute expense_rollup from scratch from the expense table"""
+    key = f"ledger_id, date(date), {category}" if ledger else f"date(date), {category}"
+    columns = f"ledger_id, day, {category}" if ledger else f"day, {category}"
+    conn.exec_driver_sql("DELETE FROM expense_rollup")
+    conn.exec_driver_sql(f"""
+        INSERT INTO expense_rollup ({columns}, total, count)
+        SELECT {key}, SUM(amount), COUNT(*)
+        FROM expense
+        GROUP BY {key}
+    """)
+
+def create_expense_rollup(conn, category="category_id", ledger=True):
+    """Install the rollup triggers and fill the rollup from existing expenses"""
+    for statement in expense_rollup_triggers(category, ledger):
+        conn.exec_driver_sql(statement)
+    rebuild_expense_rollup(conn, category, ledger)
+
+def create_expense_rollup_by_name(conn):
+    """Schema version 3: the rollup keyed by category name
+
+    The table is created here rather than by create_all(), which already
+    builds the current shape keyed by category_id.
+    """
+    conn.exec_driver_sql("DROP TABLE IF EXISTS expense_rollup")
+    conn.exec_driver_sql("""CREATE TABLE expense_rollup (
+        day DATE NOT NULL, category VARCHAR(100) NOT NULL, total FLOAT NOT NULL,
+        count INTEGER NOT NULL, PRIMARY KEY (day, category))""")
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_expense_rollup_category_day ON expense_rollup (category, day)"
+    )
+    create_expense_rollup(conn, "category", ledger=False)
+
+def category_rename_triggers(ledger=True):
+    """SQL for the trigger that logs a renamed category's expenses as changed
+
+    Renaming only updates category_budget, but the Oracle expense table
+    stores the category name on each expense, so those expenses must be sent
+    again. The rename therefore costs one change_log row per expense of the
+    category, written through the (category_id, date) index, and the next
+    sync resends all of them. The expense rows themselves are not touched.
+    """
+    columns = "table_name, row_id, operation, changed_at" + (", ledger_id" if ledger else "")
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_category_budget_rename_change_log
+            AFTER UPDATE OF name ON category_budget
+            WHEN NEW.name IS NOT OLD.name
+            BEGIN
+                INSERT INTO change_log ({columns})
+                SELECT 'expense', id, 'upsert', CURRENT_TIMESTAMP{", ledger_id" if ledger else ""}
+                FROM expense WHERE category_id = NEW.id;
+            END"""
+    ]
+
+def rebuild_table(conn, table_name, create_sql, column_values):
+    """Recreate a table from a new definition and copy its rows over
+
+    SQLite cannot change a column in place. create_sql creates the table as
+    _new_<table_name>; column_values maps each new column to the SQL
+    expression computing it from the old row. Indexes and triggers are
+    dropped with the old table and have to be recreated.
+    """
+    columns = ", ".join(column_values)
+    values = ", ".join(column_values.values())
+    conn.exec_driver_sql(create_sql)
+    conn.exec_driver_sql(
+        f"INSERT INTO _new_{table_name} ({columns}) SELECT {values} FROM {table_name}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {table_name}")
+    conn.exec_driver_sql(f"ALTER TABLE _new_{table_name} RENAME TO {table_name}")
+
+# Money columns stored as integer cents, per table
+MONEY_COLUMNS = {
+    "category_budget": ["budget_amount"],
+    "expense": ["amount"],
+    "saving": ["amount"],
+    "expense_rollup": ["total"],
+}
+
+# Indexes and triggers lost when the tables above are rebuilt
+MONEY_TABLE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_expense_category_date ON expense (category, date)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_date_id ON expense (date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_saving_date_id ON saving (date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_rollup_category_day ON expense_rollup (category, day)",
+]
+
+def convert_to_cents(conn, table_name, columns):
+    """Rebuild a table with the given FLOAT columns as INTEGER cents
+
+    The table is recreated from its own definition with the columns retyped.
+    """
+    create_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+    ).scalar()
+    for column in columns:
+        create_sql = re.sub(rf"\b{column} FLOAT\b", f"{column} INTEGER", create_sql)
+    create_sql = re.sub(rf'^CREATE TABLE "?{table_name}"?', f"CREATE TABLE _new_{table_name}",
+                        create_sql)
+
+    names = [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table_name})")]
+    rebuild_table(conn, table_name, create_sql, {
+        name: f"CAST(ROUND({name} * 100) AS INTEGER)" if name in columns else name
+        for name in names
+    })
+
+def store_money_as_cents(conn):
+    """Convert every money column to integer cents and restore indexes and triggers
+
+    Amounts keep their value, so nothing is logged for the sync.
+    """
+    for table_name, columns in MONEY_COLUMNS.items():
+        convert_to_cents(conn, table_name, columns)
+    for statement in MONEY_TABLE_INDEXES:
+        conn.exec_driver_sql(statement)
+    for table_name in CHANGE_TRACKED_TABLES:
+        for statement in change_log_triggers(table_name, ledger=False):
+            conn.exec_driver_sql(statement)
+    # Recomputed rather than converted, so the totals are exact sums of cents
+    create_expense_rollup(conn, "category", ledger=False)
+
+def reference_categories_by_id(conn):
+    """Replace expense.category (a name) with category_id, a foreign key
+
+    Category names used by expenses but missing from category_budget are
+    added as inactive categories with no budget. The rollup is rebuilt
+    keyed by category_id. Expense ids and values are unchanged, so nothing
+    is logged for the sync.
+    """
+    conn.exec_driver_sql("""
+        INSERT INTO category_budget (name, budget_amount, is_active, created_at)
+        SELECT DISTINCT category, 0, 0, CURRENT_TIMESTAMP FROM expense
+        WHERE category NOT IN (SELECT name FROM category_budget)
+    """)
+    rebuild_table(conn, "expense", """CREATE TABLE _new_expense (
+        id INTEGER NOT NULL, description VARCHAR(200) NOT NULL, amount INTEGER NOT NULL,
+        category_id INTEGER NOT NULL, date DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(category_id) REFERENCES category_budget (id))""", {
+        "id": "id",
+        "description": "description",
+        "amount": "amount",
+        "category_id": "(SELECT c.id FROM category_budget c WHERE c.name = expense.category)",
+        "date": "date",
+    })
+    conn.exec_driver_sql("DROP TABLE expense_rollup")
+    conn.exec_driver_sql("""CREATE TABLE expense_rollup (
+        day DATE NOT NULL, category_id INTEGER NOT NULL, total INTEGER NOT NULL,
+        count INTEGER NOT NULL, PRIMARY KEY (day, category_id))""")
+
+    for statement in [
+        "CREATE INDEX ix_expense_category_date ON expense (category_id, date)",
+        "CREATE INDEX ix_expense_date_id ON expense (date, id)",
+        "CREATE INDEX ix_expense_rollup_category_day ON expense_rollup (category_id, day)",
+        *change_log_triggers("expense", ledger=False),
+        *category_rename_triggers(ledger=False),
+    ]:
+        conn.exec_driver_sql(statement)
+    create_expense_rollup(conn, ledger=False)
+
+def budget_spend_triggers(ledger=True):
+    """SQL for the triggers that keep budget_spend in step with expense
+
+    Each expense write adjusts one counter row in O(1), inside the writing
+    transaction, so the running spend per category is always current.
+    """
+    columns = "category_id, ledger_id" if ledger else "category_id"
+    values = "NEW.category_id, NEW.ledger_id" if ledger else "NEW.category_id"
+    add = f"""
+        INSERT INTO budget_spend ({columns}, spent, count)
+        VALUES ({values}, NEW.amount, 1)
+        ON CONFLICT(category_id) DO UPDATE
+        SET spent = spent + excluded.spent, count = count + 1;"""
+    remove = """
+        UPDATE budget_spend SET spent = spent - OLD.amount, count = count - 1
+        WHERE category_id = OLD.category_id;
+        DELETE FROM budget_spend WHERE category_id = OLD.category_id AND count <= 0;"""
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_insert_budget AFTER INSERT ON expense BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_delete_budget AFTER DELETE ON expense BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_expense_update_budget AFTER UPDATE OF category_id, amount "
+        f"ON expense BEGIN {remove} {add} END",
+    ]
+
+def _crossed_thresholds(category_id, spent, budget, old_spent=None, old_budget=None):
+    """SQL inserting a budget_alert for every threshold the spend has crossed
+
+    A threshold (percent of the budget) is crossed when it is reached now
+    and was not before the write; old values of None mean nothing was spent.
+    """
+    reached = f"{spent} * 100 >= {budget} * t.percent"
+    before = "1"
+    if old_spent is not None:
+        before = f"{old_budget} <= 0 OR {old_spent} * 100 < {old_budget} * t.percent"
+    return f"""
+        INSERT INTO budget_alert (category_id, threshold, spent, budget_amount, created_at)
+        SELECT {category_id}, t.percent, {spent}, {budget}, CURRENT_TIMESTAMP
+        FROM budget_threshold t
+        WHERE {budget} > 0 AND {reached} AND ({before});"""
+
+def budget_alert_triggers():
+    """SQL for the triggers that record threshold crossings in budget_alert
+
+    Crossings are detected when a category's spend changes and when its
+    budget is lowered. Only active categories raise alerts.
+    """
+    budget = "(SELECT budget_amount FROM category_budget WHERE id = NEW.category_id AND is_active)"
+    old_budget = "(SELECT budget_amount FROM category_budget WHERE id = OLD.category_id)"
+    spent = "COALESCE((SELECT spent FROM budget_spend WHERE category_id = NEW.id), 0)"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_budget_spend_insert_alert
+            AFTER INSERT ON budget_spend
+            BEGIN {_crossed_thresholds("NEW.category_id", "NEW.spent", budget)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_budget_spend_update_alert
+            AFTER UPDATE OF spent ON budget_spend
+            WHEN NEW.spent > OLD.spent
+            BEGIN {_crossed_thresholds("NEW.category_id", "NEW.spent", budget,
+                                       "OLD.spent", old_budget)} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_category_budget_alert
+            AFTER UPDATE OF budget_amount ON category_budget
+            WHEN NEW.budget_amount < OLD.budget_amount AND NEW.is_active
+            BEGIN {_crossed_thresholds("NEW.id", spent, "NEW.budget_amount",
+                                       spent, "OLD.budget_amount")} END""",
+    ]
+
+def rebuild_budget_spend(conn, ledger=True):
+    """Recompute budget_spend from the expense table
+
+    Counters are updated in place rather than recreated, so only categories
+    whose spend newly crosses a threshold raise alerts.
+    """
+    columns = "category_id, ledger_id" if ledger else "category_id"
+    conn.exec_driver_sql(f"""
+        INSERT INTO budget_spend ({columns}, spent, count)
+        SELECT {columns}, SUM(amount), COUNT(*) FROM expense WHERE true GROUP BY {columns}
+        ON CONFLICT(category_id) DO UPDATE
+        SET spent = excluded.spent, count = excluded.count
+    """)
+    conn.exec_driver_sql(
+        "DELETE FROM budget_spend WHERE category_id NOT IN (SELECT category_id FROM expense)"
+    )
+
+def create_budget_tracking(conn):
+    """Schema version 6: fill the spend counters, then install the triggers
+
+    The table is created here rather than by create_all(), which builds the
+    current shape with a ledger_id. The alert triggers come last so that
+    spend recorded before the upgrade does not raise alerts.
+    """
+    conn.exec_driver_sql("DROP TABLE IF EXISTS budget_spend")
+    conn.exec_driver_sql("""CREATE TABLE budget_spend (
+        category_id INTEGER NOT NULL, spent INTEGER NOT NULL, count INTEGER NOT NULL,
+        PRIMARY KEY (category_id))""")
+    rebuild_budget_spend(conn, ledger=False)
+    for statement in budget_spend_triggers(ledger=False) + budget_alert_triggers():
+        conn.exec_driver_sql(statement)
+
+def partition_by_ledger(conn):
+    """Add a ledger_id to the synced tables, with indexes leading on it
+
+    Existing rows go to DEFAULT_LEDGER_ID, and category names become unique
+    per ledger. The tables are rebuilt, so every trigger is dropped first and
+    recreated with the ledger recorded in change_log, the rollup and the
+    spend counters, which are rebuilt from scratch. Rebuilding
+    category_budget drops a table that expense references, so this has to
+    run with foreign keys off (see init_db() in app.py).
+    """
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO ledger (id, name, created_at) "
+        f"VALUES ({DEFAULT_LEDGER_ID}, 'Default', CURRENT_TIMESTAMP)"
+    )
+    for (trigger_name,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).all():
+        conn.exec_driver_sql(f"DROP TRIGGER {trigger_name}")
+
+    ledger = str(DEFAULT_LEDGER_ID)
+    rebuild_table(conn, "category_budget", """CREATE TABLE _new_category_budget (
+        id INTEGER NOT NULL, ledger_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL,
+        budget_amount INTEGER NOT NULL, is_active BOOLEAN, created_at DATETIME,
+        PRIMARY KEY (id), CONSTRAINT uq_category_budget_ledger_name UNIQUE (ledger_id, name),
+        FOREIGN KEY(ledger_id) REFERENCES ledger (id))""", {
+        "id": "id", "ledger_id": ledger, "name": "name", "budget_amount": "budget_amount",
+        "is_active": "is_active", "created_at": "created_at",
+    })
+    rebuild_table(conn, "expense", """CREATE TABLE _new_expense (
+        id INTEGER NOT NULL, ledger_id INTEGER NOT NULL, description VARCHAR(200) NOT NULL,
+        amount INTEGER NOT NULL, category_id INTEGER NOT NULL, date DATETIME NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(ledger_id) REFERENCES ledger (id),
+        FOREIGN KEY(category_id) REFERENCES category_budget (id))""", {
+        "id": "id", "ledger_id": ledger, "description": "description", "amount": "amount",
+        "category_id": "category_id", "date": "date",
+    })
+    rebuild_table(conn, "saving", """CREATE TABLE _new_saving (
+        id INTEGER NOT NULL, ledger_id INTEGER NOT NULL, description VARCHAR(200) NOT NULL,
+        amount INTEGER NOT NULL, date DATETIME NOT NULL, type VARCHAR(50) NOT NULL,
+        created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(ledger_id) REFERENCES ledger (id))""", {
+        "id": "id", "ledger_id": ledger, "description": "description", "amount": "amount",
+        "date": "date", "type": "type", "created_at": "created_at",
+    })
+
+    # Derived tables are recreated empty and refilled below
+    conn.exec_driver_sql("DROP TABLE expense_rollup")
+    conn.exec_driver_sql("""CREATE TABLE expense_rollup (
+        ledger_id INTEGER NOT NULL, day DATE NOT NULL, category_id INTEGER NOT NULL,
+        total INTEGER NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (ledger_id, day, category_id))""")
+    conn.exec_driver_sql("DROP TABLE budget_spend")
+    conn.exec_driver_sql("""CREATE TABLE budget_spend (
+        category_id INTEGER NOT NULL, ledger_id INTEGER NOT NULL, spent INTEGER NOT NULL,
+        count INTEGER NOT NULL, PRIMARY KEY (category_id))""")
+
+    change_log_columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(change_log)")]
+    if "ledger_id" not in change_log_columns:
+        conn.exec_driver_sql("ALTER TABLE change_log ADD COLUMN ledger_id INTEGER")
+    conn.exec_driver_sql(f"UPDATE change_log SET ledger_id = {DEFAULT_LEDGER_ID}")
+
+    for statement in [
+        "CREATE INDEX ix_expense_category_date ON expense (category_id, date)",
+        "CREATE INDEX ix_expense_ledger_date_id ON expense (ledger_id, date, id)",
+        "CREATE INDEX ix_saving_ledger_date_id ON saving (ledger_id, date, id)",
+        "CREATE INDEX ix_expense_rollup_category_day ON expense_rollup (category_id, day)",
+        "CREATE INDEX ix_budget_spend_ledger ON budget_spend (ledger_id)",
+        "CREATE INDEX IF NOT EXISTS ix_change_log_table_ledger_id "
+        "ON change_log (table_name, ledger_id, id)",
+        *[statement for table_name in CHANGE_TRACKED_TABLES
+          for statement in change_log_triggers(table_name)],
+        *category_rename_triggers(),
+    ]:
+        conn.exec_driver_sql(statement)
+    create_expense_rollup(conn)
+    rebuild_budget_spend(conn)
+    for statement in budget_spend_triggers() + budget_alert_triggers():
+        conn.exec_driver_sql(statement)
+
+def link_recurring_expenses(conn):
+    """Schema version 8: the (recurring_id, occurrence) key of materialized expenses
+
+    Added in place rather than by rebuilding expense, so upgrading a large
+    table costs nothing; the recurring_expense table itself is new and made
+    by create_all().
+    """
+    conn.exec_driver_sql(
+        "ALTER TABLE expense ADD COLUMN recurring_id INTEGER REFERENCES recurring_expense (id)"
+    )
+    conn.exec_driver_sql("ALTER TABLE expense ADD COLUMN occurrence DATE")
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX ix_expense_recurring_occurrence ON expense (recurring_id, occurrence)"
+    )
+
+def track_recurring_expenses(conn):
+    """Schema version 10: record writes to recurring rules in change_log
+
+    The triggers only version the JSON panels; existing rules are not
+    logged, since no panel has cached anything older than the upgrade.
+    """
+    for table_name in PANEL_TRACKED_TABLES:
+        for statement in change_log_triggers(table_name):
+            conn.exec_driver_sql(statement)
+
+# Tables whose description is searchable, each through an FTS5 index named <table>_fts
+SEARCH_INDEXED_TABLES = ["expense", "saving"]
+
+def search_index_sql(table_name):
+    """SQL for the FTS5 index over table_name.description and the triggers keeping it current
+
+    The index has external content: it stores only the tokens, keyed by
+    rowid = id, and reads the text back from table_name. Words are indexed
+    with their 2 and 3 letter prefixes, so prefix searches stay fast.
+    """
+    fts = f"{table_name}_fts"
+    add = f"INSERT INTO {fts} (rowid, description) VALUES (NEW.id, NEW.description);"
+    remove = (f"INSERT INTO {fts} ({fts}, rowid, description) "
+              f"VALUES ('delete', OLD.id, OLD.description);")
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            description, content='{table_name}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table_name}_insert_search AFTER INSERT ON {table_name} "
+        f"BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table_name}_delete_search AFTER DELETE ON {table_name} "
+        f"BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table_name}_update_search "
+        f"AFTER UPDATE OF description ON {table_name} BEGIN {remove} {add} END",
+    ]
+
+def rebuild_search_index(conn, table_name):
+    """Re-index every description of table_name from scratch"""
+    conn.exec_driver_sql(f"INSERT INTO {table_name}_fts ({table_name}_fts) VALUES ('rebuild')")
+
+def create_search_index(conn):
+    """Schema version 9: full-text indexes over expense and saving descriptions"""
+    for table_name in SEARCH_INDEXED_TABLES:
+        for statement in search_index_sql(table_name):
+            conn.exec_driver_sql(statement)
+        rebuild_search_index(conn, table_name)
+
+# Each migration is (version, description, steps). A step is either a SQL
+# string or a callable taking the SQLAlchemy connection.
+MIGRATIONS = [
+    (1, "Indexes for the dashboard date/category filters", [
+        "CREATE INDEX IF NOT EXISTS ix_expense_category_date ON expense (category, date)",
+        "CREATE INDEX IF NOT EXISTS ix_expense_date_id ON expense (date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_saving_date_id ON saving (date, id)",
+    ]),
+    (2, "Change tracking for the incremental Oracle sync", [
+        track_existing_rows,
+    ]),
+    (3, "Daily per-category expense rollup", [
+        create_expense_rollup_by_name,
+    ]),
+    (4, "Money amounts as integer cents", [
+        store_money_as_cents,
+    ]),
+    (5, "Expense category as a foreign key to category_budget", [
+        reference_categories_by_id,
+    ]),
+    (6, "Running budget spend per category and threshold alerts", [
+        create_budget_tracking,
+    ]),
+    (7, "Ledgers: a ledger_id on every synced table", [
+        partition_by_ledger,
+    ]),
+    (8, "Recurring expense rules", [
+        link_recurring_expenses,
+    ]),
+    (9, "Full-text search over descriptions", [
+        create_search_index,
+    ]),
+    (10, "Change tracking for recurring expense rules", [
+        track_recurring_expenses,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """Get the schema version recorded in the database"""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+def set_schema_version(conn, version):
+    """Record the schema version in the database"""
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+def migrate(conn, target=LATEST_VERSION):
+    """Apply every pending migration up to target, returning the ones applied"""
+    current = get_schema_version(conn)
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.exec_driver_sql(step)
+        set_schema_version(conn, version)
+        applied.append((version, description))
+    return applied
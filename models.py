@@ -0,0 +1,187 @@
+"""SQLAlchemy models and the triggers installed with their tables.
+
+The db extension is created unbound; create_app() in app.py binds it to an
+application, so importing the models does not touch the database.
+"""
+from datetime import datetime
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+
+from money import Money
+from migrations import (
+    change_log_triggers, expense_rollup_triggers, category_rename_triggers,
+    budget_spend_triggers, search_index_sql, CHANGE_TRACKED_TABLES, PANEL_TRACKED_TABLES,
+    SEARCH_INDEXED_TABLES
+)
+
+db = SQLAlchemy()
+
+class Ledger(db.Model):
+    """An independent set of categories, expenses and savings"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Expense(db.Model):
+    # Every dashboard query is scoped to one ledger, so indexes lead with it
+    __table_args__ = (
+        db.Index('ix_expense_category_date', 'category_id', 'date'),
+        db.Index('ix_expense_ledger_date_id', 'ledger_id', 'date', 'id'),
+        db.Index('ix_expense_recurring_occurrence', 'recurring_id', 'occurrence', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ledger_id = db.Column(db.Integer, db.ForeignKey('ledger.id'), nullable=False)
+    description = db.Column(db.String(200), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category_budget.id'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    # Set on expenses added by a recurring rule; unique together, so that an
+    # occurrence is never added twice
+    recurring_id = db.Column(db.Integer, db.ForeignKey('recurring_expense.id'))
+    occurrence = db.Column(db.Date)
+
+    # Loaded in the same query, so listing expenses with their category names
+    # costs no extra queries
+    category = db.relationship('CategoryBudget', lazy='joined')
+
+class CategoryBudget(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('ledger_id', 'name', name='uq_category_budget_ledger_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ledger_id = db.Column(db.Integer, db.ForeignKey('ledger.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    budget_amount = db.Column(Money, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RecurringExpense(db.Model):
+    """A rule adding an expense every `interval` days, weeks or months (see recurring.py)
+
+    next_due is the first occurrence not yet added as an expense.
+    """
+    __table_args__ = (
+        db.Index('ix_recurring_expense_due', 'next_due', sqlite_where=db.text('is_active')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ledger_id = db.Column(db.Integer, db.ForeignKey('ledger.id'), nullable=False)
+    description = db.Column(db.String(200), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category_budget.id'), nullable=False)
+    frequency = db.Column(db.String(10), nullable=False)  # 'daily', 'weekly' or 'monthly'
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    next_due = db.Column(db.Date, nullable=False)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    category = db.relationship('CategoryBudget', lazy='joined')
+
+class Saving(db.Model):
+    __table_args__ = (
+        db.Index('ix_saving_ledger_date_id', 'ledger_id', 'date', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ledger_id = db.Column(db.Integer, db.ForeignKey('ledger.id'), nullable=False)
+    description = db.Column(db.String(200), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    type = db.Column(db.String(50), nullable=False)  # 'deposit' or 'withdrawal'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ExpenseRollup(db.Model):
+    """Expense total and count per ledger, day and category, maintained by triggers"""
+    __table_args__ = (
+        db.Index('ix_expense_rollup_category_day', 'category_id', 'day'),
+    )
+
+    ledger_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class BudgetSpend(db.Model):
+    """Running spend and expense count per category, maintained by triggers"""
+    __table_args__ = (
+        db.Index('ix_budget_spend_ledger', 'ledger_id'),
+    )
+
+    category_id = db.Column(db.Integer, primary_key=True)
+    ledger_id = db.Column(db.Integer, nullable=False)
+    spent = db.Column(Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class BudgetThreshold(db.Model):
+    """A percentage of the budget that raises an alert, from BUDGET_ALERT_THRESHOLDS"""
+    percent = db.Column(db.Integer, primary_key=True)
+
+class BudgetAlert(db.Model):
+    """A category's spending reached a threshold, written by triggers
+
+    Rows with no delivered_at are waiting for the alert dispatcher.
+    """
+    __table_args__ = (
+        db.Index('ix_budget_alert_pending', 'id', sqlite_where=db.text('delivered_at IS NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer, nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)
+    spent = db.Column(Money, nullable=False)
+    budget_amount = db.Column(Money, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
+
+class ChangeLog(db.Model):
+    """One row per insert/update/delete on a synced table, written by triggers"""
+    __table_args__ = (
+        db.Index('ix_change_log_table_id', 'table_name', 'id'),
+        db.Index('ix_change_log_table_ledger_id', 'table_name', 'ledger_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    ledger_id = db.Column(db.Integer)
+
+class SyncState(db.Model):
+    """High-water mark of change_log per sync target and table
+
+    A sync sharded by ledger keeps one mark per ledger, under the target
+    name with the ledger appended.
+    """
+    target = db.Column(db.String(50), primary_key=True)
+    table_name = db.Column(db.String(50), primary_key=True)
+    last_change_id = db.Column(db.Integer, nullable=False, default=0)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Record every write to the synced tables, and the panel-versioned ones, in change_log
+for table_name in CHANGE_TRACKED_TABLES + PANEL_TRACKED_TABLES:
+    for statement in change_log_triggers(table_name):
+        event.listen(db.metadata.tables[table_name], 'after_create', DDL(statement))
+
+# Keep expense_rollup in step with expense
+for statement in expense_rollup_triggers():
+    event.listen(Expense.__table__, 'after_create', DDL(statement))
+
+# Re-send a renamed category's expenses to sync targets that store its name
+for statement in category_rename_triggers():
+    event.listen(CategoryBudget.__table__, 'after_create', DDL(statement))
+
+# Keep budget_spend in step with expense
+for statement in budget_spend_triggers():
+    event.listen(Expense.__table__, 'after_create', DDL(statement))
+
+# Full-text index over the descriptions, searched by /api/search
+for table_name in SEARCH_INDEXED_TABLES:
+    for statement in search_index_sql(table_name):
+        event.listen(db.metadata.tables[table_name], 'after_create', DDL(statement))
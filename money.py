@@ -0,0 +1,52 @@
+"""Money amounts: stored as integer cents, handled as Decimal in Python.
+
+Integer cents make SQL sums exact and cheap; Decimal keeps the arithmetic
+exact between the database and the page, where amounts are formatted.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy.types import Integer, TypeDecorator
+
+CENT = Decimal("0.01")
+
+# Zero with two decimal places, serialized like every loaded amount ("0.00")
+ZERO = Decimal("0.00")
+
+def parse_amount(text):
+    """Parse an amount typed by a user, rounded to the cent
+
+    Raises ValueError for anything that is not a finite number.
+    """
+    try:
+        amount = Decimal(str(text).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{text}'")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount '{text}'")
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def to_cents(amount):
+    """Convert an amount in currency units (Decimal, int, float or str) to cents"""
+    if not isinstance(amount, Decimal):
+        # str() first so that a float like 0.1 converts as written, not as binary
+        amount = Decimal(str(amount))
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+def from_cents(cents):
+    """Convert integer cents to a Decimal amount with two decimal places"""
+    return Decimal(int(cents)).scaleb(-2)
+
+class Money(TypeDecorator):
+    """An amount stored in an INTEGER column as cents and loaded as Decimal
+
+    SUM() over a Money column keeps the type, so aggregates come back as
+    Decimal too while the database only adds integers.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
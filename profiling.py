@@ -0,0 +1,208 @@
+"""Opt-in per-route request profiling, exported in Prometheus text format.
+
+For every request the profiler records wall time, the SQL statements run
+and the time spent in them (from SQLAlchemy engine events), template
+render time and, optionally, the peak Python memory allocated. Requests
+that run the same statement many times are flagged as likely N+1 query
+patterns.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+# A statement run this many times in one request is reported as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = 10
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_PREFIX = "expenses"
+
+class RouteStats:
+    """Totals for one route since the process started"""
+
+    def __init__(self):
+        self.requests = Counter()  # (method, status) -> count
+        self.duration_buckets = [0] * len(DURATION_BUCKETS)
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.allocated_bytes = 0
+        self.n_plus_one = 0
+
+    def add(self, method, status, duration, sql_statements, sql_seconds, template_seconds,
+            allocated_bytes, n_plus_one):
+        self.requests[(method, status)] += 1
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.duration_buckets[index] += 1
+        self.duration_sum += duration
+        self.duration_count += 1
+        self.sql_statements += sql_statements
+        self.sql_seconds += sql_seconds
+        self.template_seconds += template_seconds
+        self.allocated_bytes += allocated_bytes
+        self.n_plus_one += n_plus_one
+
+class RequestProfiler:
+    """Collects per-route request metrics while config[enabled_key] is true
+
+    Allocation tracking uses tracemalloc, which slows every allocation down
+    and is process-wide: with concurrent requests the figures overlap.
+    """
+
+    def __init__(self, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.routes = defaultdict(RouteStats)
+        self._lock = threading.Lock()
+        self.app = None
+
+    def install(self, app, engine):
+        """Register the request, template and engine hooks"""
+        self.app = app
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_template, app)
+        template_rendered.connect(self._finish_template, app)
+        event.listen(engine, "before_cursor_execute", self._start_statement)
+        event.listen(engine, "after_cursor_execute", self._finish_statement)
+
+    @property
+    def enabled(self):
+        return bool(self.app and self.app.config.get("PROFILE_REQUESTS"))
+
+    def _profile(self):
+        """The current request's profile, or None when not profiling it"""
+        if not has_request_context():
+            return None
+        return g.get("_profile")
+
+    def _start_request(self):
+        if not self.enabled:
+            return
+        track_allocations = self.app.config.get("PROFILE_ALLOCATIONS")
+        if track_allocations:
+            # Imported on first use, it adds tens of ms to startup otherwise
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        g._profile = {
+            "start": time.perf_counter(),
+            "statements": Counter(),
+            "sql_seconds": 0.0,
+            "template_seconds": 0.0,
+            "template_start": None,
+            "memory_start": tracemalloc.get_traced_memory()[0] if track_allocations else None,
+        }
+
+    def _start_statement(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._profile()
+        if profile is not None:
+            conn.info.setdefault("_profile_start", []).append(time.perf_counter())
+
+    def _finish_statement(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._profile()
+        if profile is not None and conn.info.get("_profile_start"):
+            profile["sql_seconds"] += time.perf_counter() - conn.info["_profile_start"].pop()
+            profile["statements"][statement] += 1
+
+    def _start_template(self, sender, template, context, **extra):
+        profile = self._profile()
+        if profile is not None:
+            profile["template_start"] = time.perf_counter()
+
+    def _finish_template(self, sender, template, context, **extra):
+        profile = self._profile()
+        if profile is not None and profile["template_start"] is not None:
+            profile["template_seconds"] += time.perf_counter() - profile["template_start"]
+            profile["template_start"] = None
+
+    def _finish_request(self, response):
+        profile = self._profile()
+        if profile is None:
+            return response
+        duration = time.perf_counter() - profile["start"]
+        statements = profile["statements"]
+        sql_statements = sum(statements.values())
+
+        allocated_bytes = 0
+        if profile["memory_start"] is not None:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                allocated_bytes = max(0, tracemalloc.get_traced_memory()[1] - profile["memory_start"])
+
+        n_plus_one = 0
+        if statements:
+            statement, count = statements.most_common(1)[0]
+            if count >= self.n_plus_one_threshold:
+                n_plus_one = 1
+                self.app.logger.warning(
+                    "Possible N+1 queries in %s: statement ran %d times (%d statements in "
+                    "total): %s", request.endpoint, count, sql_statements,
+                    " ".join(statement.split())[:200]
+                )
+
+        route = request.endpoint or "unmatched"
+        with self._lock:
+            self.routes[route].add(
+                request.method, response.status_code, duration, sql_statements,
+                profile["sql_seconds"], profile["template_seconds"], allocated_bytes, n_plus_one
+            )
+
+        if self.app.config.get("PROFILE_SERVER_TIMING"):
+            response.headers.add("Server-Timing", ", ".join([
+                f"app;dur={duration * 1000:.1f}",
+                f'db;dur={profile["sql_seconds"] * 1000:.1f};desc="{sql_statements} queries"',
+                f'tpl;dur={profile["template_seconds"] * 1000:.1f}',
+            ]))
+        return response
+
+    def render_metrics(self):
+        """All route metrics in the Prometheus text exposition format"""
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+                for suffix, labels, value in samples:
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                    lines.append(f"{METRIC_PREFIX}_{name}{suffix}{{{label_text}}} {value}")
+
+            metric("requests_total", "counter", "Requests served", [
+                ("", (("route", route), ("method", method), ("status", status)), count)
+                for route, stats in routes
+                for (method, status), count in sorted(stats.requests.items())
+            ])
+
+            duration_samples = []
+            for route, stats in routes:
+                for bound, count in zip(DURATION_BUCKETS, stats.duration_buckets):
+                    duration_samples.append(("_bucket", (("route", route), ("le", bound)), count))
+                duration_samples.append(
+                    ("_bucket", (("route", route), ("le", "+Inf")), stats.duration_count)
+                )
+                duration_samples.append(("_sum", (("route", route),), round(stats.duration_sum, 6)))
+                duration_samples.append(("_count", (("route", route),), stats.duration_count))
+            metric("request_duration_seconds", "histogram", "Request wall time", duration_samples)
+
+            for name, attribute, help_text in (
+                ("sql_statements_total", "sql_statements", "SQL statements executed"),
+                ("sql_duration_seconds_total", "sql_seconds", "Time spent executing SQL"),
+                ("template_duration_seconds_total", "template_seconds", "Time spent rendering templates"),
+                ("allocated_bytes_total", "allocated_bytes",
+                 "Peak Python memory allocated per request, summed (PROFILE_ALLOCATIONS only)"),
+                ("n_plus_one_total", "n_plus_one", "Requests flagged for repeated statements"),
+            ):
+                metric(name, "counter", help_text, [
+                    ("", (("route", route),), round(getattr(stats, attribute), 6))
+                    for route, stats in routes
+                ])
+        return "\n".join(lines) + "\n"
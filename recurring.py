@@ -0,0 +1,150 @@
+"""Recurring expense rules and the scheduler that materializes them.
+
+A rule adds the same expense every N days, weeks or months from its start
+date. The rule's next_due is the first occurrence not yet added. A run
+inserts every due occurrence of every rule, then advances next_due. Both
+happen in one transaction, so a run is a single commit however many
+occurrences it adds. Each materialized expense carries its (recurring_id,
+occurrence) key, which is unique. A run repeated after a crash, or racing
+another process, therefore never adds an occurrence twice.
+"""
+import calendar
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.sqlite import insert
+
+# Units a rule can repeat in
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+# Seconds between scheduler runs; a run also happens at startup and on wake()
+RECURRING_INTERVAL_SECONDS = 3600
+
+def add_months(day, months, anchor_day):
+    """The date `months` months after `day`, on anchor_day or the month's last day"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+def next_occurrence(day, frequency, interval, anchor_day):
+    """The occurrence after `day` of a rule repeating every `interval` units
+
+    Monthly rules keep the day of the month of their start date, falling
+    back to the last day of shorter months (Jan 31, Feb 28, Mar 31).
+    """
+    if frequency == "daily":
+        return day + timedelta(days=interval)
+    if frequency == "weekly":
+        return day + timedelta(weeks=interval)
+    return add_months(day, interval, anchor_day)
+
+def due_occurrences(rule, today):
+    """The occurrences of a rule from its next_due up to today, and the next_due after them"""
+    occurrences = []
+    day = rule.next_due
+    while day <= today and (rule.end_date is None or day <= rule.end_date):
+        occurrences.append(day)
+        day = next_occurrence(day, rule.frequency, rule.interval, rule.start_date.day)
+    return occurrences, day
+
+def materialize_due_expenses(conn, expense_table, rule_table, today=None, catch_up=True):
+    """Insert the due occurrences of every active rule and advance the rules
+
+    With catch_up, every period missed since a rule's next_due is backfilled.
+    Without it only the latest due occurrence is added and the missed ones
+    are skipped. All rows go in one executemany and every rule is advanced
+    in another, inside the caller's transaction; a rule past its end date is
+    deactivated. Returns (rows, added): the due rows as dicts of expense
+    columns, and how many of them were new.
+    """
+    today = today or date.today()
+    rules = conn.execute(
+        select(rule_table).where(rule_table.c.is_active, rule_table.c.next_due <= today)
+    ).all()
+
+    rows = []
+    advanced = []
+    added = 0
+    for rule in rules:
+        occurrences, next_due = due_occurrences(rule, today)
+        if not catch_up:
+            occurrences = occurrences[-1:]
+        rows.extend({
+            'ledger_id': rule.ledger_id,
+            'description': rule.description,
+            'amount': rule.amount,
+            'category_id': rule.category_id,
+            'date': datetime.combine(occurrence, datetime.min.time()),
+            'recurring_id': rule.id,
+            'occurrence': occurrence,
+        } for occurrence in occurrences)
+        advanced.append({
+            'rule_id': rule.id,
+            'next_due': next_due,
+            'active': rule.end_date is None or next_due <= rule.end_date,
+        })
+
+    if rows:
+        # The unique (recurring_id, occurrence) key makes a repeated run a no-op
+        added = conn.execute(insert(expense_table).on_conflict_do_nothing(), rows).rowcount
+    if advanced:
+        conn.execute(
+            update(rule_table).where(rule_table.c.id == bindparam('rule_id'))
+            .values(next_due=bindparam('next_due'), is_active=bindparam('active')),
+            advanced
+        )
+    return rows, added
+
+class RecurringScheduler:
+    """Calls run() on a background thread every `interval` seconds and on wake()
+
+    run() materializes the due occurrences and returns how many it added.
+    """
+
+    def __init__(self, run, interval=RECURRING_INTERVAL_SECONDS):
+        self.run = run
+        self.interval = interval
+        self.runs = 0
+        self.materialized = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_run_at = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the thread, which runs once straight away to catch up"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="recurring-expenses", daemon=True
+                )
+                self._thread.start()
+
+    def wake(self):
+        """Run as soon as possible, e.g. after a rule was added"""
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.materialized += self.run()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+            self.runs += 1
+            self.last_run_at = datetime.utcnow()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        return {
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "materialized": self.materialized,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
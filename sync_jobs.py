@@ -0,0 +1,103 @@
+"""Background runner for the Oracle sync.
+
+The /sync-to-oracle route starts a job here and returns straight away; the
+sync runs on a worker thread and reports per-table progress that the
+/sync-status/<job_id> endpoint serves as JSON. Only one job runs at a time.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# Finished jobs kept around for the status endpoint
+MAX_FINISHED_JOBS = 20
+
+class SyncJob:
+    """State and per-table progress of one sync run"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "running"
+        self.result = None
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+        self.tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update_progress(self, table_name, done, total, errors):
+        """Progress callback passed to sync_data()"""
+        now = time.perf_counter()
+        with self._lock:
+            table = self.tables.setdefault(table_name, {"started": now})
+            elapsed = now - table["started"]
+            table.update(
+                done=done,
+                total=total,
+                errors=errors,
+                rows_per_sec=round(done / elapsed, 1) if elapsed > 0 else 0.0,
+            )
+
+    def finish(self, status, result):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.finished_at = datetime.utcnow()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "result": self.result,
+                "started_at": self.started_at.isoformat(),
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "tables": {
+                    name: {key: value for key, value in table.items() if key != "started"}
+                    for name, table in self.tables.items()
+                },
+            }
+
+class SyncJobRunner:
+    """Runs at most one sync job at a time on a background thread"""
+
+    def __init__(self, sync_function):
+        self.sync_function = sync_function
+        self.jobs = OrderedDict()
+        self.current = None
+        self._lock = threading.Lock()
+
+    def start(self, **sync_kwargs):
+        """Start a sync job, returning (job, started)
+
+        If a job is already running, it is returned with started=False.
+        """
+        with self._lock:
+            if self.current is not None and self.current.status == "running":
+                return self.current, False
+
+            job = SyncJob()
+            self.current = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_FINISHED_JOBS:
+                self.jobs.popitem(last=False)
+
+        thread = threading.Thread(
+            target=self._run, args=(job, sync_kwargs), name=f"sync-{job.id[:8]}", daemon=True
+        )
+        thread.start()
+        return job, True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _run(self, job, sync_kwargs):
+        try:
+            result = self.sync_function(progress=job.update_progress, **sync_kwargs)
+        except Exception as e:
+            print(f"❌ Sync job {job.id} failed: {e}")
+            job.finish("failed", f"Sync error: {e}")
+            return
+
+        failed = "failed" in result.lower() or "error" in result.lower()
+        job.finish("failed" if failed else "done", result)
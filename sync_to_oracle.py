@@ -1,28 +1,37 @@
 import sqlite3
-import oracledb
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
 
 # ---------- SQLite setup ----------
 sqlite_db_path = r"D:\EXPENSE-TRACKER\instance\expenses.db"
-sqlite_conn = sqlite3.connect(sqlite_db_path)
-sqlite_cur = sqlite_conn.cursor()
+SQLITE_TIMEOUT = 30  # seconds to wait for a lock when workers write sync_state
 
 # ---------- Oracle setup ----------
 ORACLE_USER = "system"
 ORACLE_PASS = "root"
 ORACLE_DSN = "localhost:1521/xe"
 
-oracle_conn = oracledb.connect(
-    user=ORACLE_USER,
-    password=ORACLE_PASS,
-    dsn=ORACLE_DSN
-)
-oracle_cur = oracle_conn.cursor()
+# ---------- Tables kept in sync (written to change_log by triggers) ----------
+SYNCED_TABLES = ['category_budget', 'expense', 'saving']
+KEY_COLUMN = 'id'
+
+# Rows read from SQLite and sent to the target per round-trip
+SYNC_BATCH_SIZE = 1000
+
+# Tables synced concurrently, each on its own SQLite and Oracle connection
+SYNC_WORKERS = 3
+
+# Distinct date strings remembered by the date converter
+DATE_CACHE_SIZE = 4096
 
 # ---------- Table-specific column mapping ----------
 TABLE_COLUMN_MAPPINGS = {
     'expense': {
-        'date': 'expense_date'  # Map SQLite 'date' to Oracle 'expense_date'
+        'date': 'expense_date',  # Map SQLite 'date' to Oracle 'expense_date'
+        'category_id': 'category'  # Oracle keeps the category name
     },
     'saving': {
         'date': 'saving_date'   # Map SQLite 'date' to Oracle 'saving_date'
@@ -30,29 +39,181 @@ TABLE_COLUMN_MAPPINGS = {
     # category_budget doesn't need mapping as columns match
 }
 
-def get_oracle_columns_with_types(table_name):
-    """Get column names and data types from existing Oracle table"""
-    try:
-        oracle_cur.execute("""
-            SELECT column_name, data_type 
-            FROM user_tab_columns 
-            WHERE table_name = UPPER(:1)
-            ORDER BY column_id
-        """, [table_name])
-        return oracle_cur.fetchall()
-    except Exception as e:
-        print(f"Error getting Oracle columns for {table_name}: {e}")
-        return []
+# ---------- Source columns read through a lookup ----------
+# Used when the target column is mapped to another name, i.e. the target
+# stores the looked-up value (the category name) rather than the key
+COLUMN_LOOKUPS = {
+    'expense': {
+        'category_id': '(SELECT name FROM category_budget c WHERE c.id = t.category_id)'
+    }
+}
+
+# ---------- Source columns the target may not have ----------
+# Targets created before recurring expenses existed keep working
+OPTIONAL_COLUMNS = {'recurring_id', 'occurrence'}
+
+# ---------- Ledger column, required in every target table ----------
+# Without it every ledger would be merged into one dataset, and expenses,
+# which the target files under their category name, could not tell apart
+# two ledgers' categories of the same name. Category names are unique per
+# ledger, so the target's unique key on them must be (ledger_id, name).
+LEDGER_COLUMN = 'ledger_id'
+
+# ---------- Money columns, stored in SQLite as integer cents ----------
+MONEY_COLUMNS = {
+    'category_budget': ('budget_amount',),
+    'expense': ('amount',),
+    'saving': ('amount',),
+}
+
+class OracleTarget:
+    """Sync target writing to the Oracle finance_tracker tables"""
+    name = "oracle"
+    column_mappings = TABLE_COLUMN_MAPPINGS
+    money_in_cents = False  # Oracle NUMBER columns hold currency units
+
+    def __init__(self, user=ORACLE_USER, password=ORACLE_PASS, dsn=ORACLE_DSN, connection=None):
+        if connection is None:
+            import oracledb
+            connection = oracledb.connect(user=user, password=password, dsn=dsn)
+        self.conn = connection
+        self.cur = self.conn.cursor()
+
+    def _executemany(self, sql, rows):
+        """Send a whole batch in one round-trip and return the rows that failed"""
+        self.cur.executemany(sql, rows, batcherrors=True)
+        return [(rows[error.offset], error.message) for error in self.cur.getbatcherrors()]
+
+    def get_columns(self, table_name):
+        """Get column names and data types from existing Oracle table"""
+        try:
+            self.cur.execute("""
+                SELECT column_name, data_type
+                FROM user_tab_columns
+                WHERE table_name = UPPER(:1)
+                ORDER BY column_id
+            """, [table_name])
+            return self.cur.fetchall()
+        except Exception as e:
+            print(f"Error getting Oracle columns for {table_name}: {e}")
+            return []
+
+    def upsert(self, table_name, key_column, columns, rows):
+        """MERGE rows into the table, returning the rows that failed with their errors"""
+        source_columns = ", ".join(f":{i+1} AS {col}" for i, col in enumerate(columns))
+        updates = ", ".join(f"t.{col} = s.{col}" for col in columns if col != key_column)
+        column_list = ", ".join(columns)
+        values = ", ".join(f"s.{col}" for col in columns)
+        merge_sql = f"""
+            MERGE INTO {table_name} t
+            USING (SELECT {source_columns} FROM dual) s
+            ON (t.{key_column} = s.{key_column})
+            WHEN MATCHED THEN UPDATE SET {updates}
+            WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({values})
+        """
+        return self._executemany(merge_sql, rows)
+
+    def delete(self, table_name, key_column, keys):
+        """Apply tombstones by deleting rows by key, returning the keys that failed"""
+        return self._executemany(
+            f"DELETE FROM {table_name} WHERE {key_column} = :1", [(key,) for key in keys]
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+class SQLiteTarget:
+    """Sync target writing to a second SQLite file, used as a local stand-in for Oracle"""
+    name = "sqlite"
+    column_mappings = {}
+    money_in_cents = True  # same schema as the source
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=SQLITE_TIMEOUT)
+        self.name = f"sqlite:{path}"
+
+    def _executemany(self, sql, rows):
+        """Run a batch, retrying row by row to report failures like Oracle batch errors"""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT batch")
+        try:
+            self.conn.executemany(sql, rows)
+            self.conn.execute("RELEASE batch")
+            return []
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK TO batch")
+            self.conn.execute("RELEASE batch")
+
+        failures = []
+        for row in rows:
+            try:
+                self.conn.execute(sql, row)
+            except sqlite3.Error as e:
+                failures.append((row, str(e)))
+        return failures
+
+    def mirror_schema(self, source_conn, tables=SYNCED_TABLES):
+        """Create the synced tables with the same definition as in the source"""
+        for table_name in tables:
+            row = source_conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+            ).fetchone()
+            if row and not self.get_columns(table_name):
+                self.conn.execute(row[0])
+        self.conn.commit()
+
+    def get_columns(self, table_name):
+        """Get column names and declared types of the target table"""
+        return [(col[1], col[2].upper()) for col in
+                self.conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+
+    def upsert(self, table_name, key_column, columns, rows):
+        """INSERT ... ON CONFLICT DO UPDATE, SQLite's equivalent of MERGE"""
+        column_list = ", ".join(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != key_column)
+        return self._executemany(
+            f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders}) '
+            f'ON CONFLICT({key_column}) DO UPDATE SET {updates}',
+            rows
+        )
+
+    def delete(self, table_name, key_column, keys):
+        """Apply tombstones by deleting rows by key, returning the keys that failed"""
+        return self._executemany(
+            f'DELETE FROM "{table_name}" WHERE {key_column} = ?', [(key,) for key in keys]
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+def create_oracle_pool(workers=SYNC_WORKERS, user=ORACLE_USER, password=ORACLE_PASS, dsn=ORACLE_DSN):
+    """Create an Oracle session pool sized for the sync workers"""
+    import oracledb
+    return oracledb.create_pool(user=user, password=password, dsn=dsn, min=1, max=workers)
 
 def convert_date_for_oracle(date_value):
     """Convert SQLite date string to Oracle DATE format"""
     if date_value is None:
         return None
-    
+
     # If it's already a datetime object
     if isinstance(date_value, datetime):
         return date_value
-    
+
     # If it's a string, handle SQLite datetime format with microseconds
     if isinstance(date_value, str):
         try:
@@ -76,118 +237,417 @@ def convert_date_for_oracle(date_value):
                         continue
         except Exception as e:
             print(f"Warning: Could not parse date '{date_value}': {e}")
-    
+
     return date_value
 
-def sync_table_data(table_name):
-    """Sync data from SQLite to Oracle for a specific table"""
-    print(f"\n📊 Syncing table: {table_name}")
-    
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_sqlite_date(date_value):
+    """Parse a SQLite date string, memoized since dates repeat across rows
+
+    SQLAlchemy stores ISO strings, which fromisoformat() parses directly;
+    anything else falls back to convert_date_for_oracle().
+    """
+    try:
+        # Oracle DATE has no fractional seconds
+        return datetime.fromisoformat(date_value).replace(microsecond=0)
+    except ValueError:
+        return convert_date_for_oracle(date_value)
+
+def convert_date_value(value):
+    """Converter for target DATE columns"""
+    if isinstance(value, str):
+        return parse_sqlite_date(value)
+    return value
+
+# Converter applied to values bound for each target column type
+COLUMN_CONVERTERS = {
+    'DATE': convert_date_value,
+}
+
+def convert_cents_value(value):
+    """Converter for money columns sent to a target that stores currency units"""
+    if value is None:
+        return None
+    return Decimal(int(value)).scaleb(-2)
+
+def compile_row_transform(target_column_names, target_types, money_columns=()):
+    """Build the row transform for a table once, from the target column types
+
+    Returns a function converting a row (as a list) in place. Only the
+    columns with a converter are visited per row. Columns in money_columns
+    are converted from cents to currency units.
+    """
+    converters = tuple(
+        (index, convert_cents_value if col in money_columns
+         else COLUMN_CONVERTERS[target_types[col]])
+        for index, col in enumerate(target_column_names)
+        if col in money_columns or target_types[col] in COLUMN_CONVERTERS
+    )
+
+    def transform(row):
+        for index, convert in converters:
+            row[index] = convert(row[index])
+        return row
+
+    return transform
+
+def get_high_water_mark(sqlite_conn, target_name, table_name):
+    """Get the last change_log id already synced to the target for a table"""
+    row = sqlite_conn.execute(
+        "SELECT last_change_id FROM sync_state WHERE target = ? AND table_name = ?",
+        (target_name, table_name)
+    ).fetchone()
+    return row[0] if row else 0
+
+def set_high_water_mark(sqlite_conn, target_name, table_name, change_id):
+    """Record the last change_log id synced to the target for a table"""
+    sqlite_conn.execute("""
+        INSERT INTO sync_state (target, table_name, last_change_id, synced_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(target, table_name) DO UPDATE
+        SET last_change_id = excluded.last_change_id, synced_at = excluded.synced_at
+    """, (target_name, table_name, change_id))
+    sqlite_conn.commit()
+
+def drop_unsharded_mark(sqlite_conn, target_name, table_name):
+    """Forget the mark a target kept for the whole table before it was synced per ledger
+
+    Once the target has a mark per ledger nothing reads the old one, and it
+    would hold back change_log compaction for good.
+    """
+    sqlite_conn.execute(
+        "DELETE FROM sync_state WHERE target = ? AND table_name = ?", (target_name, table_name)
+    )
+    sqlite_conn.commit()
+
+def retire_target(sqlite_conn, target_name):
+    """Forget every mark of a target that will not be synced again, returning how many
+
+    Compaction keeps every change a known target has not confirmed, so a
+    one-off or decommissioned target must be retired for it to go on.
+    """
+    removed = sqlite_conn.execute(
+        "DELETE FROM sync_state WHERE target = ? OR target LIKE ?",
+        (target_name, f"{target_name}#ledger=%")
+    ).rowcount
+    sqlite_conn.commit()
+    return removed
+
+def get_confirmed_change_id(sqlite_conn, table_name, ledger_id=None):
+    """Get the change_log id up to which every target has synced the table, or one ledger of it
+
+    A target synced per ledger confirms a ledger's changes with that ledger's
+    mark, one synced whole with its single mark. Returns 0 if no target has
+    synced the table yet.
+    """
+    if ledger_id is None:
+        row = sqlite_conn.execute(
+            "SELECT MIN(last_change_id) FROM sync_state WHERE table_name = ?", (table_name,)
+        ).fetchone()
+    else:
+        row = sqlite_conn.execute(
+            "SELECT MIN(last_change_id) FROM sync_state WHERE table_name = ? "
+            "AND (target NOT LIKE '%#ledger=%' OR target LIKE ?)",
+            (table_name, f"%#ledger={ledger_id}")
+        ).fetchone()
+    return row[0] or 0
+
+def compact_change_log(sqlite_conn, table_name, ledger_id=None):
+    """Delete the change_log entries that no target needs any more, returning how many
+
+    Below the mark confirmed by every target, an entry is only needed to
+    replay the row's latest state to a new target: entries superseded by a
+    later change to the same row, and those of deleted rows, go. The latest
+    entry of each ledger stays, since the panel ETags are built from it.
+    """
+    confirmed = get_confirmed_change_id(sqlite_conn, table_name, ledger_id)
+    if not confirmed:
+        return 0
+    ledger_filter, ledger_params = ("", ()) if ledger_id is None else (" AND ledger_id = ?", (ledger_id,))
+    removed = sqlite_conn.execute(f"""
+        DELETE FROM change_log
+        WHERE table_name = ?{ledger_filter} AND id <= ?
+          AND id NOT IN (
+              SELECT MAX(id) FROM change_log WHERE table_name = ?{ledger_filter} GROUP BY ledger_id
+          )
+          AND (
+              id NOT IN (
+                  SELECT MAX(id) FROM change_log WHERE table_name = ?{ledger_filter} GROUP BY row_id
+              )
+              OR NOT EXISTS (SELECT 1 FROM "{table_name}" t WHERE t.{KEY_COLUMN} = change_log.row_id)
+          )
+    """, (table_name, *ledger_params, confirmed, table_name, *ledger_params,
+          table_name, *ledger_params)).rowcount
+    sqlite_conn.commit()
+    return removed
+
+def shard_name(table_name, ledger_id=None):
+    """Label of a sync shard: the table, or one ledger's rows of it"""
+    return table_name if ledger_id is None else f"{table_name}[ledger {ledger_id}]"
+
+def sync_table_data(sqlite_conn, target, table_name, full=False, batch_size=SYNC_BATCH_SIZE,
+                    progress=None, ledger_id=None):
+    """Sync the rows of one table that changed since the last sync to the target
+
+    Changed rows are streamed from SQLite and sent to the target in batches of
+    batch_size, committing each batch. Returns (upserted, deleted, errors, failure)
+    where errors is a list of (row, message) for rows the target rejected and
+    failure is the exception that stopped the sync partway, with the counts of
+    the batches committed before it; None if the table was skipped.
+    If given, progress(shard, done, total, errors) is called after each batch.
+    With a ledger_id only that ledger's changes are synced, read through the
+    change_log (table_name, ledger_id, id) index, and the ledger keeps its own
+    high-water mark. Once every row went through, the change log is compacted
+    below the mark that all targets have confirmed.
+    """
+    shard = shard_name(table_name, ledger_id)
+    print(f"\n📊 Syncing table: {shard}")
+
     # Get SQLite columns
-    sqlite_cur.execute(f'PRAGMA table_info("{table_name}")')
-    sqlite_columns = [col[1].lower() for col in sqlite_cur.fetchall()]
-    
-    # Get Oracle columns with types
-    oracle_columns_info = get_oracle_columns_with_types(table_name)
-    oracle_columns = [col[0].lower() for col in oracle_columns_info]
-    
+    sqlite_columns = [col[1].lower() for col in
+                      sqlite_conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+
+    # Get target columns with types
+    target_columns_info = target.get_columns(table_name)
+    target_columns = [col[0].lower() for col in target_columns_info]
+
     if not sqlite_columns:
         print(f"  ✗ No columns found in SQLite table")
-        return
-    
-    if not oracle_columns:
-        print(f"  ✗ Table {table_name} not found in Oracle")
-        return
-    
-    print(f"  SQLite columns: {sqlite_columns}")
-    print(f"  Oracle columns: {oracle_columns}")
-    
+        return None
+
+    if not target_columns:
+        print(f"  ✗ Table {table_name} not found in {target.name}")
+        return None
+
     # Build column mapping using table-specific mappings
+    table_mapping = target.column_mappings.get(table_name, {})
     column_mapping = []
     for sqlite_col in sqlite_columns:
         # Get table-specific mapping, fall back to same column name
-        if table_name in TABLE_COLUMN_MAPPINGS and sqlite_col in TABLE_COLUMN_MAPPINGS[table_name]:
-            oracle_col = TABLE_COLUMN_MAPPINGS[table_name][sqlite_col]
-        else:
-            oracle_col = sqlite_col
-        
-        if oracle_col in oracle_columns:
-            column_mapping.append((sqlite_col, oracle_col))
+        target_col = table_mapping.get(sqlite_col, sqlite_col)
+
+        if target_col in target_columns:
+            column_mapping.append((sqlite_col, target_col))
+        elif sqlite_col in OPTIONAL_COLUMNS:
+            print(f"  - Column '{sqlite_col}' not in {target.name} table, not synced")
+        elif sqlite_col == LEDGER_COLUMN:
+            # Fails the shard in the report instead of merging the ledgers
+            raise ValueError(
+                f"{table_name} in {target.name} has no {target_col} column; add it, with "
+                f"category names unique per ({target_col}, name), so ledgers are not merged"
+            )
         else:
-            print(f"  ✗ Column '{sqlite_col}' -> '{oracle_col}' not found in Oracle table")
-            return
-    
+            print(f"  ✗ Column '{sqlite_col}' -> '{target_col}' not found in {target.name} table")
+            return None
+
     print(f"  Column mapping: {[f'{src} -> {dest}' for src, dest in column_mapping]}")
-    
-    # Fetch all rows from SQLite
-    sqlite_cur.execute(f'SELECT * FROM "{table_name}"')
-    rows = sqlite_cur.fetchall()
-    
-    if not rows:
-        print("  No data to sync")
-        return
-    
-    # Prepare insert SQL with proper placeholders
-    oracle_column_names = [dest for _, dest in column_mapping]
-    column_list = ", ".join(oracle_column_names)
-    placeholders = ", ".join([f":{i+1}" for i in range(len(column_mapping))])
-    insert_sql = f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})"
-    
-    print(f"  Rows to insert: {len(rows)}")
-    
+
+    # Find the changes between the last high-water mark and now
+    state_name = target.name if ledger_id is None else f"{target.name}#ledger={ledger_id}"
+    ledger_filter, ledger_params = ("", ()) if ledger_id is None else (" AND ledger_id = ?", (ledger_id,))
+    last_change_id = 0 if full else get_high_water_mark(sqlite_conn, state_name, table_name)
+    latest_change_id = sqlite_conn.execute(
+        f"SELECT MAX(id) FROM change_log WHERE table_name = ?{ledger_filter}",
+        (table_name, *ledger_params)
+    ).fetchone()[0] or 0
+
+    if latest_change_id <= last_change_id:
+        print("  No changes to sync")
+        if progress:
+            progress(shard, 0, 0, 0)
+        return 0, 0, [], None
+
+    changes_filter = f"table_name = ?{ledger_filter} AND id > ? AND id <= ?"
+    changes_params = (table_name, *ledger_params, last_change_id, latest_change_id)
+    total = None
+    if progress:
+        total = sqlite_conn.execute(
+            f"SELECT COUNT(DISTINCT row_id) FROM change_log WHERE {changes_filter}", changes_params
+        ).fetchone()[0]
+        progress(shard, 0, total, 0)
+
+    # Collapse the change log to the latest state of each changed row. Rows that
+    # no longer exist in SQLite come back with NULL columns and become tombstones.
+    lookups = COLUMN_LOOKUPS.get(table_name, {})
+    column_list = ", ".join(
+        lookups[src] if src != dest and src in lookups else f't."{src}"'
+        for src, dest in column_mapping
+    )
+    changed = sqlite_conn.execute(f"""
+        SELECT c.row_id, t.{KEY_COLUMN} IS NULL, {column_list}
+        FROM (
+            SELECT row_id FROM change_log
+            WHERE {changes_filter}
+            GROUP BY row_id
+        ) c
+        LEFT JOIN "{table_name}" t ON t.{KEY_COLUMN} = c.row_id
+    """, changes_params)
+
+    target_types = {col[0].lower(): col[1] for col in target_columns_info}
+    target_key = table_mapping.get(KEY_COLUMN, KEY_COLUMN)
+    target_column_names = [dest for _, dest in column_mapping]
+    money_columns = () if target.money_in_cents else [
+        dest for src, dest in column_mapping if src in MONEY_COLUMNS.get(table_name, ())
+    ]
+    transform_row = compile_row_transform(target_column_names, target_types, money_columns)
+
+    upserted = deleted = 0
+    errors = []
     try:
-        # Clear existing data in Oracle table
-        oracle_cur.execute(f"DELETE FROM {table_name}")
-        print(f"  Cleared existing data from Oracle table")
-        
-        # Process and insert rows with date conversion
-        successful_rows = 0
-        for row in rows:
-            try:
-                processed_row = []
-                for i, (value, (sqlite_col, oracle_col)) in enumerate(zip(row, column_mapping)):
-                    # Find Oracle column type
-                    oracle_col_type = None
-                    for col_name, col_type in oracle_columns_info:
-                        if col_name.lower() == oracle_col:
-                            oracle_col_type = col_type
-                            break
-                    
-                    # Convert date values for DATE columns
-                    if oracle_col_type == 'DATE' and value is not None:
-                        processed_value = convert_date_for_oracle(value)
-                    else:
-                        processed_value = value
-                    
-                    processed_row.append(processed_value)
-                
-                # Insert the processed row
-                oracle_cur.execute(insert_sql, processed_row)
-                successful_rows += 1
-                
-            except Exception as e:
-                print(f"  Warning: Failed to insert row {row}: {e}")
-                continue
-        
-        oracle_conn.commit()
-        print(f"  ✓ {successful_rows}/{len(rows)} rows synced to Oracle")
-        
+        while True:
+            batch = changed.fetchmany(batch_size)
+            if not batch:
+                break
+
+            upserts = []
+            deletes = []
+            for row_id, is_deleted, *row in batch:
+                if is_deleted:
+                    deletes.append(row_id)
+                    continue
+                upserts.append(transform_row(row))
+
+            upsert_failures = target.upsert(
+                table_name, target_key, target_column_names, upserts) if upserts else []
+            delete_failures = target.delete(table_name, target_key, deletes) if deletes else []
+            target.commit()
+            # Count a batch once it is committed, so that a later failure
+            # still reports what already reached the target
+            upserted += len(upserts) - len(upsert_failures)
+            deleted += len(deletes) - len(delete_failures)
+            errors.extend(upsert_failures + delete_failures)
+
+            if progress:
+                progress(shard, upserted + deleted + len(errors), total, len(errors))
     except Exception as e:
-        print(f"  ✗ Error syncing data: {e}")
-        oracle_conn.rollback()
+        # The high-water mark stays, so the next sync resends every row of the
+        # shard; MERGE makes that harmless for the batches committed here
+        print(f"  ✗ Error syncing data after {upserted} rows merged, {deleted} rows deleted: {e}")
+        target.rollback()
+        return upserted, deleted, errors, e
+
+    if errors:
+        # Keep the high-water mark so the failed rows are retried next time;
+        # MERGE makes re-sending the rows that did succeed harmless.
+        print(f"  ✗ {len(errors)} rows rejected by {target.name}, e.g. {errors[0][0]}: {errors[0][1]}")
+    else:
+        try:
+            set_high_water_mark(sqlite_conn, state_name, table_name, latest_change_id)
+            if ledger_id is not None:
+                drop_unsharded_mark(sqlite_conn, target.name, table_name)
+            compact_change_log(sqlite_conn, table_name, ledger_id)
+        except sqlite3.Error as e:
+            # The rows reached the target; at worst the next sync resends them
+            print(f"  ✗ Error recording the sync in SQLite: {e}")
+            sqlite_conn.rollback()
+            return upserted, deleted, errors, e
+    print(f"  ✓ {upserted} rows merged, {deleted} rows deleted in {target.name}")
+    return upserted, deleted, errors, None
+
+def sync_table_isolated(sqlite_path, target_factory, table_name, **kwargs):
+    """Sync one table or shard on its own SQLite connection and target, committing independently"""
+    sqlite_conn = sqlite3.connect(sqlite_path, timeout=SQLITE_TIMEOUT)
+    target = target_factory()
+    try:
+        return sync_table_data(sqlite_conn, target, table_name, **kwargs)
+    finally:
+        target.close()
+        sqlite_conn.close()
+
+def sync_data(sqlite_path=sqlite_db_path, target=None, full=False, batch_size=SYNC_BATCH_SIZE,
+              progress=None, workers=SYNC_WORKERS, target_factory=None, ledgers=None):
+    """Sync every changed row in the tracked tables and return a summary message
+
+    Tables are synced concurrently by up to `workers` threads, each with its own
+    SQLite connection and a target from target_factory (by default an Oracle
+    connection drawn from a session pool). Passing a single `target` syncs the
+    tables one after another over it instead; use a SQLiteTarget to sync to a
+    local file. With full=True the whole change log is replayed from the beginning.
+    Given a list of ledger IDs, each table is split into one shard per ledger,
+    synced and committed independently of the others.
+    """
+    print("Starting SQLite to Oracle data sync...")
+    kwargs = {"full": full, "batch_size": batch_size, "progress": progress}
+    shards = [(table_name, ledger_id) for table_name in SYNCED_TABLES
+              for ledger_id in (ledgers if ledgers is not None else [None])]
+    results = {}
+    timings = {}
+
+    def run(shard, sync):
+        started = time.perf_counter()
+        try:
+            results[shard] = sync()
+        except Exception as e:
+            results[shard] = e
+        timings[shard] = time.perf_counter() - started
 
-# ---------- Main sync logic ----------
-print("Starting SQLite to Oracle data sync...")
+    if target is not None:
+        sqlite_conn = sqlite3.connect(sqlite_path, timeout=SQLITE_TIMEOUT)
+        try:
+            for table_name, ledger_id in shards:
+                run((table_name, ledger_id), lambda: sync_table_data(
+                    sqlite_conn, target, table_name, ledger_id=ledger_id, **kwargs))
+        finally:
+            sqlite_conn.close()
+    else:
+        pool = None
+        if target_factory is None:
+            pool = create_oracle_pool(workers)
+            target_factory = lambda: OracleTarget(connection=pool.acquire())
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-table") as executor:
+                for shard in shards:
+                    executor.submit(run, shard, lambda shard=shard: sync_table_isolated(
+                        sqlite_path, target_factory, shard[0], ledger_id=shard[1], **kwargs))
+        finally:
+            if pool is not None:
+                pool.close()
 
-# Get all tables from SQLite
-sqlite_cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = sqlite_cur.fetchall()
+    # Summary report, one line per table or shard
+    upserted = deleted = rejected = 0
+    failed = []
+    print("\n📋 Sync report:")
+    for shard in shards:
+        name = shard_name(*shard)
+        counts = results.get(shard)
+        elapsed = timings.get(shard, 0)
+        if isinstance(counts, Exception):
+            failed.append(f"{name} ({counts})")
+            print(f"  ✗ {name}: {counts}")
+        elif counts is None:
+            failed.append(f"{name} (schema mismatch)")
+            print(f"  ✗ {name}: schema mismatch")
+        else:
+            shard_upserted, shard_deleted, errors, failure = counts
+            upserted += shard_upserted
+            deleted += shard_deleted
+            rejected += len(errors)
+            if failure is not None:
+                failed.append(f"{name} ({failure}, after {shard_upserted} merged, "
+                              f"{shard_deleted} deleted)")
+                print(f"  ✗ {name}: {failure}, after {shard_upserted} merged, "
+                      f"{shard_deleted} deleted in {elapsed:.2f}s")
+            else:
+                print(f"  ✓ {name}: {shard_upserted} merged, {shard_deleted} deleted, "
+                      f"{len(errors)} failed in {elapsed:.2f}s")
 
-for table_name_tuple in tables:
-    table_name = table_name_tuple[0]
-    sync_table_data(table_name)
+    summary = f"Sync complete: {upserted} rows merged, {deleted} rows deleted"
+    if rejected:
+        summary += f"; {rejected} rows failed"
+    if failed:
+        summary += f"; failed tables: {', '.join(failed)}"
+    print(f"\n🎉 {summary}")
+    return summary
 
-# Close connections
-sqlite_conn.close()
-oracle_conn.close()
-print("\n🎉 Data sync complete!")
\ No newline at end of file
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sync the SQLite expenses database to Oracle")
+    parser.add_argument("--full", action="store_true", help="replay the whole change log")
+    parser.add_argument("--retire", metavar="TARGET",
+                        help="forget a target that will not be synced again, e.g. sqlite:/tmp/copy.db")
+    args = parser.parse_args()
+    if args.retire:
+        with sqlite3.connect(sqlite_db_path, timeout=SQLITE_TIMEOUT) as conn:
+            print(f"Retired {args.retire}: {retire_target(conn, args.retire)} marks removed")
+    else:
+        print(sync_data(full=args.full))
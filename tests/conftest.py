@@ -0,0 +1,60 @@
+"""Fixtures: an application on a throwaway SQLite database per test."""
+import contextlib
+import io
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app import AGGREGATE_CACHES, create_app
+from models import db
+
+@pytest.fixture
+def app(tmp_path):
+    """The application on a new database, without the recurring scheduler thread"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'expenses.db'}",
+            'SECRET_KEY': 'test',
+            'RECURRING_SCHEDULER': False,
+        })
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def clear_caches():
+    """Drop every cached aggregate, so that the next request recomputes them"""
+    def clear():
+        for cache in AGGREGATE_CACHES:
+            cache.invalidate()
+    return clear
+
+class StatementCounter:
+    """Counts the SQL statements the engine runs on the test's thread
+
+    The test client serves requests on that thread; statements from the
+    alert dispatcher or the writer thread are left out.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.thread = threading.get_ident()
+
+    def __call__(self, *args):
+        if threading.get_ident() == self.thread:
+            self.count += 1
+
+@pytest.fixture
+def statements(app):
+    counter = StatementCounter()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', counter)
@@ -0,0 +1,57 @@
+"""Period-over-period deltas compare adjacent periods, with gaps filled in."""
+
+def add_expense(client, amount, day):
+    client.post("/add", data={"description": "Shopping", "amount": amount,
+                              "category": "Food", "date": day})
+
+def period_series(client, **params):
+    return client.get("/api/analytics", query_string=params).get_json()['periods']
+
+def test_months_without_spending_are_zeros(client):
+    add_expense(client, "100", "2024-01-10")
+    add_expense(client, "150", "2024-03-05")
+
+    periods = period_series(client, granularity="month")
+    assert periods['labels'] == ["Jan 2024", "Feb 2024", "Mar 2024"]
+    assert periods['totals'] == ["100.00", "0.00", "150.00"]
+    # February is compared with January, March with an empty February
+    assert periods['previous_change'] == [None, -100.0, None]
+    assert periods['year_change'] == [None, None, None]
+
+def test_range_compares_with_the_previous_period_and_year(client):
+    add_expense(client, "80", "2024-01-20")
+    add_expense(client, "40", "2024-12-31")
+    add_expense(client, "100", "2025-01-15")
+
+    periods = period_series(client, granularity="month", start="2025-01-01", end="2025-03-31")
+    assert periods['labels'] == ["Jan 2025", "Feb 2025", "Mar 2025"]
+    assert periods['totals'] == ["100.00", "0.00", "0.00"]
+    assert periods['previous_change'] == [150.0, -100.0, None]
+    # Only January has spending a year earlier; the earlier months are zeros
+    assert periods['year_change'] == [25.0, None, None]
+
+def test_weeks_without_spending_are_zeros(client):
+    # Mondays two weeks apart
+    add_expense(client, "50", "2024-01-01")
+    add_expense(client, "75", "2024-01-15")
+
+    periods = period_series(client, granularity="week")
+    assert periods['labels'] == ["Jan 01, 2024", "Jan 08, 2024", "Jan 15, 2024"]
+    assert periods['totals'] == ["50.00", "0.00", "75.00"]
+    assert periods['previous_change'] == [None, -100.0, None]
+
+def test_range_at_the_ends_of_the_calendar(client):
+    add_expense(client, "30", "2024-01-10")
+
+    for granularity in ("week", "month"):
+        # The year-ago lookback would start before year 1
+        response = client.get("/api/analytics", query_string={
+            "granularity": granularity, "start": "0001-06-01", "end": "0001-08-31"})
+        assert response.status_code == 200
+        assert set(response.get_json()['periods']['totals']) == {"0.00"}
+
+        # The last period ends, and nothing can be forecast, past year 9999
+        response = client.get("/api/analytics", query_string={
+            "granularity": granularity, "start": "9999-10-01", "end": "9999-12-31"})
+        assert response.status_code == 200
+        assert response.get_json()['forecast']['labels'] == []
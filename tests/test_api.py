@@ -0,0 +1,27 @@
+"""Shape of the JSON panels."""
+import re
+
+AMOUNT = re.compile(r"^-?\d+\.\d{2}$")
+
+def test_category_stats_amounts_are_decimal_strings(client):
+    client.post("/add", data={"description": "Lunch", "amount": "12.50",
+                              "category": "Food", "date": "2024-01-02"})
+    for url in ("/api/category-stats", "/api/category-stats?start=2024-02-01"):
+        categories = client.get(url).get_json()['categories']
+        # Food has spending, the other categories have none
+        assert len(categories) > 1
+        for category in categories:
+            for field in ("budget", "total_expenses", "remaining"):
+                assert AMOUNT.match(category[field]), (url, category['name'], field, category[field])
+
+def test_range_ending_on_the_last_representable_day(client):
+    client.post("/add", data={"description": "Lunch", "amount": "12.50",
+                              "category": "Food", "date": "2024-01-02"})
+    query = {"start": "2024-01-01", "end": "9999-12-31"}
+    response = client.get("/api/expenses", query_string=query)
+    assert response.status_code == 200
+    assert [expense['description'] for expense in response.get_json()['items']] == ["Lunch"]
+
+    response = client.get("/export", query_string=query)
+    assert response.status_code == 200
+    assert b"Lunch" in response.data
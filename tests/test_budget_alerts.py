@@ -0,0 +1,36 @@
+"""Budget threshold alerts reach the sink once per crossing."""
+import time
+
+from models import db, BudgetAlert
+
+def add_expense(client, amount):
+    client.post("/add", data={"description": "Groceries", "amount": amount,
+                              "category": "Food", "date": "2024-01-02"})
+
+def delivered_alerts(app, timeout=5):
+    """The alerts in the local sink once the dispatcher has delivered every pending one"""
+    deadline = time.monotonic() + timeout
+    with app.app_context():
+        while BudgetAlert.query.filter(BudgetAlert.delivered_at.is_(None)).count():
+            assert time.monotonic() < deadline, "alerts were not delivered"
+            time.sleep(0.01)
+            db.session.rollback()
+    return list(app.extensions['alert_sink'].delivered)
+
+def test_no_alert_under_threshold(app, client):
+    # Food has a budget of 1000.00 and the thresholds are 80% and 100%
+    add_expense(client, "700")
+    add_expense(client, "99.99")
+    assert delivered_alerts(app) == []
+
+def test_crossing_a_threshold_sends_one_alert(app, client):
+    add_expense(client, "700")
+    add_expense(client, "150")
+    alerts = delivered_alerts(app)
+    assert [(alert['category'], alert['threshold'], alert['spent']) for alert in alerts] == [
+        ("Food", 80, "850.00")
+    ]
+
+    # Spending more without reaching the next threshold sends nothing new
+    add_expense(client, "10")
+    assert delivered_alerts(app) == alerts
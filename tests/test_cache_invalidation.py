@@ -0,0 +1,122 @@
+"""No cached aggregate is stale after a write: warm panels equal a cold recompute."""
+import io
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app import run_recurring_expenses
+from models import db
+
+# Every page and panel served from the aggregate caches, with and without filters
+PANEL_URLS = [
+    "/",
+    "/?start=2024-01-01&end=2024-01-31",
+    "/?category=Food",
+    "/api/charts",
+    "/api/charts?start=2024-01-01&end=2024-01-31",
+    "/api/charts?category=Food",
+    "/api/category-stats",
+    "/api/category-stats?start=2024-01-01&end=2024-01-31",
+    "/api/expenses",
+    "/api/expenses?category=Food",
+    "/api/savings",
+    "/api/savings-balance?bucket=day",
+    "/api/savings-balance?bucket=month",
+    "/api/analytics",
+    "/api/analytics?granularity=week&start=2024-01-01&end=2024-03-31",
+]
+
+def post(path, **data):
+    return lambda app, client: client.post(path, data=data)
+
+def import_csv(app, client):
+    csv = ("description,amount,category,date\n"
+           "Imported lunch,8.20,Food,2024-01-15\n"
+           "Imported bus,3.10,Transport,2024-02-01\n")
+    return client.post("/import", data={"file": (io.BytesIO(csv.encode()), "expenses.csv")},
+                       content_type="multipart/form-data")
+
+def add_recurring(app, client):
+    client.post("/add-recurring", data={"description": "Rent", "amount": "700",
+                                        "category": "Other", "date": "2024-01-01",
+                                        "frequency": "monthly"})
+    # What the scheduler thread does next, run here since it is off in tests
+    run_recurring_expenses(app)
+
+def add_future_rule(app, client):
+    client.post("/add-recurring", data={"description": "Gym", "amount": "30",
+                                        "category": "Entertainment", "date": "2030-01-01",
+                                        "frequency": "monthly"})
+
+# Write name: (setup run before the caches are warmed, or None; the write)
+WRITES = {
+    "add expense": (None, post("/add", description="Dinner", amount="30", category="Food",
+                               date="2024-01-20")),
+    "delete expense": (None, post("/delete/1")),
+    "add saving": (None, post("/add-saving", description="Bonus", amount="250",
+                              type="deposit", date="2024-01-25")),
+    "delete saving": (None, post("/delete-saving/1")),
+    "add category": (None, post("/add-category", name="Travel", budget_amount="500")),
+    "edit category": (None, post("/edit-category/1", name="Groceries", budget_amount="40")),
+    "delete category": (None, post("/delete-category/3")),
+    "deactivate category": (None, post("/delete-category/1")),
+    "reactivate category": (post("/delete-category/1"),
+                            post("/add-category", name="Food", budget_amount="900")),
+    "import": (None, import_csv),
+    "add recurring": (None, add_recurring),
+    "stop recurring": (add_future_rule, post("/stop-recurring/1")),
+    "add ledger": (None, post("/add-ledger", name="Holidays")),
+}
+
+def warm(client):
+    """Fill the caches through the panels, discarding any pending flash messages"""
+    return {url: client.get(url).get_data(as_text=True) for url in PANEL_URLS}
+
+@pytest.fixture
+def seeded_client(client):
+    for description, amount, category, date in [
+        ("Lunch", "12.50", "Food", "2024-01-02"),
+        ("Bus", "2.40", "Transport", "2024-01-03"),
+        ("Cinema", "15", "Entertainment", "2024-02-10"),
+    ]:
+        client.post("/add", data={"description": description, "amount": amount,
+                                  "category": category, "date": date})
+    client.post("/add-saving", data={"description": "Rainy day", "amount": "100",
+                                     "type": "deposit", "date": "2024-01-04"})
+    return client
+
+@pytest.mark.parametrize("write", list(WRITES), ids=list(WRITES))
+def test_no_panel_is_stale_after_write(app, seeded_client, clear_caches, write):
+    client = seeded_client
+    setup, run_write = WRITES[write]
+    if setup:
+        setup(app, client)
+    before = warm(client)
+    run_write(app, client)
+    # The first round consumes the flash messages of the write
+    warm(client)
+    cached = warm(client)
+    clear_caches()
+    fresh = warm(client)
+    assert fresh != before, f"{write} changed nothing"
+    for url in PANEL_URLS:
+        assert cached[url] == fresh[url], f"{url} is stale after {write}"
+
+@pytest.mark.parametrize("write", list(WRITES), ids=list(WRITES))
+def test_every_write_commits_on_the_writer_thread(app, seeded_client, write):
+    client = seeded_client
+    setup, run_write = WRITES[write]
+    if setup:
+        setup(app, client)
+    committers = []
+    def record_commit(conn):
+        committers.append(threading.current_thread().name)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "commit", record_commit)
+    try:
+        run_write(app, client)
+    finally:
+        event.remove(engine, "commit", record_commit)
+    assert committers and set(committers) == {"sqlite-writer"}, committers
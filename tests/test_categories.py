@@ -0,0 +1,47 @@
+"""Deleting a category that is still referenced deactivates it instead."""
+import pytest
+
+from models import db, CategoryBudget
+
+def add_rule(client, category, start):
+    client.post("/add-recurring", data={"description": "Gym", "amount": "30",
+                                        "category": category, "date": start,
+                                        "frequency": "monthly"})
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+def category_state(app, category_id):
+    with app.app_context():
+        category = db.session.get(CategoryBudget, category_id)
+        return category and category.is_active
+
+@pytest.mark.parametrize("stop", [False, True], ids=["active rule", "stopped rule"])
+def test_category_with_recurring_rule_is_deactivated(app, client, stop):
+    # Entertainment (id 4) has no expenses; the rule starts in the future
+    add_rule(client, "Entertainment", "2030-01-01")
+    if stop:
+        client.post("/stop-recurring/1")
+
+    stats = {c['id']: c for c in client.get("/api/category-stats").get_json()['categories']}
+    assert stats[4]['has_recurring'] and not stats[4]['has_expenses']
+
+    flashes(client)
+    client.post("/delete-category/4")
+    assert flashes(client) == ["Category 'Entertainment' deactivated (has recurring expenses)"]
+    assert category_state(app, 4) is False
+
+def test_unreferenced_category_is_deleted(app, client):
+    client.post("/delete-category/4")
+    assert flashes(client) == ["Category 'Entertainment' deleted successfully"]
+    assert category_state(app, 4) is None
+
+def test_new_rule_changes_the_category_stats_etag(client):
+    etag = client.get("/api/category-stats").headers["ETag"]
+    add_rule(client, "Entertainment", "2030-01-01")
+
+    response = client.get("/api/category-stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    stats = {c['id']: c for c in response.get_json()['categories']}
+    assert stats[4]['has_recurring']
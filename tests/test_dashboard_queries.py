@@ -0,0 +1,41 @@
+"""The dashboard's query count does not grow with the number of categories."""
+from datetime import datetime
+
+import pytest
+
+from migrations import DEFAULT_LEDGER_ID
+from models import db, CategoryBudget, Expense
+
+def seed_categories(app, first, last):
+    """Add categories first..last-1 to the default ledger, each with two expenses"""
+    with app.app_context():
+        categories = [
+            CategoryBudget(ledger_id=DEFAULT_LEDGER_ID, name=f"Category {i}", budget_amount=100)
+            for i in range(first, last)
+        ]
+        db.session.add_all(categories)
+        db.session.flush()
+        db.session.add_all([
+            Expense(ledger_id=DEFAULT_LEDGER_ID, description=f"expense {i}", amount=5,
+                    category_id=category.id, date=datetime(2024, 1, day))
+            for i, category in enumerate(categories) for day in (1, 2)
+        ])
+        db.session.commit()
+
+def cold_statement_count(client, statements, clear_caches, url):
+    clear_caches()
+    statements.count = 0
+    response = client.get(url)
+    assert response.status_code == 200
+    return statements.count
+
+@pytest.mark.parametrize("url", ["/", "/api/charts", "/api/category-stats",
+                                 "/api/category-stats?start=2024-01-01&end=2024-01-31"])
+def test_statement_count_does_not_grow_with_categories(app, client, statements, clear_caches, url):
+    counts = []
+    seeded = 0
+    for categories in (1, 10, 100):
+        seed_categories(app, seeded, categories)
+        seeded = categories
+        counts.append(cold_statement_count(client, statements, clear_caches, url))
+    assert counts[0] == counts[1] == counts[2], counts
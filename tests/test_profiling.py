@@ -0,0 +1,39 @@
+"""Opt-in request profiling: Server-Timing headers and the /metrics endpoint."""
+import re
+import tracemalloc
+
+import pytest
+
+@pytest.fixture
+def profiled_client(app):
+    app.config.update(PROFILE_REQUESTS=True, PROFILE_ALLOCATIONS=True)
+    yield app.test_client()
+    # Allocation tracking is process-wide and would slow the other tests down
+    tracemalloc.stop()
+
+def metric_value(text, name, **labels):
+    """The value of the sample with exactly these labels, or None"""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$", text, re.MULTILINE)
+    return match and float(match.group(1))
+
+def test_request_is_timed_and_counted(profiled_client):
+    response = profiled_client.get("/api/category-stats")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert re.match(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+$', timing)
+
+    metrics = profiled_client.get("/metrics").text
+    route = "main.api_category_stats"
+    assert metric_value(metrics, "expenses_requests_total",
+                        route=route, method="GET", status="200") == 1
+    assert "# TYPE expenses_request_duration_seconds histogram" in metrics
+    assert metric_value(metrics, "expenses_request_duration_seconds_bucket",
+                        route=route, le="+Inf") == 1
+    assert metric_value(metrics, "expenses_request_duration_seconds_count", route=route) == 1
+    assert metric_value(metrics, "expenses_sql_statements_total", route=route) > 0
+
+def test_nothing_is_recorded_unless_enabled(client):
+    response = client.get("/api/category-stats")
+    assert "Server-Timing" not in response.headers
+    assert "main.api_category_stats" not in client.get("/metrics").text
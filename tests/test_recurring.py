@@ -0,0 +1,42 @@
+"""Recurring rules materialize each occurrence once, catching up on missed runs."""
+from datetime import date
+
+from app import run_recurring_expenses
+from models import db, Expense, RecurringExpense
+
+def add_rule(client, start, frequency="monthly"):
+    client.post("/add-recurring", data={"description": "Rent", "amount": "700",
+                                        "category": "Food", "date": start,
+                                        "frequency": frequency})
+
+def occurrences(app):
+    with app.app_context():
+        return db.session.scalars(
+            db.select(Expense.occurrence).where(Expense.recurring_id.is_not(None))
+            .order_by(Expense.occurrence)
+        ).all()
+
+def test_second_run_over_the_same_occurrence_adds_nothing(app, client):
+    add_rule(client, "2024-03-01")
+    assert run_recurring_expenses(app, today=date(2024, 3, 1)) == 1
+
+    # A run that lost its next_due update, after a crash or racing another process
+    with app.app_context():
+        db.session.execute(db.update(RecurringExpense).values(next_due=date(2024, 3, 1)))
+        db.session.commit()
+    assert run_recurring_expenses(app, today=date(2024, 3, 1)) == 0
+    assert occurrences(app) == [date(2024, 3, 1)]
+
+def test_missed_occurrences_are_caught_up(app, client):
+    add_rule(client, "2024-01-31")
+    assert run_recurring_expenses(app, today=date(2024, 4, 15), catch_up=True) == 3
+    # Kept on the 31st, or the last day of shorter months
+    assert occurrences(app) == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)]
+
+    assert run_recurring_expenses(app, today=date(2024, 4, 30), catch_up=True) == 1
+    assert occurrences(app)[-1] == date(2024, 4, 30)
+
+def test_without_catch_up_only_the_latest_occurrence_is_added(app, client):
+    add_rule(client, "2024-01-01", frequency="weekly")
+    assert run_recurring_expenses(app, today=date(2024, 1, 20), catch_up=False) == 1
+    assert occurrences(app) == [date(2024, 1, 15)]
@@ -0,0 +1,195 @@
+"""Incremental sync into a SQLiteTarget, and compaction of the change log."""
+import sqlite3
+import time
+
+import pytest
+
+from migrations import DEFAULT_LEDGER_ID
+import sync_to_oracle
+from sync_jobs import SyncJobRunner
+from sync_to_oracle import SYNCED_TABLES, SQLiteTarget, retire_target, sync_data
+
+@pytest.fixture
+def source_path(app, client):
+    client.post("/add", data={"description": "Lunch", "amount": "12.50",
+                              "category": "Food", "date": "2024-01-02"})
+    client.post("/add", data={"description": "Bus", "amount": "2.40",
+                              "category": "Transport", "date": "2024-01-03"})
+    client.post("/add-saving", data={"description": "Rainy day", "amount": "100",
+                                     "type": "deposit", "date": "2024-01-04"})
+    return app.config['SQLALCHEMY_DATABASE_URI'].removeprefix("sqlite:///")
+
+def sync_into(source_path, target_path):
+    target = SQLiteTarget(target_path)
+    with sqlite3.connect(source_path) as source:
+        target.mirror_schema(source)
+    try:
+        return sync_data(source_path, target=target, ledgers=[DEFAULT_LEDGER_ID])
+    finally:
+        target.close()
+
+def table_rows(path):
+    with sqlite3.connect(path) as conn:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+                for table in SYNCED_TABLES}
+
+def change_log(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT id, table_name, row_id FROM change_log ORDER BY id").fetchall()
+
+def latest_change_ids(entries):
+    """The newest change_log id per table, which the panel ETags are built from"""
+    return {table: change_id for change_id, table, _ in entries}
+
+def test_incremental_sync_is_idempotent(source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+
+    first = sync_into(source_path, target_path)
+    assert "failed" not in first
+    assert table_rows(target_path) == table_rows(source_path)
+
+    second = sync_into(source_path, target_path)
+    assert second.startswith("Sync complete: 0 rows merged, 0 rows deleted")
+    assert table_rows(target_path) == table_rows(source_path)
+
+def test_sync_applies_edits_and_deletes(app, client, source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+    sync_into(source_path, target_path)
+
+    client.post("/edit-category/1", data={"name": "Groceries", "budget_amount": "250"})
+    client.post("/delete/1")
+    sync_into(source_path, target_path)
+    assert table_rows(target_path) == table_rows(source_path)
+
+def test_change_log_is_compacted_after_sync(app, client, source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+    for amount in ("1", "2", "3"):
+        client.post("/edit-category/1", data={"budget_amount": amount})
+    client.post("/delete/1")
+    before = change_log(source_path)
+
+    sync_into(source_path, target_path)
+    after = change_log(source_path)
+    assert len(after) < len(before)
+    # Superseded entries are gone, the newest of each table is kept
+    rows = [(table, row_id) for _, table, row_id in after]
+    assert len(rows) == len(set(rows))
+    assert latest_change_ids(after) == latest_change_ids(before)
+
+    # A target that never synced still receives every row from what is left
+    fresh_path = tmp_path / "fresh.db"
+    sync_into(source_path, fresh_path)
+    assert table_rows(fresh_path) == table_rows(source_path)
+
+class FailingTarget(SQLiteTarget):
+    """Raises on the second batch of category upserts, as a dropped connection would"""
+    def __init__(self, path):
+        super().__init__(path)
+        self.category_batches = 0
+
+    def upsert(self, table_name, key_column, columns, rows):
+        if table_name == "category_budget":
+            self.category_batches += 1
+            if self.category_batches == 2:
+                raise sqlite3.OperationalError("connection lost")
+        return super().upsert(table_name, key_column, columns, rows)
+
+def test_failed_batch_reports_the_committed_batches(source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+    target = FailingTarget(target_path)
+    with sqlite3.connect(source_path) as source:
+        target.mirror_schema(source)
+    try:
+        summary = sync_data(source_path, target=target, ledgers=[DEFAULT_LEDGER_ID], batch_size=1)
+    finally:
+        target.close()
+
+    # The first category batch was committed and is counted, then the table failed
+    assert f"category_budget[ledger {DEFAULT_LEDGER_ID}] (connection lost, after 1 merged" in summary
+    assert len(table_rows(target_path)["category_budget"]) == 1
+
+    # The high-water mark did not move, so the next sync sends the rest
+    assert "failed" not in sync_into(source_path, target_path)
+    assert table_rows(target_path) == table_rows(source_path)
+
+def test_sync_jobs_belong_to_their_app(app, client):
+    import app as app_module
+    assert not hasattr(app_module, "sync_runner")
+
+    calls = []
+    def fake_sync(progress, **kwargs):
+        calls.append(kwargs)
+        progress("expense", 2, 2, 0)
+        return "✓ Sync finished"
+    app.extensions['sync_runner'] = SyncJobRunner(fake_sync)
+
+    response = client.post("/sync-to-oracle", headers={"Accept": "application/json"})
+    assert response.status_code == 202
+    for _ in range(500):
+        status = client.get(response.get_json()['status_url']).get_json()
+        if status['status'] != "running":
+            break
+        time.sleep(0.01)
+    assert status['status'] == "done"
+    assert status['tables']['expense']['done'] == 2
+    assert calls == [{"sqlite_path": app.config['SQLALCHEMY_DATABASE_URI'].removeprefix("sqlite:///"),
+                      "ledgers": [DEFAULT_LEDGER_ID]}]
+    assert client.get("/sync-status/unknown").status_code == 404
+
+def test_target_without_ledger_column_fails_loudly(source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+    target = SQLiteTarget(target_path)
+    with sqlite3.connect(source_path) as source:
+        # An expense table from before ledgers existed
+        columns = [column[1] for column in source.execute("PRAGMA table_info(expense)")
+                   if column[1] != "ledger_id"]
+        target.conn.execute(f"CREATE TABLE expense ({', '.join(columns)}, PRIMARY KEY (id))")
+        target.mirror_schema(source)
+    try:
+        summary = sync_data(source_path, target=target, ledgers=[DEFAULT_LEDGER_ID])
+    finally:
+        target.close()
+    assert f"expense[ledger {DEFAULT_LEDGER_ID}] (expense in sqlite:" in summary
+    assert "has no ledger_id column" in summary
+    assert table_rows(target_path)["expense"] == []
+
+def sync_states(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT target || ' ' || table_name, last_change_id FROM sync_state"))
+
+def test_unsharded_mark_is_dropped_once_synced_per_ledger(source_path, tmp_path):
+    target_path = tmp_path / "target.db"
+    legacy = f"sqlite:{target_path}"
+    with sqlite3.connect(source_path) as conn:
+        # A mark left by a sync from before ledgers, far behind
+        conn.execute("INSERT INTO sync_state (target, table_name, last_change_id) "
+                     "VALUES (?, 'expense', 1)", (legacy,))
+    sync_into(source_path, target_path)
+    assert f"{legacy} expense" not in sync_states(source_path)
+    assert f"{legacy}#ledger={DEFAULT_LEDGER_ID} expense" in sync_states(source_path)
+
+def test_retired_target_no_longer_holds_back_compaction(app, client, source_path, tmp_path):
+    one_off = tmp_path / "one-off.db"
+    sync_into(source_path, one_off)
+    for amount in ("1", "2", "3"):
+        client.post("/edit-category/1", data={"budget_amount": amount})
+
+    target_path = tmp_path / "target.db"
+    sync_into(source_path, target_path)
+    # The one-off target has not confirmed the edits, so they are kept
+    kept = change_log(source_path)
+    assert len([entry for entry in kept if entry[1:] == ("category_budget", 1)]) == 3
+
+    with sqlite3.connect(source_path) as conn:
+        assert retire_target(conn, f"sqlite:{one_off}") == len(SYNCED_TABLES)
+    client.post("/edit-category/1", data={"budget_amount": "4"})
+    sync_into(source_path, target_path)
+    assert len([entry for entry in change_log(source_path)
+                if entry[1:] == ("category_budget", 1)]) == 1
+
+def test_compaction_error_is_reported_as_a_failure(source_path, tmp_path, monkeypatch):
+    def fail(*args):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(sync_to_oracle, "compact_change_log", fail)
+    summary = sync_into(source_path, tmp_path / "target.db")
+    assert f"expense[ledger {DEFAULT_LEDGER_ID}] (database is locked, after 2 merged" in summary
@@ -0,0 +1,80 @@
+"""Single writer thread that groups concurrent writes into shared commits.
+
+SQLite allows one writer at a time, so request threads that write at once
+end up waiting on the database lock and retrying. Instead, writes are handed
+to one thread that runs everything waiting in the queue as one transaction:
+callers never contend for the lock and a burst of writes costs one commit.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+# Most writes committed together in one transaction
+MAX_GROUP_SIZE = 64
+
+# Seconds a caller waits for its write to be committed
+WRITE_TIMEOUT = 30
+
+class WriteQueue:
+    """Runs submitted write operations on one background thread, in groups
+
+    run_group(operations) runs a list of operations and returns one
+    (result, error) pair per operation; error is None on success.
+    """
+
+    def __init__(self, run_group, max_group_size=MAX_GROUP_SIZE):
+        self.run_group = run_group
+        self.max_group_size = max_group_size
+        self.groups = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation, timeout=WRITE_TIMEOUT):
+        """Queue a write and block until it is committed; returns its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((operation, future))
+        return future.result(timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlite-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _next_group(self):
+        # Block for the first write, then take whatever queued up meanwhile
+        group = [self._queue.get()]
+        while len(group) < self.max_group_size:
+            try:
+                group.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        while True:
+            group = self._next_group()
+            try:
+                results = self.run_group([operation for operation, _ in group])
+            except Exception as e:
+                results = [(None, e)] * len(group)
+
+            for (_, future), (result, error) in zip(group, results):
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            self.groups += 1
+            self.writes += len(group)
+
+    def stats(self):
+        return {
+            "groups": self.groups,
+            "writes": self.writes,
+            "pending": self._queue.qsize(),
+        }